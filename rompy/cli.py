@@ -1,53 +1,72 @@
 # -*- coding: utf-8 -*-
 
+import json
 import logging
+from importlib.util import find_spec
 
 import click
 import yaml
 
-from .model import ModelRun
-
 logging.basicConfig(level=logging.INFO)
 
-installed = []
-try:
-    from rompy.core import BaseConfig
-
-    installed.append("base")
-except ImportError:
-    pass
-try:
-    from rompy.swan import SwanConfig
-
-    installed.append("swan")
-except ImportError:
-    pass
-
-try:
-    from rompy.schism import SchismCSIROConfig
+# Third party packages required by each model backend, checked without importing them
+# so the backends are only loaded when a config of that type is instantiated
+MODEL_REQUIREMENTS = {
+    "base": [],
+    "swan": [],
+    "schism": ["pyschism"],
+}
 
-    installed.append("schism")
-except ImportError:
-    pass
+installed = [
+    model
+    for model, requirements in MODEL_REQUIREMENTS.items()
+    if all(find_spec(requirement) for requirement in requirements)
+]
 
 
 @click.command()
 @click.argument("model", type=click.Choice(installed))
 @click.argument("config", type=click.File("r"))
 @click.option("zip", "--zip/--no-zip", default=False)
+@click.option(
+    "--compression",
+    type=click.Choice(["deflate", "store", "zstd"]),
+    default="deflate",
+    help="compression of the archive written with --zip",
+)
 @click.option(
     "--kwargs",
     "-k",
     multiple=True,
     help="additional key value pairs in the format key:value",
 )
-def main(model, config, zip, kwargs):
+@click.option(
+    "--force/--no-force",
+    default=False,
+    help="regenerate all files ignoring the manifest of a previous generation",
+)
+@click.option(
+    "--profile/--no-profile",
+    default=False,
+    help="write a profile of the generation stages and print its summary",
+)
+@click.option(
+    "--ensemble",
+    "-e",
+    type=click.File("r"),
+    default=None,
+    help="yaml file with the parameters of an ensemble to generate from the config",
+)
+def main(model, config, zip, compression, kwargs, force, profile, ensemble):
     """Run model
     Usage: rompy <model> config.yml
     Args:
         model(str): model type
         config(str): yaml config file
+        ensemble(str): yaml file with the `rompy.ensemble.Ensemble` options
     """
+    from .model import ModelRun
+
     args = yaml.load(config, Loader=yaml.Loader)
 
     kw = {}
@@ -57,9 +76,22 @@ def main(model, config, zip, kwargs):
         current = getattr(instance, split[0])
         setattr(instance, split[0], type(current)(split[1]))
     model = ModelRun(**args, **kw)
-    model()
+    if ensemble is not None:
+        from .ensemble import Ensemble
+
+        ens = Ensemble(run=model, **yaml.load(ensemble, Loader=yaml.Loader))
+        ens()
+        if zip:
+            for member in ens.members():
+                member.zip(compression=compression)
+        return
+    model.generate(force=force, profile=profile)
+    if profile:
+        from .core.profiling import summarize
+
+        click.echo(summarize(json.loads(model.profile_file.read_text())))
     if zip:
-        model.zip()
+        model.zip(compression=compression)
 
 
 if __name__ == "__main__":
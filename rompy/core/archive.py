@@ -0,0 +1,357 @@
+"""Packaging of staging directories into compressed archives.
+
+Files are streamed in chunks directly into the destination, which can be a local
+path or any fsspec URL, and compressed in parallel by a pool of threads. With zip
+deflate, chunks are compressed independently (primed with the end of the previous
+chunk like `pigz`) and concatenated into a single valid deflate stream per file,
+which is written into the zip archive without seeking back in the destination.
+
+"""
+import logging
+import os
+import struct
+import tarfile
+import time
+import zipfile
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Literal, Optional
+
+import fsspec
+
+logger = logging.getLogger(__name__)
+
+
+CHUNK_SIZE = 2**20
+DICT_SIZE = 2**15
+
+EXTENSIONS = {"deflate": ".zip", "store": ".zip", "zstd": ".tar.zst"}
+
+
+def _deflate_chunk(data: bytes, level: int, zdict: Optional[bytes]) -> bytes:
+    kwargs = {"zdict": zdict} if zdict else {}
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS, **kwargs)
+    return compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH)
+
+
+class ParallelDeflate:
+    """Raw deflate compressor compressing chunks concurrently in a thread pool.
+
+    It implements the `compress` and `flush` interface of zlib compressors. Compressed
+    chunks are returned in order as soon as they are ready, with at most `2 * workers`
+    chunks held in memory.
+
+    Parameters
+    ----------
+    executor: ThreadPoolExecutor
+        Pool compressing the chunks, zlib releases the GIL while compressing.
+    level: int
+        Deflate compression level, -1 for the zlib default.
+    workers: int
+        Number of workers of the executor.
+
+    """
+
+    def __init__(self, executor: ThreadPoolExecutor, level: int = -1, workers: int = 1):
+        self._executor = executor
+        self._level = level
+        self._max_pending = 2 * workers
+        self._pending = deque()
+        self._zdict = None
+
+    def compress(self, data: bytes) -> bytes:
+        data = bytes(data)
+        self._pending.append(
+            self._executor.submit(_deflate_chunk, data, self._level, self._zdict)
+        )
+        self._zdict = data[-DICT_SIZE:]
+        out = []
+        while self._pending and (
+            len(self._pending) >= self._max_pending or self._pending[0].done()
+        ):
+            out.append(self._pending.popleft().result())
+        return b"".join(out)
+
+    def flush(self) -> bytes:
+        out = [future.result() for future in self._pending]
+        self._pending.clear()
+        # An empty final block terminates the concatenated stream
+        out.append(zlib.compressobj(self._level, zlib.DEFLATED, -zlib.MAX_WBITS).flush())
+        return b"".join(out)
+
+
+# Size beyond which zip64 records are written, as in zipfile
+ZIP64_LIMIT = (1 << 31) - 1
+
+
+def _dos_datetime(date_time: tuple) -> tuple[int, int]:
+    year, month, day, hour, minute, second = date_time
+    return hour << 11 | minute << 5 | second // 2, (year - 1980) << 9 | month << 5 | day
+
+
+class _ZipWriter:
+    """Streaming zip writer for members compressed by the caller.
+
+    zipfile has no public interface to write data compressed outside of it, so
+    members are written here as a local header, the data and a data descriptor with
+    the crc and sizes, without seeking back in the destination, followed by the
+    central directory. Zip64 records are used for members and archives beyond the
+    zip limits.
+
+    Parameters
+    ----------
+    fileobj: file-like
+        Binary destination, only written to.
+
+    """
+
+    def __init__(self, fileobj):
+        self._fileobj = fileobj
+        self._offset = 0
+        self._members = []
+
+    def _write(self, data: bytes):
+        self._fileobj.write(data)
+        self._offset += len(data)
+
+    def write(self, zinfo: zipfile.ZipInfo, src, compressor=None):
+        """Write a member reading its data from a binary file.
+
+        Parameters
+        ----------
+        zinfo: zipfile.ZipInfo
+            Member info, its compress_type must match the compressor.
+        src: file-like
+            Binary file the member data are read from in chunks.
+        compressor: optional
+            Object with the `compress` and `flush` interface of zlib compressors
+            (e.g., `ParallelDeflate`), data are stored if None.
+
+        """
+        name = zinfo.filename.encode("utf-8")
+        flags = 0x08 | (0x800 if not zinfo.filename.isascii() else 0)
+        zip64 = zinfo.file_size * 1.05 > ZIP64_LIMIT
+        dostime, dosdate = _dos_datetime(zinfo.date_time)
+        header_offset = self._offset
+        if zip64:
+            # Sizes are in the zip64 extra field and the data descriptor
+            extra = struct.pack("<2H2Q", 1, 16, 0, 0)
+            sizes = (0xFFFFFFFF, 0xFFFFFFFF)
+        else:
+            extra = b""
+            sizes = (0, 0)
+        version = 45 if zip64 else 20
+        self._write(
+            struct.pack(
+                "<4s5H3L2H",
+                b"PK\x03\x04",
+                version,
+                flags,
+                zinfo.compress_type,
+                dostime,
+                dosdate,
+                0,
+                *sizes,
+                len(name),
+                len(extra),
+            )
+        )
+        self._write(name + extra)
+        crc = file_size = compress_size = 0
+        while chunk := src.read(CHUNK_SIZE):
+            crc = zlib.crc32(chunk, crc)
+            file_size += len(chunk)
+            data = compressor.compress(chunk) if compressor else chunk
+            compress_size += len(data)
+            self._write(data)
+        if compressor:
+            data = compressor.flush()
+            compress_size += len(data)
+            self._write(data)
+        if not zip64 and max(file_size, compress_size) > ZIP64_LIMIT:
+            raise ValueError(f"{zinfo.filename} grew beyond the zip limit while archived")
+        fmt = "<4s3Q" if zip64 else "<4s3L"
+        self._write(struct.pack(fmt, b"PK\x07\x08", crc, compress_size, file_size))
+        self._members.append(
+            (zinfo, name, flags, version, crc, compress_size, file_size, header_offset)
+        )
+
+    def close(self):
+        """Write the central directory, the archive is complete after this call."""
+        cd_offset = self._offset
+        for member in self._members:
+            zinfo, name, flags, version, crc, compress_size, file_size, offset = member
+            # Values beyond the limit are moved into the zip64 extra field
+            values = [file_size, compress_size, offset]
+            large = [value for value in values if value > ZIP64_LIMIT]
+            extra = b""
+            if large:
+                extra = struct.pack(f"<2H{len(large)}Q", 1, 8 * len(large), *large)
+                version = 45
+            file_size, compress_size, offset = [
+                0xFFFFFFFF if value > ZIP64_LIMIT else value for value in values
+            ]
+            dostime, dosdate = _dos_datetime(zinfo.date_time)
+            self._write(
+                struct.pack(
+                    "<4s4B4HL2L5H2L",
+                    b"PK\x01\x02",
+                    version,
+                    zinfo.create_system,
+                    version,
+                    0,
+                    flags,
+                    zinfo.compress_type,
+                    dostime,
+                    dosdate,
+                    crc,
+                    compress_size,
+                    file_size,
+                    len(name),
+                    len(extra),
+                    0,
+                    0,
+                    0,
+                    zinfo.external_attr,
+                    offset,
+                )
+            )
+            self._write(name + extra)
+        count = len(self._members)
+        cd_size = self._offset - cd_offset
+        if count >= 0xFFFF or cd_size > ZIP64_LIMIT or cd_offset > ZIP64_LIMIT:
+            zip64_offset = self._offset
+            self._write(
+                struct.pack(
+                    "<4sQ2H2L4Q",
+                    b"PK\x06\x06",
+                    44,
+                    45,
+                    45,
+                    0,
+                    0,
+                    count,
+                    count,
+                    cd_size,
+                    cd_offset,
+                )
+            )
+            self._write(struct.pack("<4sLQL", b"PK\x06\x07", 0, zip64_offset, 1))
+        self._write(
+            struct.pack(
+                "<4s4H2LH",
+                b"PK\x05\x06",
+                0,
+                0,
+                min(count, 0xFFFF),
+                min(count, 0xFFFF),
+                min(cd_size, 0xFFFFFFFF),
+                min(cd_offset, 0xFFFFFFFF),
+                0,
+            )
+        )
+
+
+def _files(srcdir: Path) -> list[Path]:
+    return sorted(
+        Path(dirpath) / filename
+        for dirpath, _, filenames in os.walk(srcdir)
+        for filename in filenames
+    )
+
+
+def _write_zip(
+    fileobj, srcdir: Path, files: list[Path], compression: str, level: int, workers: int
+):
+    compress_type = zipfile.ZIP_DEFLATED if compression == "deflate" else zipfile.ZIP_STORED
+    writer = _ZipWriter(fileobj)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for path in files:
+            zinfo = zipfile.ZipInfo.from_file(path, path.relative_to(srcdir).as_posix())
+            zinfo.compress_type = compress_type
+            compressor = None
+            if compress_type == zipfile.ZIP_DEFLATED:
+                compressor = ParallelDeflate(executor, level, workers)
+            with open(path, "rb") as src:
+                writer.write(zinfo, src, compressor)
+    writer.close()
+
+
+def _write_tar_zstd(fileobj, srcdir: Path, files: list[Path], level: int, workers: int):
+    try:
+        import zstandard
+    except ImportError as err:
+        raise ImportError(
+            "zstd compression requires the zstandard package, install with "
+            "`pip install zstandard`"
+        ) from err
+    compressor = zstandard.ZstdCompressor(level=level, threads=workers)
+    with compressor.stream_writer(fileobj, closefd=False) as writer, tarfile.open(
+        fileobj=writer, mode="w|"
+    ) as tar:
+        for path in files:
+            tar.add(path, arcname=path.relative_to(srcdir).as_posix())
+
+
+def archive(
+    srcdir: str | Path,
+    dest: str,
+    compression: Literal["deflate", "store", "zstd"] = "deflate",
+    level: Optional[int] = None,
+    workers: Optional[int] = None,
+) -> dict:
+    """Archive all files in srcdir streaming them into dest.
+
+    Parameters
+    ----------
+    srcdir: str | Path
+        Directory to archive, paths in the archive are relative to it.
+    dest: str
+        Local path or fsspec URL of the archive to write.
+    compression: str
+        `deflate` or `store` to write a zip archive, `zstd` to write a zstandard
+        compressed tar archive (requires the `zstandard` package).
+    level: int, optional
+        Compression level, the default level of the compression is used if None.
+    workers: int, optional
+        Number of threads compressing the data, the number of CPUs if None.
+
+    Returns
+    -------
+    stats: dict
+        Number of files, input and output sizes in bytes, compression ratio, elapsed
+        time in seconds and throughput in MB/s of input data.
+
+    """
+    if compression not in EXTENSIONS:
+        raise ValueError(
+            f"Unknown compression {compression}, must be one of {list(EXTENSIONS)}"
+        )
+    srcdir = Path(srcdir)
+    workers = workers or os.cpu_count() or 1
+    files = _files(srcdir)
+    size = sum(path.stat().st_size for path in files)
+    start = time.perf_counter()
+    with fsspec.open(str(dest), mode="wb") as fileobj:
+        if compression == "zstd":
+            _write_tar_zstd(fileobj, srcdir, files, 3 if level is None else level, workers)
+        else:
+            level = -1 if level is None else level
+            _write_zip(fileobj, srcdir, files, compression, level, workers)
+        compressed_size = fileobj.tell()
+    elapsed = time.perf_counter() - start
+    stats = dict(
+        files=len(files),
+        size=size,
+        compressed_size=compressed_size,
+        ratio=size / compressed_size if compressed_size else 0.0,
+        elapsed=elapsed,
+        throughput=size / 1e6 / elapsed if elapsed else 0.0,
+    )
+    logger.info(
+        f"Archived {stats['files']} files ({size / 1e6:.1f} MB) into {dest} with "
+        f"{compression}: ratio {stats['ratio']:.2f}, {stats['throughput']:.1f} MB/s"
+    )
+    return stats
@@ -6,23 +6,79 @@ from typing import Literal, Optional, Union
 import numpy as np
 import wavespectra
 import xarray as xr
+from scipy.spatial import cKDTree
+from wavespectra.core.attributes import attrs, set_spec_attributes
 from pydantic import Field, model_validator, field_validator
 
+from rompy.core.cache import cached_forcing
 from rompy.core.data import (DataGrid, SourceBase, SourceDatamesh,
-                             SourceDataset, SourceFile, SourceIntake)
+                             SourceDataset, SourceFile, SourceIntake,
+                             _local_mtime)
 from rompy.core.grid import RegularGrid
+from rompy.core.interpolate import apply_weights, cached_weights
 from rompy.core.time import TimeRange
+from rompy.core.validation import offline_validation_enabled
 
 logger = logging.getLogger(__name__)
 
 
-def find_minimum_distance(points: list[tuple[float, float]]) -> float:
+def nearest_distances(
+    x: np.ndarray,
+    y: np.ndarray,
+    metric: Literal["euclidean", "haversine"] = "euclidean",
+) -> np.ndarray:
+    """Distance between each point and its nearest neighbour.
+
+    Parameters
+    ----------
+    x: np.ndarray
+        The x coordinates (longitudes if metric is haversine) of the points.
+    y: np.ndarray
+        The y coordinates (latitudes if metric is haversine) of the points.
+    metric: str
+        Use `euclidean` distances in the coordinates units or `haversine` to compute
+        great-circle distances in degrees from lon/lat coordinates.
+
+    Returns
+    -------
+    distances: np.ndarray
+        Distance from each point to its nearest neighbour, the full distribution can
+        be used to define spacing heuristics, e.g., from percentiles.
+
+    """
+    x = np.asarray(x, dtype=float).ravel()
+    y = np.asarray(y, dtype=float).ravel()
+    if x.size <= 1:
+        return np.full(x.size, np.inf)
+    if metric == "haversine":
+        # Chord distances between unit vectors preserve the nearest neighbour order
+        lon, lat = np.radians(x), np.radians(y)
+        points = np.column_stack(
+            [np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)]
+        )
+    elif metric == "euclidean":
+        points = np.column_stack([x, y])
+    else:
+        raise ValueError(f"Unknown metric {metric}, use 'euclidean' or 'haversine'")
+    distances, _ = cKDTree(points).query(points, k=2)
+    distances = distances[:, 1]
+    if metric == "haversine":
+        distances = np.degrees(2 * np.arcsin(np.clip(distances / 2, 0, 1)))
+    return distances
+
+
+def find_minimum_distance(
+    points: list[tuple[float, float]],
+    metric: Literal["euclidean", "haversine"] = "euclidean",
+) -> float:
     """Find the minimum distance between a set of points.
 
     Parameters
     ----------
     points: list[tuple[float, float]]
         List of points as (x, y) tuples.
+    metric: str
+        Distance metric, see `nearest_distances`.
 
     Returns
     -------
@@ -30,48 +86,10 @@ def find_minimum_distance(points: list[tuple[float, float]]) -> float:
         Minimum distance between all points.
 
     """
-
-    def calculate_distance(x1, y1, x2, y2):
-        return np.sqrt((x2 - x1) ** 2 + (y2 - y1) ** 2)
-
-    n = len(points)
-    if n <= 1:
+    if len(points) <= 1:
         return float("inf")
-
-    # Sort points by x-coordinate
-    points.sort()
-
-    # Recursive step
-    if n == 2:
-        return calculate_distance(*points[0], *points[1])
-
-    mid = n // 2
-    left_points = points[:mid]
-    right_points = points[mid:]
-
-    # Divide and conquer
-    left_min = find_minimum_distance(left_points)
-    right_min = find_minimum_distance(right_points)
-
-    min_distance = min(left_min, right_min)
-
-    # Find the closest pair across the dividing line
-    strip = []
-    for point in points:
-        if abs(point[0] - points[mid][0]) < min_distance:
-            strip.append(point)
-
-    strip_min = min_distance
-    strip_len = len(strip)
-    for i in range(strip_len - 1):
-        j = i + 1
-        while j < strip_len and (strip[j][1] - strip[i][1]) < strip_min:
-            distance = calculate_distance(*strip[i], *strip[j])
-            if distance < strip_min:
-                strip_min = distance
-            j += 1
-
-    return min(min_distance, strip_min)
+    x, y = np.asarray(points, dtype=float).T
+    return float(nearest_distances(x, y, metric=metric).min())
 
 
 class SourceWavespectra(SourceBase):
@@ -93,6 +111,9 @@ class SourceWavespectra(SourceBase):
     def __str__(self) -> str:
         return f"SourceWavespectra(uri={self.uri}, reader={self.reader})"
 
+    def _cache_key(self) -> str:
+        return f"{super()._cache_key()}:{_local_mtime(self.uri)}"
+
     def _open(self):
         return getattr(wavespectra, self.reader)(self.uri, **self.kwargs)
 
@@ -183,12 +204,45 @@ class DataBoundary(DataGrid):
     def _sel_boundary(self, grid) -> xr.Dataset:
         """Select the boundary points from the dataset."""
         xbnd, ybnd = self._boundary_points(grid=grid)
+        if self._sparse_interp_supported():
+            return self._sel_boundary_sparse(xbnd, ybnd)
         coords = {
             self.coords.x: xr.DataArray(xbnd, dims=("site",)),
             self.coords.y: xr.DataArray(ybnd, dims=("site",)),
         }
         return getattr(self.ds, self.sel_method)(coords, **self.sel_method_kwargs)
 
+    def _sparse_interp_supported(self) -> bool:
+        """Check if the selection can use the precomputed bilinear weights.
+
+        Only linear `interp` on rectilinear datasets with numeric variables is
+        supported, any other selection falls back to the xarray method.
+
+        """
+        if self.sel_method != "interp":
+            return False
+        if self.sel_method_kwargs not in ({}, {"method": "linear"}):
+            return False
+        ds = self.ds
+        x, y = self.coords.x, self.coords.y
+        if x not in ds.dims or y not in ds.dims or ds[x].size < 2 or ds[y].size < 2:
+            return False
+        for darr in ds.data_vars.values():
+            if {x, y} & set(darr.dims) and not np.issubdtype(darr.dtype, np.number):
+                return False
+        return True
+
+    def _sel_boundary_sparse(self, xbnd: np.ndarray, ybnd: np.ndarray) -> xr.Dataset:
+        """Interpolate the boundary points with cached sparse bilinear weights."""
+        ds = self.ds
+        x, y = self.coords.x, self.coords.y
+        weights = cached_weights(
+            "bilinear_weights", ds[x].values, ds[y].values, xbnd, ybnd
+        )
+        dsout = apply_weights(ds, weights, src_dims=[y, x], dim="site")
+        return dsout.assign_coords({x: ("site", xbnd), y: ("site", ybnd)})
+
+    @cached_forcing
     def get(
         self, destdir: str | Path, grid: RegularGrid, time: Optional[TimeRange] = None
     ) -> str:
@@ -272,11 +326,28 @@ class BoundaryWaveStation(DataBoundary):
 
     @model_validator(mode="after")
     def assert_has_wavespectra_accessor(self) -> "BoundaryWaveStation":
-        dset = self.source.open()
-        if not hasattr(dset, "spec"):
-            raise ValueError(f"Wavespectra compatible source is required")
+        """Ensure the source provides wavespectra data from its metadata only.
+
+        The check is deferred until the dataset is opened if the source cannot be
+        inspected without reading data or if offline validation is enabled.
+
+        """
+        if offline_validation_enabled():
+            return self
+        variables = self.source._probe_variables()
+        if variables is not None:
+            rename = self.filter.rename or {}
+            self._check_wavespectra_variables([rename.get(v, v) for v in variables])
         return self
 
+    def _check_wavespectra_variables(self, variables: list[str]):
+        """Raise if the spectra variable is missing from the (renamed) variables."""
+        if attrs.SPECNAME not in variables:
+            raise ValueError(
+                f"Wavespectra compatible source is required, {attrs.SPECNAME} not "
+                f"found in variables {variables}"
+            )
+
     def _source_grid_spacing(self, grid) -> float:
         """Return the lowest spacing between points in the source dataset."""
         # Select dataset points just outside the actual grid to optimise the search
@@ -285,10 +356,15 @@ class BoundaryWaveStation(DataBoundary):
         dy = np.diff(ybnd).min()
         buffer = 2 * min(dx, dy)
         x0, y0, x1, y1 = grid.bbox(buffer=buffer)
-        ds = self.ds.spec.sel([x0, x1], [y0, y1], method="bbox")
-        # Return the closest distance between adjacent points in cropped dataset
-        points = list(zip(ds.lon.values, ds.lat.values))
-        return find_minimum_distance(points)
+        try:
+            ds = self.ds.spec.sel([x0, x1], [y0, y1], method="bbox")
+        except ValueError:
+            # Raised by wavespectra when no site is found within the bbox
+            logger.warning(f"No source sites found within {[x0, y0, x1, y1]}")
+            return float("inf")
+        # Return the closest distance between adjacent points in cropped dataset,
+        # infinite if there are not at least two points around the grid
+        return find_minimum_distance(list(zip(ds.lon.values, ds.lat.values)))
 
     def _set_spacing(self, grid) -> float:
         """Define spacing from the parent dataset if required."""
@@ -309,6 +385,8 @@ class BoundaryWaveStation(DataBoundary):
     def _sel_boundary(self, grid) -> xr.Dataset:
         """Select the boundary points from the dataset."""
         xbnd, ybnd = self._boundary_points(grid=grid)
+        if self._sparse_idw_supported():
+            return self._sel_boundary_idw(xbnd, ybnd)
         ds = self.ds.spec.sel(
             lons=xbnd,
             lats=ybnd,
@@ -317,14 +395,55 @@ class BoundaryWaveStation(DataBoundary):
         )
         return ds
 
+    def _sparse_idw_supported(self) -> bool:
+        """Check if the selection can use the precomputed idw weights.
+
+        Only `idw` with the `tolerance` and `max_sites` options on station datasets
+        where all variables are numeric and defined over sites is supported, any other
+        selection falls back to the wavespectra method.
+
+        """
+        if self.sel_method != "idw":
+            return False
+        if set(self.sel_method_kwargs) - {"tolerance", "max_sites"}:
+            return False
+        ds = self.ds
+        if "site" not in ds.dims or "lon" in ds.dims or "lat" in ds.dims:
+            return False
+        for darr in ds.data_vars.values():
+            if "site" not in darr.dims or not np.issubdtype(darr.dtype, np.number):
+                return False
+        return True
+
+    def _sel_boundary_idw(self, xbnd: np.ndarray, ybnd: np.ndarray) -> xr.Dataset:
+        """Interpolate the boundary points with cached sparse idw weights.
+
+        Equivalent to `ds.spec.sel(method="idw")` but the neighbours and weights are
+        only computed once for each set of source and boundary points.
+
+        """
+        ds = self.ds
+        kwargs = {"tolerance": 2.0, "max_sites": 4, **self.sel_method_kwargs}
+        weights = cached_weights(
+            "idw_weights", ds.lon.values, ds.lat.values, xbnd, ybnd, **kwargs
+        )
+        dsout = apply_weights(ds, weights, src_dims=["site"], dim="site")
+        dsout["site"] = np.arange(len(xbnd))
+        dsout["lon"] = ("site", np.asarray(xbnd))
+        dsout["lat"] = ("site", np.asarray(ybnd))
+        set_spec_attributes(dsout)
+        return dsout
+
     @property
     def ds(self):
         """Return the filtered xarray dataset instance."""
         dset = super().ds
+        self._check_wavespectra_variables(list(dset.variables))
         if dset.efth.size == 0:
             raise ValueError(f"Empty dataset after applying filter {self.filter}")
         return dset
 
+    @cached_forcing
     def get(
         self, destdir: str | Path, grid: RegularGrid, time: Optional[TimeRange] = None
     ) -> str:
@@ -0,0 +1,436 @@
+"""Rompy caching utilities."""
+import functools
+import hashlib
+import inspect
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Hashable, Optional
+
+import numpy as np
+
+from rompy.core.profiling import profile_stage
+
+logger = logging.getLogger(__name__)
+
+
+class LRUCache:
+    """Thread-safe least-recently-used mapping bounded by the number of entries.
+
+    Parameters
+    ----------
+    maxsize: int
+        Maximum number of entries to keep, the least recently used entries are
+        evicted once this size is exceeded. A maxsize of 0 disables the cache.
+
+    """
+
+    def __init__(self, maxsize: int = 16):
+        self._maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.RLock()
+
+    @property
+    def maxsize(self) -> int:
+        return self._maxsize
+
+    @maxsize.setter
+    def maxsize(self, value: int):
+        with self._lock:
+            self._maxsize = value
+            self._evict()
+
+    def _evict(self):
+        while len(self._data) > max(self._maxsize, 0):
+            key, _ = self._data.popitem(last=False)
+            logger.debug(f"Evicting {key} from cache")
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the value for key moving it to the most recently used position."""
+        with self._lock:
+            if key not in self._data:
+                return default
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def put(self, key: Hashable, value: Any):
+        """Insert value under key evicting the least recently used entries."""
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            self._evict()
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Remove key from the cache and return its value."""
+        with self._lock:
+            return self._data.pop(key, default)
+
+    def clear(self):
+        """Remove all entries from the cache."""
+        with self._lock:
+            self._data.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._data
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+def _encode(value: Any, basedir: Path) -> Any:
+    """Encode the return value of a forcing get method into JSON compatible types.
+
+    Paths under basedir are stored relative to it so they can be rebased onto any
+    destination directory when the value is restored from the cache.
+
+    """
+    if isinstance(value, Path):
+        return {"__path__": Path(value).relative_to(basedir).as_posix()}
+    elif isinstance(value, tuple):
+        return {"__tuple__": [_encode(v, basedir) for v in value]}
+    elif isinstance(value, list):
+        return [_encode(v, basedir) for v in value]
+    elif isinstance(value, dict):
+        return {k: _encode(v, basedir) for k, v in value.items()}
+    elif value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    raise TypeError(f"Cannot cache value of type {type(value)}")
+
+
+def _decode(value: Any, basedir: Path) -> Any:
+    """Decode a value encoded with `_encode` rebasing paths onto basedir."""
+    if isinstance(value, dict) and "__path__" in value:
+        return Path(basedir) / value["__path__"]
+    elif isinstance(value, dict) and "__tuple__" in value:
+        return tuple(_decode(v, basedir) for v in value["__tuple__"])
+    elif isinstance(value, list):
+        return [_decode(v, basedir) for v in value]
+    elif isinstance(value, dict):
+        return {k: _decode(v, basedir) for k, v in value.items()}
+    return value
+
+
+def _link_or_copy(src: Path, dest: Path):
+    """Hardlink src into dest falling back to a copy across filesystems."""
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    if dest.is_symlink() or dest.exists():
+        dest.unlink()
+    try:
+        os.link(src, dest)
+    except OSError:
+        shutil.copy2(src, dest)
+
+
+def grid_fingerprint(grid) -> Optional[str]:
+    """Hash identifying the content of a grid object."""
+    if grid is None:
+        return None
+    if hasattr(grid, "fingerprint"):
+        return grid.fingerprint
+    sha = hashlib.sha256(grid.__class__.__name__.encode())
+    for coord in (getattr(grid, "x", None), getattr(grid, "y", None)):
+        if coord is not None:
+            sha.update(np.ascontiguousarray(coord).tobytes())
+    return sha.hexdigest()
+
+
+class ForcingCache:
+    """Persistent content-addressed cache of generated forcing files.
+
+    Each entry is identified by a fingerprint of everything that defines the files
+    written by a data object (source, filter, grid, time range and writer options).
+    On a hit, previously written files are hardlinked (or copied across filesystems)
+    into the destination directory instead of being regenerated.
+
+    Parameters
+    ----------
+    root: str | Path
+        Directory where cache entries are stored.
+    max_size: int, optional
+        Maximum size of the cache in bytes, the least recently used entries are
+        evicted once this size is exceeded. No limit if not provided.
+
+    Note
+    ----
+    Files are hardlinked from the cache so they should not be modified in place in
+    the destination directory.
+
+    """
+
+    def __init__(self, root: str | Path, max_size: Optional[int] = None):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def fingerprint(*parts) -> str:
+        """Stable hash of the parts defining a cache entry."""
+        data = json.dumps(parts, sort_keys=True, default=str)
+        return hashlib.sha256(data.encode()).hexdigest()
+
+    def _entry(self, key: str) -> Path:
+        return self.root / key[:2] / key
+
+    def fetch(self, key: str, destdir: str | Path) -> tuple[bool, Any]:
+        """Link the files of the cache entry into destdir.
+
+        Parameters
+        ----------
+        key: str
+            Fingerprint of the cache entry.
+        destdir: str | Path
+            Directory to link the cached files into.
+
+        Returns
+        -------
+        hit: bool
+            Whether the entry was found in the cache.
+        value: Any
+            The value returned by the method that generated the cached files, with
+            paths rebased onto destdir.
+
+        """
+        try:
+            value = self._restore(key, destdir)
+        except (OSError, ValueError, KeyError):
+            with self._lock:
+                self.misses += 1
+            return False, None
+        with self._lock:
+            self.hits += 1
+        return True, value
+
+    def files(self, key: str) -> list[str]:
+        """Names of the files of the cache entry."""
+        return json.loads((self._entry(key) / "meta.json").read_text())["files"]
+
+    def _restore(self, key: str, destdir: str | Path) -> Any:
+        entry = self._entry(key)
+        meta = entry / "meta.json"
+        record = json.loads(meta.read_text())
+        for name in record["files"]:
+            _link_or_copy(entry / "files" / name, Path(destdir) / name)
+        os.utime(meta)
+        return _decode(record["value"], Path(destdir))
+
+    def store(self, key: str, srcdir: str | Path, value: Any):
+        """Move all files written in srcdir into a new cache entry.
+
+        Parameters
+        ----------
+        key: str
+            Fingerprint of the cache entry.
+        srcdir: str | Path
+            Directory with the generated files, files are moved into the cache.
+        value: Any
+            The value returned by the method that generated the files.
+
+        """
+        srcdir = Path(srcdir)
+        files = sorted(
+            p.relative_to(srcdir).as_posix() for p in srcdir.rglob("*") if p.is_file()
+        )
+        record = dict(
+            value=_encode(value, srcdir),
+            files=files,
+            size=sum((srcdir / f).stat().st_size for f in files),
+        )
+        entry = self._entry(key)
+        entry.parent.mkdir(parents=True, exist_ok=True)
+        tmp = Path(tempfile.mkdtemp(dir=entry.parent, prefix=".tmp-"))
+        shutil.move(srcdir, tmp / "files")
+        (tmp / "meta.json").write_text(json.dumps(record))
+        try:
+            os.replace(tmp, entry)
+        except OSError:
+            # Entry written concurrently by another process
+            shutil.rmtree(tmp, ignore_errors=True)
+        self.evict(keep=entry)
+
+    def _entries(self) -> list[tuple[float, int, Path]]:
+        entries = []
+        for meta in self.root.glob("*/*/meta.json"):
+            try:
+                size = json.loads(meta.read_text())["size"]
+                entries.append((meta.stat().st_mtime, size, meta.parent))
+            except (OSError, ValueError, KeyError):
+                continue
+        return sorted(entries)
+
+    @property
+    def size(self) -> int:
+        """Total size of the cached files in bytes."""
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self, keep: Optional[Path] = None):
+        """Remove least recently used entries until the cache fits in max_size.
+
+        Parameters
+        ----------
+        keep: Path, optional
+            Entry directory that should never be evicted, e.g., the one just stored.
+
+        """
+        if self.max_size is None:
+            return
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in entries:
+            if total <= self.max_size:
+                break
+            if entry == keep:
+                continue
+            logger.debug(f"Evicting {entry.name} from forcing cache")
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+
+    def clear(self):
+        """Remove all entries from the cache."""
+        for _, _, entry in self._entries():
+            shutil.rmtree(entry, ignore_errors=True)
+
+    def stats(self) -> dict:
+        """Hit and miss statistics of this cache instance."""
+        entries = self._entries()
+        return dict(
+            hits=self.hits,
+            misses=self.misses,
+            entries=len(entries),
+            size=sum(size for _, size, _ in entries),
+        )
+
+    def __repr__(self):
+        return f"ForcingCache(root={self.root}, max_size={self.max_size})"
+
+
+_FORCING_CACHE = None
+
+
+def set_forcing_cache(
+    root: Optional[str | Path] = None, max_size: Optional[int] = None
+) -> Optional[ForcingCache]:
+    """Define the forcing cache used by data objects, disable it if root is None.
+
+    Parameters
+    ----------
+    root: str | Path, optional
+        Directory where cache entries are stored, the cache is disabled if None.
+    max_size: int, optional
+        Maximum size of the cache in bytes.
+
+    """
+    global _FORCING_CACHE
+    _FORCING_CACHE = ForcingCache(root, max_size=max_size) if root else None
+    return _FORCING_CACHE
+
+
+def forcing_cache() -> Optional[ForcingCache]:
+    """Return the active forcing cache.
+
+    The cache is disabled by default, it can be enabled with `set_forcing_cache` or
+    by setting the `ROMPY_FORCING_CACHE` environment variable to the cache directory
+    (and optionally `ROMPY_FORCING_CACHE_SIZE` to the maximum size in bytes).
+
+    """
+    if _FORCING_CACHE is None and os.environ.get("ROMPY_FORCING_CACHE"):
+        size = os.environ.get("ROMPY_FORCING_CACHE_SIZE")
+        set_forcing_cache(
+            os.environ["ROMPY_FORCING_CACHE"], max_size=int(size) if size else None
+        )
+    return _FORCING_CACHE
+
+
+def _move_files(srcdir: Path, destdir: Path) -> list[str]:
+    """Move all files in srcdir into destdir returning their relative names."""
+    names = []
+    for path in sorted(p for p in srcdir.rglob("*") if p.is_file()):
+        name = path.relative_to(srcdir).as_posix()
+        (destdir / name).parent.mkdir(parents=True, exist_ok=True)
+        os.replace(path, destdir / name)
+        names.append(name)
+    return names
+
+
+def cached_forcing(get: Callable) -> Callable:
+    """Decorate the get method of a data object to use the forcing cache.
+
+    The decorated method must take the destination directory as its first argument
+    and the instance must implement `_forcing_fingerprint(grid, time)` returning the
+    cache key or None if the data object cannot be cached, from the `grid` and `time`
+    arguments of the method if it has them. Any other arguments are also included in
+    the cache key.
+
+    The written files are also recorded in the active manifest (see
+    `rompy.core.manifest`) so they are not regenerated in incremental generations if
+    their fingerprint did not change.
+
+    """
+
+    signature = inspect.signature(get)
+
+    @functools.wraps(get)
+    def wrapper(self, destdir, *args, **kwargs):
+        with profile_stage("get", self.id):
+            return _cached_get(get, signature, self, destdir, args, kwargs)
+
+    return wrapper
+
+
+def _cached_get(
+    get: Callable, signature: inspect.Signature, data, destdir, args, kwargs
+):
+    """Run the get method of data through the forcing cache and active manifest."""
+    from rompy.core.manifest import active_manifest
+
+    cache = forcing_cache()
+    manifest = active_manifest()
+    key = None
+    if cache is not None or manifest is not None:
+        bound = signature.bind(data, destdir, *args, **kwargs)
+        bound.apply_defaults()
+        params = dict(list(bound.arguments.items())[2:])
+        grid, time = params.pop("grid", None), params.pop("time", None)
+        key = data._forcing_fingerprint(grid, time)
+        if key is not None and params:
+            key = ForcingCache.fingerprint(key, params)
+    if key is None:
+        return get(data, destdir, *args, **kwargs)
+    destdir = Path(destdir)
+    name = f"forcing:{data.__class__.__name__}:{data.id}"
+    if manifest is not None:
+        current, value = manifest.fetch(name, key, destdir)
+        if current:
+            logger.info(f"Skipping unchanged forcing for {data.id} ({key[:12]})")
+            return value
+    if cache is None:
+        # Files are written aside first to know which ones belong to this object
+        destdir.mkdir(parents=True, exist_ok=True)
+        with tempfile.TemporaryDirectory(dir=destdir, prefix=".tmp-") as tmpdir:
+            value = get(data, Path(tmpdir), *args, **kwargs)
+            value = _decode(_encode(value, Path(tmpdir)), destdir)
+            files = _move_files(Path(tmpdir), destdir)
+    else:
+        hit, value = cache.fetch(key, destdir)
+        if hit:
+            logger.info(f"Using cached forcing for {data.id} ({key[:12]})")
+        else:
+            with tempfile.TemporaryDirectory(dir=cache.root, prefix=".tmp-") as tmpdir:
+                srcdir = Path(tmpdir) / "files"
+                srcdir.mkdir()
+                value = get(data, srcdir, *args, **kwargs)
+                cache.store(key, srcdir, value)
+            value = cache._restore(key, destdir)
+        files = cache.files(key)
+    if manifest is not None:
+        manifest.record(
+            name, key, [destdir / f for f in files], value=value, destdir=destdir
+        )
+    return value
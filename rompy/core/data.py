@@ -1,31 +1,47 @@
 """Rompy core data objects."""
 import logging
+import os
 from abc import ABC, abstractmethod
 from datetime import timedelta
 from pathlib import Path
 from shutil import copytree
-from typing import Literal, Optional, Union
+from typing import TYPE_CHECKING, Literal, Optional, Union
 import fsspec
 
-import cartopy.crs as ccrs
-import cartopy.feature as cfeature
-import intake
-from intake.catalog.local import YAMLFileCatalog
-import matplotlib.pyplot as plt
 import numpy as np
 import xarray as xr
 from cloudpathlib import AnyPath
-from intake.catalog import Catalog
-from oceanum.datamesh import Connector
 from pydantic import ConfigDict, Field, PrivateAttr, model_validator
 
-from rompy.core.filters import Filter
+from rompy.core.cache import (ForcingCache, LRUCache, cached_forcing,
+                              grid_fingerprint)
+from rompy.core.filters import Filter, FilterPlan
 from rompy.core.grid import BaseGrid, RegularGrid
+from rompy.core.interpolate import regrid
+from rompy.core.profiling import profile_stage
 from rompy.core.time import TimeRange
 from rompy.core.types import DatasetCoords, RompyBaseModel, Slice
 
+if TYPE_CHECKING:
+    from intake.catalog import Catalog
+    from oceanum.datamesh import Connector
+
 logger = logging.getLogger(__name__)
 
+# Opened and filtered datasets shared by all DataGrid instances
+DATASET_CACHE = LRUCache(maxsize=int(os.environ.get("ROMPY_DATASET_CACHE_SIZE", 16)))
+
+# Names of the data variables in source files, used to drop unneeded variables on open
+DATA_VARS_CACHE = LRUCache(maxsize=64)
+
+
+def _local_mtime(uri: str | Path) -> Optional[int]:
+    """Modification time of uri if it is an existing local path, None otherwise."""
+    try:
+        return os.stat(uri).st_mtime_ns
+    except (OSError, TypeError, ValueError):
+        return None
+
 
 class SourceBase(RompyBaseModel, ABC):
     """Abstract base class for a source dataset."""
@@ -39,9 +55,43 @@ class SourceBase(RompyBaseModel, ABC):
         """This abstract private method should return a xarray dataset object."""
         pass
 
+    def _cache_key(self) -> Optional[str]:
+        """String uniquely identifying the dataset returned by this source.
+
+        Sources whose dataset cannot be identified reliably return None so the
+        datasets opened from them are not cached.
+
+        """
+        return f"{self.__class__.__name__}:{self.model_dump_json()}"
+
+    def _fingerprint(self) -> Optional[str]:
+        """String identifying the source across sessions, None if not persistent."""
+        return self._cache_key()
+
+    def _probe_variables(self) -> Optional[list[str]]:
+        """Variable names in the source from metadata only.
+
+        Sources that cannot be inspected without reading the actual data return None
+        so checks on their variables are deferred until the data are opened.
+
+        """
+        return None
+
+    def _open_plan(self, plan: FilterPlan) -> xr.Dataset:
+        """Open the dataset reading only what the filter plan requires.
+
+        Subclasses able to skip variables or data when opening override this method,
+        the select stage of the plan is applied to the returned dataset regardless.
+
+        """
+        return self._open()
+
     def open(self, variables: list = [], filters: Filter = {}, **kwargs) -> xr.Dataset:
         """Return the filtered dataset object.
 
+        The variable selection and crop of the filters are pushed down into the open
+        stage and applied lazily before any other filter, see `Filter.explain`.
+
         Parameters
         ----------
         variables : list, optional
@@ -55,11 +105,13 @@ class SourceBase(RompyBaseModel, ABC):
         arguments to the open method.
 
         """
-        ds = self._open()
-        if variables:
-            ds = ds[variables]
-        if filters:
-            ds = filters(ds)
+        if not isinstance(filters, Filter):
+            filters = Filter(**(filters or {}))
+        plan = filters.compile(variables)
+        with profile_stage("open"):
+            ds = plan.select(self._open_plan(plan))
+        with profile_stage("filter"):
+            ds = plan.transform(ds)
         return ds
 
 
@@ -78,6 +130,18 @@ class SourceDataset(SourceBase):
     def __str__(self) -> str:
         return f"SourceDataset(obj={self.obj})"
 
+    def _cache_key(self) -> Optional[str]:
+        # The id of the object can be reused by another dataset once it is freed, and
+        # the dataset is in memory already so there is nothing to save by caching it
+        return None
+
+    def _fingerprint(self) -> Optional[str]:
+        # In-memory datasets cannot be identified across sessions
+        return None
+
+    def _probe_variables(self) -> Optional[list[str]]:
+        return list(self.obj.variables)
+
     def _open(self) -> xr.Dataset:
         return self.obj
 
@@ -98,9 +162,30 @@ class SourceFile(SourceBase):
     def __str__(self) -> str:
         return f"SourceFile(uri={self.uri})"
 
+    def _cache_key(self) -> str:
+        return f"{super()._cache_key()}:{_local_mtime(self.uri)}"
+
     def _open(self) -> xr.Dataset:
         return xr.open_dataset(self.uri, **self.kwargs)
 
+    def _open_plan(self, plan: FilterPlan) -> xr.Dataset:
+        required = plan.required_variables
+        if required is None or "drop_variables" in self.kwargs:
+            return self._open()
+        # Variables not needed are not decoded nor read at all
+        data_vars = DATA_VARS_CACHE.get(self._cache_key())
+        if data_vars is None:
+            with self._open() as dset:
+                data_vars = list(dset.data_vars)
+            DATA_VARS_CACHE.put(self._cache_key(), data_vars)
+        drop = [v for v in data_vars if v not in required]
+        return xr.open_dataset(self.uri, drop_variables=drop, **self.kwargs)
+
+    def _probe_variables(self) -> Optional[list[str]]:
+        # Data are loaded lazily so this only reads the file metadata
+        with self._open() as dset:
+            return list(dset.variables)
+
 
 class SourceIntake(SourceBase):
     """Source dataset from intake catalog.
@@ -143,8 +228,11 @@ class SourceIntake(SourceBase):
         return f"SourceIntake(catalog_uri={self.catalog_uri}, dataset_id={self.dataset_id})"
 
     @property
-    def catalog(self) -> Catalog:
+    def catalog(self) -> "Catalog":
         """The intake catalog instance."""
+        import intake
+        from intake.catalog.local import YAMLFileCatalog
+
         if self.catalog_uri:
             return intake.open_catalog(self.catalog_uri)
         else:
@@ -156,6 +244,10 @@ class SourceIntake(SourceBase):
     def _open(self) -> xr.Dataset:
         return self.catalog[self.dataset_id](**self.kwargs).to_dask()
 
+    def _probe_variables(self) -> Optional[list[str]]:
+        # Intake opens the dataset lazily as dask arrays, only metadata are read
+        return list(self._open().variables)
+
 
 class SourceDatamesh(SourceBase):
     """Source dataset from Datamesh.
@@ -183,8 +275,10 @@ class SourceDatamesh(SourceBase):
         return f"SourceDatamesh(datasource={self.datasource})"
 
     @property
-    def connector(self) -> Connector:
+    def connector(self) -> "Connector":
         """The Datamesh connector instance."""
+        from oceanum.datamesh import Connector
+
         return Connector(token=self.token, **self.kwargs)
 
     def _geofilter(self, filters: Filter, coords: DatasetCoords) -> dict:
@@ -250,13 +344,15 @@ class SourceDatamesh(SourceBase):
         be converted to a geofilter and timefilter for querying Datamesh.
 
         """
-        ds = self._open(
-            variables=variables,
-            geofilter=self._geofilter(filters, coords),
-            timefilter=self._timefilter(filters, coords),
-        )
-        if filters:
-            ds = filters(ds)
+        with profile_stage("open"):
+            ds = self._open(
+                variables=variables,
+                geofilter=self._geofilter(filters, coords),
+                timefilter=self._timefilter(filters, coords),
+            )
+        with profile_stage("filter"):
+            if filters:
+                ds = filters(ds)
         return ds
 
 
@@ -366,10 +462,18 @@ class DataGrid(DataBlob):
         default=[0, 0],
         description="Number of source data timesteps to buffer the time range if `filter_time` is True",
     )
+    regrid: Optional[Literal["bilinear", "nearest", "conservative"]] = Field(
+        default=None,
+        description=(
+            "Interpolate the data onto the model grid passed to the get method with "
+            "this method, `conservative` (e.g., for precipitation) requires a regular "
+            "model grid. Weights are cached on disk for each source and model grid"
+        ),
+    )
+    _ds_key: Optional[tuple] = PrivateAttr(default=None)
 
-    def _filter_grid(self, grid: GRID_TYPES):
-        """Define the filters to use to extract data to this grid"""
-        x0, y0, x1, y1 = grid.bbox(buffer=self.buffer)
+    def _crop_grid(self, grid: GRID_TYPES, buffer: float):
+        x0, y0, x1, y1 = grid.bbox(buffer=buffer)
         self.filter.crop.update(
             {
                 self.coords.x: Slice(start=x0, stop=x1),
@@ -377,6 +481,30 @@ class DataGrid(DataBlob):
             }
         )
 
+    def _filter_grid(self, grid: GRID_TYPES):
+        """Define the filters to use to extract data to this grid"""
+        self._crop_grid(grid, self.buffer)
+        if self.regrid is not None:
+            # Extend the crop by the source resolution so it brackets all model nodes
+            coords = (self.coords.x, self.coords.y)
+            ds = self.ds
+            if min(ds[coord].size for coord in coords) < 2:
+                # Too few points within the crop, use the resolution of the source
+                filters = self.filter.model_copy(deep=True)
+                for coord in coords:
+                    filters.crop.pop(coord)
+                ds = self.source.open(
+                    variables=self.variables, filters=filters, coords=self.coords
+                )
+            spacing = max(
+                np.abs(np.diff(ds[coord].values)).max(initial=0.0) for coord in coords
+            )
+            if spacing == 0:
+                raise ValueError(
+                    f"Cannot regrid {self.id} from a single source point in {coords}"
+                )
+            self._crop_grid(grid, self.buffer + 2 * spacing)
+
     def _filter_time(self, time: TimeRange, end_buffer=1):
         """Define the filters to use to extract data to this grid"""
         start = time.start
@@ -393,13 +521,64 @@ class DataGrid(DataBlob):
                 end += python_timedelta * self.time_buffer[1]
         self.filter.crop.update({self.coords.t: Slice(start=start, stop=end)})
 
+    def _dataset_key(self) -> Optional[tuple]:
+        """Key identifying the filtered dataset in the dataset cache.
+
+        None if the datasets of the source are not cached.
+
+        """
+        source = self.source._cache_key()
+        if source is None:
+            return None
+        return (
+            source,
+            tuple(self.variables),
+            str(self.filter),
+            self.coords.model_dump_json(),
+        )
+
+    def _forcing_fingerprint(
+        self, grid: Optional[GRID_TYPES] = None, time: Optional[TimeRange] = None
+    ) -> Optional[str]:
+        """Key identifying the files written by `get` in the forcing cache."""
+        source = self.source._fingerprint()
+        if source is None:
+            return None
+        return ForcingCache.fingerprint(
+            self.__class__.__name__,
+            source,
+            self.model_dump_json(exclude={"source"}),
+            grid_fingerprint(grid),
+            time.model_dump_json() if time is not None else None,
+        )
+
     @property
     def ds(self):
-        """Return the xarray dataset for this data source."""
-        ds = self.source.open(
-            variables=self.variables, filters=self.filter, coords=self.coords
-        )
-        return ds
+        """Return the xarray dataset for this data source.
+
+        The filtered dataset is cached so the source is only opened once for each
+        combination of source, variables, filter and coords. The cached entry is
+        dropped as soon as any of these change, e.g., when the crop filter is updated
+        from the grid or time objects. Datasets of sources without a cache key, e.g.,
+        in-memory datasets, are filtered again on each access.
+
+        """
+        key = self._dataset_key()
+        if self._ds_key is not None and self._ds_key != key:
+            DATASET_CACHE.pop(self._ds_key)
+        self._ds_key = key
+        if key is None:
+            return self.source.open(
+                variables=self.variables, filters=self.filter, coords=self.coords
+            )
+        ds = DATASET_CACHE.get(key)
+        if ds is None:
+            ds = self.source.open(
+                variables=self.variables, filters=self.filter, coords=self.coords
+            )
+            DATASET_CACHE.put(key, ds)
+        # Shallow copy so callers cannot modify the cached dataset in place
+        return ds.copy(deep=False)
 
     def _figsize(self, x0, x1, y0, y1, fscale):
         xlen = abs(x1 - x0)
@@ -424,6 +603,9 @@ class DataGrid(DataBlob):
         **kwargs,
     ):
         """Plot the grid."""
+        import cartopy.crs as ccrs
+        import cartopy.feature as cfeature
+        import matplotlib.pyplot as plt
 
         projection = ccrs.PlateCarree()
         transform = ccrs.PlateCarree()
@@ -481,6 +663,7 @@ class DataGrid(DataBlob):
     def outfile(self) -> str:
         return f"{self.id}.nc"
 
+    @cached_forcing
     def get(
         self,
         destdir: str | Path,
@@ -510,5 +693,9 @@ class DataGrid(DataBlob):
             if time is not None:
                 self._filter_time(time)
         outfile = Path(destdir) / self.outfile
-        self.ds.to_netcdf(outfile)
+        ds = self.ds
+        if self.regrid is not None and grid is not None:
+            ds = regrid(ds, grid, self.regrid, x=self.coords.x, y=self.coords.y)
+        with profile_stage("write"):
+            ds.to_netcdf(outfile)
         return outfile
@@ -1,214 +1,755 @@
-# -----------------------------------------------------------------------------
-# Copyright (c) 2020 - 2021, CSIRO
-#
-# All rights reserved.
-#
-# The full license is in the LICENSE file, distributed with this software.
-# -----------------------------------------------------------------------------
-
-from typing import Optional
-
-import xarray as xr
-
-from .types import RompyBaseModel, Slice
-
-from pydantic import field_validator
-
-
-# pydantic class to apply all the filters to the dataset
-class Filter(RompyBaseModel):
-    sort: Optional[dict] = {}
-    subset: Optional[dict] = {}
-    crop: Optional[dict] = {}
-    timenorm: Optional[dict] = {}
-    rename: Optional[dict] = {}
-    derived: Optional[dict] = {}
-
-    @field_validator("crop", mode="before")
-    def convert_slices(cls, v):
-        for key, value in v.items():
-            if isinstance(value, slice):
-                v[key] = Slice.from_slice(value)
-            if isinstance(value, dict):
-                v[key] = Slice.from_dict(value)
-        return v
-
-    def __call__(self, ds):
-        filters = get_filter_fns()
-        for fn in filters:
-            params = getattr(self, fn)
-            if params:
-                ds = filters[fn](ds, **params)
-        return ds
-
-    def __repr__(self):
-        return self.__str__()
-
-    def __str__(self):
-        return f"Filter(sort={self.sort}, subset={self.subset}, crop={self.crop}, timenorm={self.timenorm}, rename={self.rename}, derived={self.derived})"
-
-
-def derived_filter(ds, derived_variables):
-    """Add derived variable to Dataset.
-
-    Parameters
-    ----------
-    ds: xarray.Dataset
-        Input dataset to add derived variables to.
-    derived_variables: dict
-        Mapping {`derived_variable_name`: `derived_variable_definition`} where
-        `derived_variable_definition` is a string to be evaluated defining some
-        transformation based on existing variables in the input dataset `ds`.
-
-    Returns
-    -------
-    ds: xarray.Dataset
-        Input dataset with extra derived variables.
-
-    Example
-    -------
-    >>> import xarray as xr
-    >>> ds = xr.DataArray([-10, -11], coords={"x": [0, 1]}).to_dataset(name="elevation")
-    >>> ds = derived_filter(ds, {"depth": "ds.elevation * -1"})
-
-    """
-    for var, expr in derived_variables.items():
-        ds[var] = eval(expr)
-    return ds
-
-
-def sort_filter(ds, coords=None):
-    for c in coords:
-        if c in ds:
-            ds = ds.sortby(c)
-    return ds
-
-
-def subset_filter(ds, data_vars=None) -> xr.Dataset:
-    """
-    Subset data variables from dataset.
-
-    parameters
-    ----------
-    ds: xr.Dataset
-        Input dataset to transform.
-    data_vars: Iterable
-        Variables to subset from ds.
-
-    Returns
-    -------
-    ds: xr.Dataset
-    """
-    if data_vars is not None:
-        ds = ds[data_vars]
-    return ds
-
-
-def crop_filter(ds, **data_slice) -> xr.Dataset:
-    """
-    Crop dataset.
-
-    parameters
-    ----------
-    ds: xr.Dataset
-        Input dataset to transform.
-    data_slice: Iterable
-        Data slice to crop
-
-    Returns
-    -------
-    ds: xr.Dataset
-
-    """
-    if data_slice is not None:
-        this_crop = {
-            k: data_slice[k].to_slice()
-            for k in data_slice.keys()
-            if k in ds.dims.keys()
-        }
-        ds = ds.sel(this_crop)
-        for k in data_slice.keys():
-            if (k not in ds.dims.keys()) and (k in ds.coords.keys()):
-                ds = ds.where(ds[k] > float(data_slice[k].start), drop=True)
-                ds = ds.where(ds[k] < float(data_slice[k].stop), drop=True)
-    return ds
-
-
-def timenorm_filter(ds, interval="hour", reftime=None) -> xr.Dataset:
-    """Normalize time to lead time in hours
-
-    Parameters
-    ----------
-    ds : xr.Dataset
-        Input dataset to transform.
-    interval : str, optional
-        Time interval to normalize to, by default "hour"
-    reftime : str, optional
-        Reference time variable, by default None
-
-    Returns
-    -------
-    ds : xr.Dataset
-    """
-    from pandas import to_datetime, to_timedelta
-
-    dt = to_timedelta("1 " + interval)
-    if reftime is None:
-        ds["init"] = (
-            ("time",),
-            [
-                ds["time"].values[0],
-            ],
-        )
-    else:
-        ds["init"] = (("time",), to_datetime(ds[reftime].values))
-    ds["lead"] = ((ds["time"] - ds["init"]) / dt).astype("int")
-    ds["lead"].attrs["units"] = interval
-    ds = ds.set_coords("init")
-    ds = ds.swap_dims({"time": "lead"})
-    return ds
-
-
-def rename_filter(ds, **varmap) -> xr.Dataset:
-    """Rename variables in dataset
-
-    Parameters
-    ----------
-    ds : xr.Dataset
-        Input dataset to transform.
-    varmap : dict
-        Dictionary of variable names to rename
-
-    Returns
-    -------
-    ds : xr.Dataset
-    """
-    ds = ds.rename(varmap)
-    return ds
-
-
-def get_filter_fns() -> dict:
-    """Get dictionary of filter functions"""
-    return {
-        "sort": sort_filter,
-        "subset": subset_filter,
-        "crop": crop_filter,
-        "timenorm": timenorm_filter,
-        "rename": rename_filter,
-        "derived": derived_filter,
-    }
-
-
-def _open_preprocess(url, chunks, filters, xarray_kwargs):
-    import xarray as xr
-
-    ds = xr.open_dataset(url, chunks=chunks, **xarray_kwargs)
-    filter_fns = get_filter_fns()
-    for fn, params in filters.items():
-        if isinstance(fn, str):
-            fn = filter_fns[fn]
-        ds = fn(ds, **params)
-
-    return ds
-
-
+# -----------------------------------------------------------------------------
+# Copyright (c) 2020 - 2021, CSIRO
+#
+# All rights reserved.
+#
+# The full license is in the LICENSE file, distributed with this software.
+# -----------------------------------------------------------------------------
+
+import ast
+import functools
+import hashlib
+import logging
+import operator
+from typing import Callable, Optional
+
+import numpy as np
+import xarray as xr
+
+from .cache import LRUCache
+from .types import RompyBaseModel, Slice
+
+from pydantic import field_validator
+
+logger = logging.getLogger(__name__)
+
+# Compiled filter plans keyed by the filter definition and the variables to extract
+PLAN_CACHE = LRUCache(maxsize=64)
+
+# Sorted values of the non-dimension coordinates cropped, keyed by their content
+COORD_INDEX_CACHE = LRUCache(maxsize=16)
+
+
+# pydantic class to apply all the filters to the dataset
+class Filter(RompyBaseModel):
+    sort: Optional[dict] = {}
+    subset: Optional[dict] = {}
+    crop: Optional[dict] = {}
+    timenorm: Optional[dict] = {}
+    rename: Optional[dict] = {}
+    derived: Optional[dict] = {}
+    normalize: Optional[dict] = {}
+
+    @field_validator("crop", mode="before")
+    def convert_slices(cls, v):
+        for key, value in v.items():
+            if isinstance(value, slice):
+                v[key] = Slice.from_slice(value)
+            if isinstance(value, dict):
+                v[key] = Slice.from_dict(value)
+        return v
+
+    @field_validator("derived")
+    def validate_derived(cls, v):
+        if v and v.get("derived_variables"):
+            compile_derived(v["derived_variables"])
+        return v
+
+    def compile(self, variables: Optional[list] = None) -> "FilterPlan":
+        """Compile the filters into an execution plan.
+
+        Plans are cached by the filter definition so they are only built once for
+        each combination of filters and variables.
+
+        Parameters
+        ----------
+        variables: list, optional
+            Variables to extract from the dataset before filtering.
+
+        """
+        key = (str(self), tuple(variables or ()))
+        plan = PLAN_CACHE.get(key)
+        if plan is None:
+            plan = FilterPlan(self, variables)
+            PLAN_CACHE.put(key, plan)
+        return plan
+
+    def explain(self, variables: Optional[list] = None) -> str:
+        """Description of the execution plan of the filters."""
+        return self.compile(variables).explain()
+
+    def __call__(self, ds):
+        return self.compile()(ds)
+
+    def __repr__(self):
+        return self.__str__()
+
+    def __str__(self):
+        return (
+            f"Filter(sort={self.sort}, subset={self.subset}, crop={self.crop}, "
+            f"timenorm={self.timenorm}, rename={self.rename}, derived={self.derived}, "
+            f"normalize={self.normalize})"
+        )
+
+
+class FilterPlan:
+    """Execution plan of a `Filter`.
+
+    The subset of variables and the crop are fused into a single `select` stage run
+    first, so the other stages only ever process the cropped data. The select stage
+    can be pushed down into the source open so only the variables and indices needed
+    are read. Crops along coordinates sorted by the `sort` filter are defined in the
+    sorted order, so descending coordinates are cropped with reversed slices and
+    sorted after cropping. Coordinates are normalized by the `normalize` filter
+    within the select stage, before cropping.
+
+    Parameters
+    ----------
+    filters: Filter
+        Filters to compile.
+    variables: list, optional
+        Variables to extract from the dataset before filtering.
+
+    """
+
+    def __init__(self, filters: Filter, variables: Optional[list] = None):
+        if variables and filters.subset.get("data_vars"):
+            missing = set(filters.subset["data_vars"]) - set(variables)
+            if missing:
+                raise KeyError(f"Subset variables {missing} not in {variables}")
+        data_vars = filters.subset.get("data_vars") or variables
+        self.data_vars = list(data_vars) if data_vars else None
+        self.crop = {k: _to_slice(v) for k, v in (filters.crop or {}).items()}
+        self.sort = list((filters.sort or {}).get("coords", []))
+        self.normalize = dict(filters.normalize or {})
+        filter_fns = get_filter_fns()
+        self.stages: list[tuple[str, Callable, dict]] = []
+        if self.data_vars or self.crop or self.normalize:
+            self.stages.append(
+                (
+                    "select",
+                    select_filter,
+                    dict(
+                        data_vars=self.data_vars,
+                        crop=self.crop,
+                        sort=self.sort,
+                        normalize=self.normalize,
+                    ),
+                )
+            )
+        for name in ("sort", "timenorm", "rename"):
+            params = getattr(filters, name)
+            if params:
+                # Copied so the plan is not changed by in place edits of the filter
+                self.stages.append((name, filter_fns[name], dict(params)))
+        if filters.derived:
+            # Expressions are parsed and ordered once for the lifetime of the plan
+            expressions = compile_derived(**filters.derived)
+            self.stages.append(("derived", _apply_derived, dict(expressions=expressions)))
+
+    @property
+    def required_variables(self) -> Optional[set]:
+        """Variables to read from the source, None if all are needed."""
+        if not self.data_vars:
+            return None
+        return set(self.data_vars) | set(self.crop) | set(self.sort)
+
+    def select(self, ds: xr.Dataset) -> xr.Dataset:
+        """Run the select stage only, as pushed down into the source open."""
+        for name, fn, params in self.stages[:1]:
+            if name == "select":
+                ds = fn(ds, **params)
+        return ds
+
+    def transform(self, ds: xr.Dataset) -> xr.Dataset:
+        """Run all stages after the select stage."""
+        for name, fn, params in self.stages:
+            if name != "select":
+                ds = fn(ds, **params)
+        return ds
+
+    def __call__(self, ds: xr.Dataset) -> xr.Dataset:
+        return self.transform(self.select(ds))
+
+    def explain(self) -> str:
+        """Description of the stages of the plan in the order they run."""
+        lines = ["FilterPlan"]
+        if self.required_variables is not None:
+            lines.append(f"  pushdown: read {sorted(self.required_variables)}")
+        if self.crop:
+            crop = {k: (v.start, v.stop) for k, v in self.crop.items()}
+            lines.append(f"  pushdown: crop {crop}")
+        for ind, (name, fn, params) in enumerate(self.stages, 1):
+            if name == "select":
+                params = {k: v for k, v in params.items() if v}
+                if "crop" in params:
+                    params["crop"] = list(params["crop"])
+            if name == "derived":
+                params = {var: expr.expr for var, expr in params["expressions"]}
+            lines.append(f"  {ind}. {name}: {params}")
+        if not self.stages:
+            lines.append("  (no filters)")
+        return "\n".join(lines)
+
+    def __repr__(self) -> str:
+        return self.explain()
+
+
+def _to_slice(value) -> Slice:
+    if isinstance(value, slice):
+        return Slice.from_slice(value)
+    if isinstance(value, dict):
+        return Slice.from_dict(value)
+    return value
+
+
+class _LazyVariables:
+    """Variables of a dataset as dask arrays, accessed as attributes or items."""
+
+    def __init__(self, ds: xr.Dataset):
+        self._ds = ds
+
+    def __getitem__(self, name: str) -> xr.DataArray:
+        darr = self._ds[name]
+        if darr.chunks is None and darr.ndim > 0:
+            darr = darr.chunk()
+        return darr
+
+    def __getattr__(self, name: str) -> xr.DataArray:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+
+DERIVED_NAMES = ("ds", "np", "xr", "abs")
+
+DERIVED_NODES = (
+    ast.Expression,
+    ast.BinOp,
+    ast.UnaryOp,
+    ast.Compare,
+    ast.Call,
+    ast.Attribute,
+    ast.Subscript,
+    ast.Name,
+    ast.Constant,
+    ast.Load,
+    ast.operator,
+    ast.unaryop,
+    ast.cmpop,
+)
+
+
+class DerivedExpression:
+    """Derived variable expression compiled from a restricted python expression.
+
+    Expressions combine variables of the dataset, referenced as `ds.name`,
+    `ds["name"]` or just `name`, with constants, arithmetic and comparison operators,
+    numpy ufuncs, e.g., `np.hypot`, `abs` and `xr.where`. Variables are evaluated as
+    dask arrays so derived variables are only computed when the data are written.
+
+    Parameters
+    ----------
+    expr: str
+        The expression, e.g., `np.hypot(ds.u10, ds.v10)`.
+
+    """
+
+    def __init__(self, expr: str):
+        self.expr = expr
+        try:
+            tree = ast.parse(expr.strip(), mode="eval")
+        except SyntaxError as err:
+            raise ValueError(f"Invalid derived expression '{expr}': {err}") from err
+        self.references = self._validate(tree)
+        self._code = compile(tree, f"<derived: {expr}>", "eval")
+
+    def _validate(self, tree: ast.Expression) -> set[str]:
+        """Check the expression only uses allowed syntax, return the names used."""
+        references = set()
+        for node in ast.walk(tree):
+            if not isinstance(node, DERIVED_NODES):
+                raise ValueError(
+                    f"{type(node).__name__} not allowed in derived expression "
+                    f"'{self.expr}'"
+                )
+            if isinstance(node, ast.Attribute):
+                owner = node.value.id if isinstance(node.value, ast.Name) else None
+                if owner == "ds" and not node.attr.startswith("_"):
+                    references.add(node.attr)
+                elif owner == "np" and isinstance(getattr(np, node.attr, None), np.ufunc):
+                    pass
+                elif owner == "xr" and node.attr == "where":
+                    pass
+                else:
+                    raise ValueError(
+                        f"Attribute {ast.unparse(node)} not allowed in derived "
+                        f"expression '{self.expr}'"
+                    )
+            elif isinstance(node, ast.Subscript):
+                if not (
+                    isinstance(node.value, ast.Name)
+                    and node.value.id == "ds"
+                    and isinstance(node.slice, ast.Constant)
+                    and isinstance(node.slice.value, str)
+                ):
+                    raise ValueError(
+                        f"Only ds['name'] subscripts allowed in derived expression "
+                        f"'{self.expr}'"
+                    )
+                references.add(node.slice.value)
+            elif isinstance(node, ast.Call):
+                if node.keywords or not isinstance(node.func, (ast.Name, ast.Attribute)):
+                    raise ValueError(
+                        f"Call {ast.unparse(node)} not allowed in derived expression "
+                        f"'{self.expr}'"
+                    )
+                if isinstance(node.func, ast.Name) and node.func.id != "abs":
+                    raise ValueError(
+                        f"Function {node.func.id} not allowed in derived expression "
+                        f"'{self.expr}'"
+                    )
+            elif isinstance(node, ast.Name):
+                if node.id.startswith("_"):
+                    raise ValueError(
+                        f"Name {node.id} not allowed in derived expression '{self.expr}'"
+                    )
+                if node.id not in DERIVED_NAMES:
+                    references.add(node.id)
+            elif isinstance(node, ast.Constant):
+                if not isinstance(node.value, (int, float, complex, str, bool)):
+                    raise ValueError(
+                        f"Constant {node.value!r} not allowed in derived expression "
+                        f"'{self.expr}'"
+                    )
+        return references
+
+    def __call__(self, ds: xr.Dataset) -> xr.DataArray:
+        variables = _LazyVariables(ds)
+        namespace = {"ds": variables, "np": np, "xr": xr, "abs": abs}
+        for name in self.references:
+            if name not in namespace and name in ds.variables:
+                namespace[name] = variables[name]
+        return eval(self._code, {"__builtins__": {}}, namespace)
+
+    def __repr__(self) -> str:
+        return f"DerivedExpression({self.expr!r})"
+
+
+@functools.lru_cache(maxsize=256)
+def _parse_expression(expr: str) -> DerivedExpression:
+    return DerivedExpression(expr)
+
+
+def compile_derived(derived_variables: dict) -> list[tuple[str, DerivedExpression]]:
+    """Compile derived variable expressions in the order they must be evaluated.
+
+    Parameters
+    ----------
+    derived_variables: dict
+        Mapping {`derived_variable_name`: `derived_variable_definition`}, definitions
+        can reference other derived variables regardless of their order.
+
+    Returns
+    -------
+    expressions: list[tuple[str, DerivedExpression]]
+        Compiled expressions sorted so each follows the derived variables it uses.
+
+    """
+    expressions = {
+        var: _parse_expression(expr) for var, expr in derived_variables.items()
+    }
+    ordered = []
+    visiting = set()
+
+    def visit(var):
+        if any(var == name for name, _ in ordered):
+            return
+        if var in visiting:
+            raise ValueError(f"Circular reference in derived variable {var}")
+        visiting.add(var)
+        for ref in expressions[var].references:
+            if ref in expressions and ref != var:
+                visit(ref)
+        visiting.discard(var)
+        ordered.append((var, expressions[var]))
+
+    for var in expressions:
+        visit(var)
+    return ordered
+
+
+def _apply_derived(ds, expressions: list[tuple[str, DerivedExpression]]):
+    for var, expression in expressions:
+        ds[var] = expression(ds)
+    return ds
+
+
+def derived_filter(ds, derived_variables):
+    """Add derived variable to Dataset.
+
+    Parameters
+    ----------
+    ds: xarray.Dataset
+        Input dataset to add derived variables to.
+    derived_variables: dict
+        Mapping {`derived_variable_name`: `derived_variable_definition`} where
+        `derived_variable_definition` is an expression defining some transformation
+        based on existing variables in the input dataset `ds` or on other derived
+        variables, see `DerivedExpression` for the syntax allowed.
+
+    Returns
+    -------
+    ds: xarray.Dataset
+        Input dataset with extra derived variables, evaluated lazily.
+
+    Example
+    -------
+    >>> import xarray as xr
+    >>> ds = xr.DataArray([-10, -11], coords={"x": [0, 1]}).to_dataset(name="elevation")
+    >>> ds = derived_filter(ds, {"depth": "ds.elevation * -1"})
+
+    """
+    return _apply_derived(ds, compile_derived(derived_variables))
+
+
+def sort_filter(ds, coords=None):
+    for c in coords:
+        if c in ds:
+            if c in ds.indexes and _is_descending(ds.indexes[c]):
+                # Reversed slice rather than sortby so data are not loaded
+                ds = ds.isel({c: slice(None, None, -1)})
+            else:
+                ds = ds.sortby(c)
+    return ds
+
+
+def _is_descending(index) -> bool:
+    return len(index) > 1 and index.is_monotonic_decreasing
+
+
+def _lazy_concat(pieces: list[xr.Dataset], dim: str) -> xr.Dataset:
+    """Concatenate datasets along dim wrapping variables not backed by dask."""
+    chunked = []
+    for piece in pieces:
+        data_vars = {
+            name: darr.chunk() if darr.chunks is None and dim in darr.dims else darr
+            for name, darr in piece.data_vars.items()
+        }
+        chunked.append(piece.assign(data_vars))
+    return xr.concat(chunked, dim=dim, data_vars="minimal", coords="minimal")
+
+
+def _wrap_lon(ds, lon: str, lon_min: Optional[float], crop: Optional[Slice]):
+    """Select and wrap longitudes into the range of the crop or from lon_min."""
+    start = stop = None
+    if crop is not None:
+        start, stop = crop.start, crop.stop
+    if start is not None:
+        # The crop defines the range, any other origin would drop part of it
+        lon_min = start = float(start)
+    else:
+        lon_min = start = -180.0 if lon_min is None else float(lon_min)
+    stop = start + 360.0 if stop is None else float(stop)
+    if stop < start:
+        # Crops across the antimeridian given as e.g., 170 to -170
+        stop += 360.0
+    values = ds[lon].values
+    shifted = (values - lon_min) % 360 + lon_min
+    shifted = np.where(shifted < start, shifted + 360, shifted)
+    selected = np.flatnonzero((shifted >= start) & (shifted <= stop))
+    selected = selected[np.argsort(shifted[selected], kind="stable")]
+    # Contiguous runs of indices, at most two for longitudes sorted in the source
+    breaks = np.flatnonzero(np.diff(selected) != 1) + 1
+    pieces = [
+        ds.isel({lon: slice(run[0], run[-1] + 1)})
+        for run in np.split(selected, breaks)
+        if run.size
+    ]
+    if not pieces:
+        ds = ds.isel({lon: slice(0, 0)})
+    elif len(pieces) == 1:
+        ds = pieces[0]
+    else:
+        ds = _lazy_concat(pieces, lon)
+    return ds.assign_coords({lon: (lon, shifted[selected], ds[lon].attrs)})
+
+
+def normalize_filter(
+    ds, lon=None, lon_min=None, ascending=None, crop=None
+) -> xr.Dataset:
+    """Normalize longitudes and descending coordinates without loading data.
+
+    Parameters
+    ----------
+    ds: xr.Dataset
+        Input dataset to transform.
+    lon: str, optional
+        Name of the longitude dimension to wrap, e.g., 0-360 longitudes are wrapped
+        into the -180 to 180 range.
+    lon_min: float, optional
+        Start of the 360 degrees range to wrap longitudes into, -180 by default. The
+        start of the crop along lon is used instead if the crop defines it.
+    ascending: Iterable, optional
+        Dimensions flipped with reversed slices if they are descending.
+    crop: dict, optional
+        Slices to crop keyed by coordinate name. A slice along lon is applied while
+        wrapping, as two index windows concatenated lazily when it straddles the
+        edge of the source longitudes, e.g., the antimeridian on 0-360 sources.
+
+    Returns
+    -------
+    ds: xr.Dataset
+
+    """
+    for name in ascending or []:
+        if name in ds.indexes and _is_descending(ds.indexes[name]):
+            ds = ds.isel({name: slice(None, None, -1)})
+    if lon is not None and lon in ds.dims:
+        if _is_descending(ds.indexes[lon]):
+            ds = ds.isel({lon: slice(None, None, -1)})
+        ds = _wrap_lon(ds, lon, lon_min, _to_slice((crop or {}).get(lon)))
+    return ds
+
+
+def subset_filter(ds, data_vars=None) -> xr.Dataset:
+    """
+    Subset data variables from dataset.
+
+    parameters
+    ----------
+    ds: xr.Dataset
+        Input dataset to transform.
+    data_vars: Iterable
+        Variables to subset from ds.
+
+    Returns
+    -------
+    ds: xr.Dataset
+    """
+    if data_vars is not None:
+        ds = ds[data_vars]
+    return ds
+
+
+def select_filter(
+    ds, data_vars=None, crop=None, sort=None, normalize=None
+) -> xr.Dataset:
+    """Subset variables and crop dataset with a single indexer.
+
+    Parameters
+    ----------
+    ds: xr.Dataset
+        Input dataset to transform.
+    data_vars: Iterable, optional
+        Variables to subset from ds.
+    crop: dict, optional
+        Slices to crop keyed by coordinate name.
+    sort: Iterable, optional
+        Coordinates sorted after cropping, slices along them are defined in the
+        ascending order.
+    normalize: dict, optional
+        Parameters of `normalize_filter` applied before cropping.
+
+    Returns
+    -------
+    ds: xr.Dataset
+
+    """
+    if data_vars:
+        ds = ds[data_vars]
+    crop = crop or {}
+    if normalize:
+        ds = normalize_filter(ds, crop=crop, **normalize)
+        crop = {k: v for k, v in crop.items() if k != normalize.get("lon")}
+    indexers = {}
+    for k, v in crop.items():
+        if k not in ds.dims:
+            continue
+        slc = _to_slice(v).to_slice()
+        if sort and k in sort and k in ds.indexes:
+            index = ds.indexes[k]
+            if index.is_monotonic_decreasing and not index.is_monotonic_increasing:
+                slc = slice(slc.stop, slc.start)
+            elif not index.is_monotonic_increasing:
+                ds = ds.sortby(k)
+        indexers[k] = slc
+    if indexers:
+        ds = ds.sel(indexers)
+    return _crop_coords(ds, crop)
+
+
+def _coord_index(values: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Sorted values and sorting order of the flattened coordinate values."""
+    values = np.ascontiguousarray(values)
+    sha = hashlib.blake2b(str((values.dtype, values.shape)).encode(), digest_size=16)
+    sha.update(values.tobytes())
+    key = sha.hexdigest()
+    index = COORD_INDEX_CACHE.get(key)
+    if index is None:
+        order = np.argsort(values, axis=None, kind="stable")
+        index = (values.ravel()[order], order)
+        COORD_INDEX_CACHE.put(key, index)
+    return index
+
+
+def _inside(values: np.ndarray, start, stop) -> np.ndarray:
+    """Mask of the coordinate values strictly within start and stop."""
+    sorted_values, order = _coord_index(values)
+    start = -np.inf if start is None else float(start)
+    stop = np.inf if stop is None else float(stop)
+    i0 = np.searchsorted(sorted_values, start, side="right")
+    i1 = np.searchsorted(sorted_values, stop, side="left")
+    inside = np.zeros(values.size, dtype=bool)
+    inside[order[i0:i1]] = True
+    return inside.reshape(values.shape)
+
+
+def _crop_coords(ds, crop: dict) -> xr.Dataset:
+    """Crop along coordinates that are not dimensions, e.g., curvilinear lon/lat.
+
+    Only the coordinate arrays are read to find the nodes within all slices. Along a
+    single dimension, e.g., stations with lon/lat defined along `site`, these nodes
+    are selected lazily with `isel`. For coordinates over several dimensions the
+    window of indices bounding the nodes is selected lazily with `isel` and nodes
+    outside the slices within the window are masked lazily, variables not backed by
+    dask are wrapped into a single chunk so no data are loaded while filtering.
+
+    """
+    masks = []
+    for k, v in crop.items():
+        if (k not in ds.dims.keys()) and (k in ds.coords.keys()):
+            v = _to_slice(v)
+            coord = ds[k]
+            masks.append(
+                xr.DataArray(_inside(coord.values, v.start, v.stop), dims=coord.dims)
+            )
+    if not masks:
+        return ds
+    mask = functools.reduce(operator.and_, masks)
+    if mask.ndim == 1:
+        return ds.isel({mask.dims[0]: np.flatnonzero(mask.values)})
+    window = {}
+    for dim in mask.dims:
+        found = np.flatnonzero(mask.any([d for d in mask.dims if d != dim]).values)
+        window[dim] = slice(found[0], found[-1] + 1) if found.size else slice(0, 0)
+    ds = ds.isel(window)
+    mask = mask.isel(window)
+    if bool(mask.all()):
+        return ds
+    data_vars = {}
+    for name, darr in ds.data_vars.items():
+        if set(mask.dims).issubset(darr.dims):
+            if darr.chunks is None:
+                darr = darr.chunk()
+            darr = darr.where(mask)
+        data_vars[name] = darr
+    return ds.assign(data_vars)
+
+
+def crop_filter(ds, **data_slice) -> xr.Dataset:
+    """
+    Crop dataset.
+
+    parameters
+    ----------
+    ds: xr.Dataset
+        Input dataset to transform.
+    data_slice: Iterable
+        Data slice to crop
+
+    Returns
+    -------
+    ds: xr.Dataset
+
+    """
+    if data_slice is not None:
+        this_crop = {
+            k: data_slice[k].to_slice()
+            for k in data_slice.keys()
+            if k in ds.dims.keys()
+        }
+        ds = ds.sel(this_crop)
+        ds = _crop_coords(ds, data_slice)
+    return ds
+
+
+def timenorm_filter(ds, interval="hour", reftime=None) -> xr.Dataset:
+    """Normalize time to lead time in hours
+
+    Parameters
+    ----------
+    ds : xr.Dataset
+        Input dataset to transform.
+    interval : str, optional
+        Time interval to normalize to, by default "hour"
+    reftime : str, optional
+        Reference time variable, by default None
+
+    Returns
+    -------
+    ds : xr.Dataset
+    """
+    from pandas import to_datetime, to_timedelta
+
+    dt = to_timedelta("1 " + interval)
+    if reftime is None:
+        ds["init"] = (
+            ("time",),
+            [
+                ds["time"].values[0],
+            ],
+        )
+    else:
+        ds["init"] = (("time",), to_datetime(ds[reftime].values))
+    ds["lead"] = ((ds["time"] - ds["init"]) / dt).astype("int")
+    ds["lead"].attrs["units"] = interval
+    ds = ds.set_coords("init")
+    ds = ds.swap_dims({"time": "lead"})
+    return ds
+
+
+def rename_filter(ds, **varmap) -> xr.Dataset:
+    """Rename variables in dataset
+
+    Parameters
+    ----------
+    ds : xr.Dataset
+        Input dataset to transform.
+    varmap : dict
+        Dictionary of variable names to rename
+
+    Returns
+    -------
+    ds : xr.Dataset
+    """
+    ds = ds.rename(varmap)
+    return ds
+
+
+def get_filter_fns() -> dict:
+    """Get dictionary of filter functions"""
+    return {
+        "sort": sort_filter,
+        "subset": subset_filter,
+        "crop": crop_filter,
+        "timenorm": timenorm_filter,
+        "rename": rename_filter,
+        "derived": derived_filter,
+        "normalize": normalize_filter,
+    }
+
+
+def _open_preprocess(url, chunks, filters, xarray_kwargs):
+    import xarray as xr
+
+    ds = xr.open_dataset(url, chunks=chunks, **xarray_kwargs)
+    filter_fns = get_filter_fns()
+    for fn, params in filters.items():
+        if isinstance(fn, str):
+            fn = filter_fns[fn]
+        ds = fn(ds, **params)
+
+    return ds
+
+
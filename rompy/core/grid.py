@@ -1,12 +1,13 @@
+import hashlib
+import json
 import logging
 from typing import Any, Literal, Optional, Union
 
-import cartopy.crs as ccrs
-import cartopy.feature as cfeature
-import matplotlib.pyplot as plt
 import numpy as np
-from pydantic import Field, model_validator
+import shapely
+from pydantic import Field, PrivateAttr, model_validator
 from pydantic_numpy.typing import Np1DArray, Np2DArray
+from scipy.spatial import ConvexHull, QhullError
 from shapely.geometry import MultiPoint, Polygon
 
 from rompy.core.types import Bbox, RompyBaseModel
@@ -31,6 +32,50 @@ class BaseGrid(RompyBaseModel):
         default=None, description="The y coordinates"
     )
     grid_type: Literal["base"] = "base"
+    _grid_cache: dict = PrivateAttr(default_factory=dict)
+
+    def __setattr__(self, name: str, value: Any):
+        super().__setattr__(name, value)
+        if name in self.model_fields:
+            self._grid_cache.clear()
+
+    def __copy__(self):
+        # model_copy sets updated fields without __setattr__, start with a new cache
+        copied = super().__copy__()
+        copied.__pydantic_private__["_grid_cache"] = {}
+        return copied
+
+    def __deepcopy__(self, memo: Optional[dict] = None):
+        copied = super().__deepcopy__(memo)
+        copied.__pydantic_private__["_grid_cache"] = {}
+        return copied
+
+    def _cached(self, key: tuple, func):
+        """Value of func cached in the grid until any of its fields are changed."""
+        try:
+            return self._grid_cache[key]
+        except KeyError:
+            value = self._grid_cache[key] = func()
+            return value
+
+    @property
+    def fingerprint(self) -> str:
+        """Hash of the grid content identifying the grid in equality and cache keys.
+
+        It is computed once and cached in the grid until any of its fields are changed.
+
+        """
+        return self._cached(("fingerprint",), self._fingerprint)
+
+    def _fingerprint(self) -> str:
+        sha = hashlib.sha256(self.__class__.__name__.encode())
+        sha.update(self.model_dump_json(exclude={"x", "y"}).encode())
+        for coord in (self.x, self.y):
+            if coord is not None:
+                coord = np.ascontiguousarray(coord)
+                sha.update(str((coord.dtype, coord.shape)).encode())
+                sha.update(coord.tobytes())
+        return sha.hexdigest()
 
     @property
     def minx(self) -> float:
@@ -64,8 +109,17 @@ class BaseGrid(RompyBaseModel):
         return bbox
 
     def _get_convex_hull(self, tolerance=0.2) -> Polygon:
-        xys = list(zip(self.x.flatten(), self.y.flatten()))
-        polygon = MultiPoint(xys).convex_hull
+        xys = np.column_stack([np.ravel(self.x), np.ravel(self.y)])
+        xys = xys[np.isfinite(xys).all(axis=1)]
+        try:
+            vertices = xys[ConvexHull(xys).vertices[::-1]]
+        except QhullError:
+            # Degenerate hulls such as grids with a single row
+            polygon = shapely.multipoints(xys).convex_hull
+        else:
+            # Clockwise from the lowest point like the shapely convex hull
+            start = np.lexsort((vertices[:, 0], vertices[:, 1]))[0]
+            polygon = Polygon(np.roll(vertices, -start, axis=0))
         polygon = polygon.simplify(tolerance=tolerance)
         return polygon
 
@@ -84,7 +138,9 @@ class BaseGrid(RompyBaseModel):
             See https://shapely.readthedocs.io/en/stable/manual.html#Polygon
 
         """
-        return self._get_convex_hull(tolerance=tolerance)
+        return self._cached(
+            ("boundary", tolerance), lambda: self._get_convex_hull(tolerance=tolerance)
+        )
 
     def boundary_points(self, spacing=None, tolerance=0.2) -> tuple:
         """Returns array of coordinates from boundary polygon.
@@ -104,18 +160,28 @@ class BaseGrid(RompyBaseModel):
             Tuple of x and y coordinates of the boundary points.
 
         """
+        return self._cached(
+            ("boundary_points", spacing, tolerance),
+            lambda: self._boundary_points(spacing=spacing, tolerance=tolerance),
+        )
+
+    def _boundary_points(self, spacing=None, tolerance=0.2) -> tuple:
         polygon = self.boundary(tolerance=tolerance)
         if spacing is None:
-            xpts, ypts = polygon.exterior.coords.xy
+            xys = shapely.get_coordinates(polygon.exterior)
         else:
             perimeter = polygon.length
             if perimeter < spacing:
                 raise ValueError(f"Spacing = {spacing} > grid perimeter = {perimeter}")
             npts = int(np.ceil(perimeter / spacing))
-            points = [polygon.boundary.interpolate(i * spacing) for i in range(npts)]
-            xpts = [point.x for point in points]
-            ypts = [point.y for point in points]
-        return np.array(xpts), np.array(ypts)
+            points = shapely.line_interpolate_point(
+                polygon.boundary, np.arange(npts) * spacing
+            )
+            xys = shapely.get_coordinates(points)
+        xpts, ypts = xys[:, 0].copy(), xys[:, 1].copy()
+        # Cached arrays are shared by all callers
+        xpts.flags.writeable = ypts.flags.writeable = False
+        return xpts, ypts
 
     def _figsize(self, x0, x1, y0, y1, fscale):
         xlen = abs(x1 - x0)
@@ -137,6 +203,9 @@ class BaseGrid(RompyBaseModel):
         coastline=True,
     ):
         """Plot the grid"""
+        import cartopy.crs as ccrs
+        import cartopy.feature as cfeature
+        import matplotlib.pyplot as plt
 
         projection = ccrs.PlateCarree()
         transform = ccrs.PlateCarree()
@@ -181,20 +250,31 @@ class BaseGrid(RompyBaseModel):
         return f"{self.__class__.__name__}({self.x}, {self.y})"
 
     def __eq__(self, other):
-        return self.model_dump() == other.dict()
+        if not isinstance(other, BaseGrid):
+            return NotImplemented
+        return self.fingerprint == other.fingerprint
 
 
 class RegularGrid(BaseGrid):
     """Regular grid in geographic space.
 
     This object provides an abstract representation of a regular grid in some
-    geographic space.
+    geographic space. The grid is defined by its origin, spacing, size and rotation,
+    the bounding box, boundary and corners are calculated from these parameters and
+    the full `x` and `y` coordinate arrays are only generated when first accessed.
 
     """
 
     grid_type: Literal["regular"] = Field(
         "regular", description="Type of grid, must be 'regular'"
     )
+    # Coordinates are fully defined by the grid parameters so they are not serialised
+    x: Optional[Np2DArray] = Field(
+        default=None, exclude=True, description="The x coordinates"
+    )
+    y: Optional[Np2DArray] = Field(
+        default=None, exclude=True, description="The y coordinates"
+    )
     x0: Optional[float] = Field(
         default=None, description="X coordinate of the grid origin"
     )
@@ -219,23 +299,37 @@ class RegularGrid(BaseGrid):
 
     @model_validator(mode="after")
     def generate(self) -> "RegularGrid":
-        """Generate the grid from the provided parameters."""
+        """Define the grid parameters, coordinates are generated on first access."""
         keys = ["x0", "y0", "dx", "dy", "nx", "ny"]
-        if self.x is not None and self.y is not None:
+        if all(coord is not None for coord in self._explicit_coords):
             for key in keys:
                 if getattr(self, key) is not None:
                     logger.warning(f"x, y provided explicitly, can't process {key}")
             self._attrs_from_xy()
         elif None in [getattr(self, key) for key in keys]:
             raise ValueError(f"All of {','.join(keys)} must be provided for REG grid")
-        # Ensure x, y 2D coordinates are defined
-        self._regen_grid()
         return self
 
-    def _regen_grid(self):
-        _x, _y = self._gen_reg_cgrid()
-        self.x = _x
-        self.y = _y
+    @property
+    def _explicit_coords(self) -> tuple:
+        """Coordinates set explicitly in the grid, None if generated from parameters."""
+        return super().__getattribute__("x"), super().__getattribute__("y")
+
+    def __getattribute__(self, name: str):
+        value = super().__getattribute__(name)
+        if value is None and name in ("x", "y"):
+            # Coordinates not set explicitly are generated on first access and cached
+            # in the grid until any of its fields are changed
+            value = self._cached(("coords",), self._regen_grid)[name == "y"]
+        return value
+
+    @property
+    def _parametric(self) -> bool:
+        """True if the coordinates are fully defined by the grid parameters."""
+        return True
+
+    def _regen_grid(self) -> tuple[np.ndarray, np.ndarray]:
+        return self._gen_reg_cgrid()
 
     def _attrs_from_xy(self):
         """Generate regular grid attributes from x, y coordinates."""
@@ -256,35 +350,99 @@ class RegularGrid(BaseGrid):
     def ylen(self):
         return self.dy * (self.ny - 1)
 
-    def _gen_reg_cgrid(self):
-        # Grid at origin
-        i = np.arange(0.0, self.dx * self.nx, self.dx)
-        j = np.arange(0.0, self.dy * self.ny, self.dy)
-        ii, jj = np.meshgrid(i, j)
-
-        # Rotation
-        alpha = -self.rot * np.pi / 180.0
-        R = np.array([[np.cos(alpha), -np.sin(alpha)], [np.sin(alpha), np.cos(alpha)]])
-        gg = np.dot(np.vstack([ii.ravel(), jj.ravel()]).T, R)
-
-        # Translation
-        x = gg[:, 0] + self.x0
-        y = gg[:, 1] + self.y0
-
-        x = np.reshape(x, ii.shape)
-        y = np.reshape(y, ii.shape)
+    def _xy(self, i, j) -> tuple[np.ndarray, np.ndarray]:
+        """Coordinates of the grid nodes at indices i along x and j along y."""
+        alpha = np.radians(self.rot)
+        ii = np.asarray(i) * self.dx
+        jj = np.asarray(j) * self.dy
+        x = self.x0 + ii * np.cos(alpha) - jj * np.sin(alpha)
+        y = self.y0 + ii * np.sin(alpha) + jj * np.cos(alpha)
         return x, y
 
-    def __eq__(self, other) -> bool:
-        return (
-            (self.nx == other.nx)
-            & (self.ny == other.ny)
-            & (self.rot == other.rot)
-            & (self.x0 == other.x0)
-            & (self.y0 == other.y0)
-            & (self.dx == other.dx)
-            & (self.dy == other.dy)
+    def node_coords(self, index=np.s_[:, :]) -> tuple[np.ndarray, np.ndarray]:
+        """Coordinates of grid nodes calculated from the grid parameters.
+
+        Parameters
+        ----------
+        index: tuple
+            Index expression selecting nodes from (ny, nx) arrays, e.g., `np.s_[0, :]`
+            for the southern row, all nodes by default.
+
+        Returns
+        -------
+        x, y: tuple
+            The x and y coordinates of the selected nodes.
+
+        """
+        # Broadcast views of the indices so only the selection is allocated
+        jj, ii = np.broadcast_arrays(*np.indices((self.ny, self.nx), sparse=True))
+        return self._xy(ii[index], jj[index])
+
+    @property
+    def corners(self) -> tuple[np.ndarray, np.ndarray]:
+        """Coordinates of the grid corners counterclockwise from the origin."""
+        i = np.array([0, self.nx - 1, self.nx - 1, 0])
+        j = np.array([0, 0, self.ny - 1, self.ny - 1])
+        return self.node_coords((j, i))
+
+    def _perimeter_indices(self) -> tuple[np.ndarray, np.ndarray]:
+        """Indices of the grid perimeter nodes counterclockwise from the origin."""
+        nx, ny = self.nx, self.ny
+        i = np.concatenate(
+            [
+                np.arange(nx),
+                np.full(ny - 1, nx - 1),
+                np.arange(nx - 2, -1, -1),
+                np.zeros(ny - 1, dtype=int),
+            ]
+        )
+        j = np.concatenate(
+            [
+                np.zeros(nx, dtype=int),
+                np.arange(1, ny),
+                np.full(nx - 1, ny - 1),
+                np.arange(ny - 2, -1, -1),
+            ]
         )
+        return i, j
+
+    @property
+    def minx(self) -> float:
+        return self.corners[0].min() if self._parametric else super().minx
+
+    @property
+    def maxx(self) -> float:
+        return self.corners[0].max() if self._parametric else super().maxx
+
+    @property
+    def miny(self) -> float:
+        return self.corners[1].min() if self._parametric else super().miny
+
+    @property
+    def maxy(self) -> float:
+        return self.corners[1].max() if self._parametric else super().maxy
+
+    def _get_convex_hull(self, tolerance=0.2) -> Polygon:
+        if not self._parametric:
+            return super()._get_convex_hull(tolerance=tolerance)
+        # The convex hull of a regular grid is defined by its corners
+        polygon = MultiPoint(np.column_stack(self.corners)).convex_hull
+        return polygon.simplify(tolerance=tolerance)
+
+    def _gen_reg_cgrid(self):
+        return self.node_coords()
+
+    def _fingerprint(self) -> str:
+        if not self._parametric:
+            return super()._fingerprint()
+        # Parametric hash, numbers are compared as floats whatever type they were set
+        params = {
+            key: float(value) if isinstance(value, (int, float, np.number)) else value
+            for key, value in self.model_dump().items()
+        }
+        sha = hashlib.sha256(self.__class__.__name__.encode())
+        sha.update(json.dumps(params, sort_keys=True, default=str).encode())
+        return sha.hexdigest()
 
     def __repr__(self):
         return f"{self.__class__.__name__}({self.nx}, {self.ny})"
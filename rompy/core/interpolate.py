@@ -0,0 +1,513 @@
+"""Precomputed sparse interpolation operators.
+
+The weights to interpolate from a set of source points onto a set of target points
+are compiled once into a sparse (target x source) matrix and cached, so repeated
+extractions at the same locations only cost a matrix product over the data, which
+is applied chunk by chunk on dask-backed datasets.
+
+Weights regridding a dataset onto a model grid are also cached on disk in the
+`ROMPY_WEIGHTS_DIR` directory (`~/.cache/rompy/weights` by default, set it empty to
+disable) so they are only computed once for each pair of source and model grids.
+
+"""
+import hashlib
+import logging
+import os
+import tempfile
+from pathlib import Path
+from typing import Literal, Optional
+
+import numpy as np
+import xarray as xr
+from scipy import sparse
+from scipy.spatial import cKDTree
+
+from rompy.core.cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+
+WEIGHTS_CACHE = LRUCache(maxsize=int(os.environ.get("ROMPY_WEIGHTS_CACHE_SIZE", 32)))
+
+
+class Weights:
+    """Sparse interpolation operator.
+
+    Parameters
+    ----------
+    matrix: sparse.csr_matrix
+        Weights with shape (ntarget, nsource).
+    mask: np.ndarray
+        Boolean array of size ntarget, True for targets that cannot be interpolated.
+
+    """
+
+    def __init__(self, matrix: sparse.csr_matrix, mask: np.ndarray):
+        self.matrix = matrix
+        self.mask = mask
+
+    @property
+    def shape(self) -> tuple:
+        return self.matrix.shape
+
+    def __call__(self, data: np.ndarray, ndims: int = 1) -> np.ndarray:
+        """Apply the weights over the last ndims axes of data."""
+        shape = data.shape[:-ndims]
+        dtype = np.result_type(data.dtype, np.float32)
+        values = np.asarray(data).reshape(-1, self.shape[1])
+        out = np.asarray((self.matrix @ values.T).T, dtype=dtype)
+        out[:, self.mask] = np.nan
+        return out.reshape(shape + (self.shape[0],))
+
+
+def _hash(*arrays) -> str:
+    sha = hashlib.blake2b(digest_size=16)
+    for array in arrays:
+        array = np.ascontiguousarray(array)
+        sha.update(str((array.dtype, array.shape)).encode())
+        sha.update(array.tobytes())
+    return sha.hexdigest()
+
+
+def cached_weights(method: str, *arrays, **kwargs):
+    """Return weights from the cache or compute and cache them.
+
+    Parameters
+    ----------
+    method: str
+        Name of the weights function in this module, e.g., `idw_weights`.
+    arrays: np.ndarray
+        Source and target coordinates passed to the weights function.
+    kwargs: dict
+        Keyword arguments passed to the weights function.
+
+    """
+    key = (method, _hash(*arrays), tuple(sorted(kwargs.items())))
+    weights = WEIGHTS_CACHE.get(key)
+    if weights is None:
+        logger.debug(f"Computing {method} interpolation weights")
+        weights = globals()[method](*arrays, **kwargs)
+        WEIGHTS_CACHE.put(key, weights)
+    return weights
+
+
+def idw_weights(
+    src_x: np.ndarray,
+    src_y: np.ndarray,
+    x: np.ndarray,
+    y: np.ndarray,
+    tolerance: float = 2.0,
+    max_sites: Optional[int] = 4,
+) -> Weights:
+    """Inverse distance weights from scattered source points onto target points.
+
+    The weights follow the wavespectra `sel_idw` conventions: distances are computed
+    from the 0-360 longitudes, up to `max_sites` neighbours within `tolerance` are
+    used, a target matching a source point exactly takes its value and targets with
+    fewer than 2 neighbours (and no exact match) are masked.
+
+    Parameters
+    ----------
+    src_x: np.ndarray
+        Longitudes of the source points.
+    src_y: np.ndarray
+        Latitudes of the source points.
+    x: np.ndarray
+        Longitudes of the target points.
+    y: np.ndarray
+        Latitudes of the target points.
+    tolerance: float
+        Maximum distance to use a source point for interpolation.
+    max_sites: int, optional
+        Maximum number of neighbour source points to use for interpolation.
+
+    """
+    src = np.column_stack([np.asarray(src_x) % 360, np.asarray(src_y)])
+    target = np.column_stack([np.asarray(x) % 360, np.asarray(y)])
+    k = min(max_sites or len(src), len(src))
+    dist, ind = cKDTree(src).query(target, k=k, distance_upper_bound=tolerance)
+    dist, ind = dist.reshape(len(target), k), ind.reshape(len(target), k)
+    found = np.isfinite(dist)
+    exact = found[:, 0] & (dist[:, 0] == 0)
+    with np.errstate(divide="ignore"):
+        factors = np.where(found, 1.0 / dist, 0.0)
+    # Exact matches only use the matching source point
+    factors[exact] = 0.0
+    factors[exact, 0] = 1.0
+    mask = ~exact & (found.sum(axis=1) < 2)
+    factors[mask] = 0.0
+    factors /= np.where(factors.sum(axis=1) > 0, factors.sum(axis=1), 1)[:, None]
+    keep = factors > 0
+    rows = np.broadcast_to(np.arange(len(target))[:, None], keep.shape)[keep]
+    matrix = sparse.csr_matrix(
+        (factors[keep], (rows, ind[keep])), shape=(len(target), len(src))
+    )
+    return Weights(matrix, mask)
+
+
+def _linear_1d(coord: np.ndarray, target: np.ndarray) -> tuple:
+    """Indices and weights of the bracketing coordinates of each target value."""
+    ascending = coord[-1] >= coord[0]
+    values = coord if ascending else coord[::-1]
+    i0 = np.clip(np.searchsorted(values, target, side="right") - 1, 0, len(values) - 2)
+    w1 = (target - values[i0]) / (values[i0 + 1] - values[i0])
+    valid = (target >= values[0]) & (target <= values[-1])
+    i1 = i0 + 1
+    if not ascending:
+        i0, i1 = len(values) - 1 - i0, len(values) - 1 - i1
+    return i0, i1, w1, valid
+
+
+def bilinear_weights(
+    src_x: np.ndarray, src_y: np.ndarray, x: np.ndarray, y: np.ndarray
+) -> Weights:
+    """Bilinear weights from a rectilinear grid onto target points.
+
+    Source points are the flattened (y, x) grid, targets outside of the grid are
+    masked consistently with `xarray.Dataset.interp`.
+
+    Parameters
+    ----------
+    src_x: np.ndarray
+        1D x coordinates of the source grid.
+    src_y: np.ndarray
+        1D y coordinates of the source grid.
+    x: np.ndarray
+        x coordinates of the target points.
+    y: np.ndarray
+        y coordinates of the target points.
+
+    """
+    nx = len(src_x)
+    ix0, ix1, wx, validx = _linear_1d(np.asarray(src_x), np.asarray(x))
+    iy0, iy1, wy, validy = _linear_1d(np.asarray(src_y), np.asarray(y))
+    cols = np.stack([iy0 * nx + ix0, iy0 * nx + ix1, iy1 * nx + ix0, iy1 * nx + ix1])
+    data = np.stack(
+        [(1 - wy) * (1 - wx), (1 - wy) * wx, wy * (1 - wx), wy * wx]
+    )
+    rows = np.broadcast_to(np.arange(len(x)), cols.shape)
+    # Explicit zero weights are kept so missing neighbours propagate like in xarray
+    matrix = sparse.csr_matrix(
+        (data.ravel(), (rows.ravel(), cols.ravel())),
+        shape=(len(x), nx * len(src_y)),
+    )
+    return Weights(matrix, ~(validx & validy))
+
+
+def nearest_weights(
+    src_x: np.ndarray, src_y: np.ndarray, x: np.ndarray, y: np.ndarray
+) -> Weights:
+    """Nearest neighbour weights from a rectilinear grid onto target points.
+
+    Source points are the flattened (y, x) grid, targets outside of the grid are
+    masked.
+
+    Parameters
+    ----------
+    src_x: np.ndarray
+        1D x coordinates of the source grid.
+    src_y: np.ndarray
+        1D y coordinates of the source grid.
+    x: np.ndarray
+        x coordinates of the target points.
+    y: np.ndarray
+        y coordinates of the target points.
+
+    """
+    ix0, ix1, wx, validx = _linear_1d(np.asarray(src_x), np.asarray(x))
+    iy0, iy1, wy, validy = _linear_1d(np.asarray(src_y), np.asarray(y))
+    cols = np.where(wy > 0.5, iy1, iy0) * len(src_x) + np.where(wx > 0.5, ix1, ix0)
+    mask = ~(validx & validy)
+    matrix = sparse.csr_matrix(
+        (np.where(mask, 0.0, 1.0), (np.arange(len(x)), cols)),
+        shape=(len(x), len(src_x) * len(src_y)),
+    )
+    return Weights(matrix, mask)
+
+
+def _cell_edges(coord: np.ndarray) -> np.ndarray:
+    """Edges of the cells centred on the coordinates of a rectilinear axis."""
+    mid = (coord[1:] + coord[:-1]) / 2
+    return np.concatenate([[2 * coord[0] - mid[0]], mid, [2 * coord[-1] - mid[-1]]])
+
+
+def _overlaps_1d(src: np.ndarray, target: np.ndarray) -> sparse.csr_matrix:
+    """Overlap lengths between the target and source cells along one axis."""
+    edges = _cell_edges(src)
+    if edges[-1] < edges[0]:
+        edges = edges[::-1]
+        flip = True
+    else:
+        flip = False
+    target_edges = _cell_edges(target)
+    lower = np.minimum(target_edges[:-1], target_edges[1:])
+    upper = np.maximum(target_edges[:-1], target_edges[1:])
+    # Range of source cells intersecting each target cell
+    first = np.clip(np.searchsorted(edges, lower, side="right") - 1, 0, len(src) - 1)
+    last = np.clip(np.searchsorted(edges, upper, side="left") - 1, 0, len(src) - 1)
+    counts = np.maximum(last - first + 1, 0)
+    rows = np.repeat(np.arange(len(target)), counts)
+    cols = np.concatenate([np.arange(i0, i1 + 1) for i0, i1 in zip(first, last)])
+    length = np.minimum(upper[rows], edges[cols + 1]) - np.maximum(
+        lower[rows], edges[cols]
+    )
+    keep = length > 0
+    if flip:
+        cols = len(src) - 1 - cols
+    return sparse.csr_matrix(
+        (length[keep], (rows[keep], cols[keep])), shape=(len(target), len(src))
+    )
+
+
+def conservative_weights(
+    src_x: np.ndarray, src_y: np.ndarray, grid, nsub: int = 5
+) -> Weights:
+    """First order conservative weights from a rectilinear grid onto a regular grid.
+
+    The value of each target cell is the average of the source cells weighted by
+    their overlapping area, normalised by the area of the target cell covered by the
+    source grid. Cells are centred on the grid nodes. The overlaps are exact for
+    unrotated target grids and estimated from `nsub` x `nsub` samples per target cell
+    for rotated grids.
+
+    Parameters
+    ----------
+    src_x: np.ndarray
+        1D x coordinates of the source grid.
+    src_y: np.ndarray
+        1D y coordinates of the source grid.
+    grid: RegularGrid
+        Target grid.
+    nsub: int
+        Number of samples along each side of the target cells of rotated grids.
+
+    """
+    src_x, src_y = np.asarray(src_x, dtype=float), np.asarray(src_y, dtype=float)
+    if grid.rot % 360 == 0:
+        wx = _overlaps_1d(src_x, grid.x0 + np.arange(grid.nx) * grid.dx)
+        wy = _overlaps_1d(src_y, grid.y0 + np.arange(grid.ny) * grid.dy)
+        matrix = sparse.kron(wy, wx, format="csr")
+    else:
+        # Sub-cell samples of each target cell, in the order of the target nodes
+        offsets = (np.arange(nsub) + 0.5) / nsub - 0.5
+        j, i = np.indices((grid.ny, grid.nx))
+        jj = j.ravel()[:, None, None] + offsets[None, :, None]
+        ii = i.ravel()[:, None, None] + offsets[None, None, :]
+        x, y = grid._xy(ii, jj)
+        edges_x, edges_y = _cell_edges(src_x), _cell_edges(src_y)
+        ix = np.searchsorted(np.sort(edges_x), x.ravel()) - 1
+        iy = np.searchsorted(np.sort(edges_y), y.ravel()) - 1
+        if edges_x[-1] < edges_x[0]:
+            ix = len(src_x) - 1 - ix
+        if edges_y[-1] < edges_y[0]:
+            iy = len(src_y) - 1 - iy
+        inside = (ix >= 0) & (ix < len(src_x)) & (iy >= 0) & (iy < len(src_y))
+        rows = np.repeat(np.arange(grid.nx * grid.ny), nsub * nsub)
+        matrix = sparse.csr_matrix(
+            (np.ones(inside.sum()), (rows[inside], (iy * len(src_x) + ix)[inside])),
+            shape=(grid.nx * grid.ny, len(src_x) * len(src_y)),
+        )
+    covered = np.asarray(matrix.sum(axis=1)).ravel()
+    mask = covered == 0
+    matrix = sparse.diags(np.where(mask, 0.0, 1.0 / np.where(mask, 1, covered))) @ matrix
+    return Weights(matrix.tocsr(), mask)
+
+
+def _weights_dir() -> Optional[Path]:
+    default = Path(
+        os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache"), "rompy", "weights"
+    )
+    path = os.environ.get("ROMPY_WEIGHTS_DIR", str(default))
+    return Path(path) if path else None
+
+
+def _save_weights(weights: Weights, filename: Path):
+    """Write weights atomically so concurrent writers never leave partial files."""
+    filename.parent.mkdir(parents=True, exist_ok=True)
+    matrix = weights.matrix
+    with tempfile.NamedTemporaryFile(dir=filename.parent, suffix=".npz", delete=False) as f:
+        np.savez(
+            f,
+            data=matrix.data,
+            indices=matrix.indices,
+            indptr=matrix.indptr,
+            shape=matrix.shape,
+            mask=weights.mask,
+        )
+    os.replace(f.name, filename)
+
+
+def _load_weights(filename: Path) -> Optional[Weights]:
+    try:
+        with np.load(filename) as f:
+            matrix = sparse.csr_matrix(
+                (f["data"], f["indices"], f["indptr"]), shape=tuple(f["shape"])
+            )
+            return Weights(matrix, f["mask"])
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def grid_weights(
+    method: Literal["bilinear", "nearest", "conservative"],
+    src_x: np.ndarray,
+    src_y: np.ndarray,
+    grid,
+) -> Weights:
+    """Weights regridding a rectilinear grid onto the nodes of a model grid.
+
+    Weights are cached in memory and on disk, keyed by the method, the source
+    coordinates and the fingerprint of the model grid.
+
+    Parameters
+    ----------
+    method: str
+        Interpolation method, `bilinear`, `nearest` or `conservative` (only for
+        regular model grids).
+    src_x: np.ndarray
+        1D x coordinates of the source grid.
+    src_y: np.ndarray
+        1D y coordinates of the source grid.
+    grid: BaseGrid
+        Model grid, weights are defined for its flattened nodes.
+
+    """
+    key = (method, _hash(src_x, src_y), grid.fingerprint)
+    weights = WEIGHTS_CACHE.get(key)
+    if weights is not None:
+        return weights
+    weights_dir = _weights_dir()
+    filename = None
+    if weights_dir is not None:
+        name = hashlib.blake2b(repr(key).encode(), digest_size=16).hexdigest()
+        filename = weights_dir / f"{name}.npz"
+        weights = _load_weights(filename)
+    if weights is None:
+        logger.debug(f"Computing {method} regridding weights")
+        if method == "conservative":
+            if not hasattr(grid, "dx"):
+                raise ValueError("Conservative regridding requires a regular grid")
+            weights = conservative_weights(src_x, src_y, grid)
+        elif method in ("bilinear", "nearest"):
+            func = bilinear_weights if method == "bilinear" else nearest_weights
+            weights = func(src_x, src_y, np.ravel(grid.x), np.ravel(grid.y))
+        else:
+            raise ValueError(f"Unknown regridding method {method}")
+        if filename is not None:
+            _save_weights(weights, filename)
+    WEIGHTS_CACHE.put(key, weights)
+    return weights
+
+
+def regrid(
+    dset: xr.Dataset,
+    grid,
+    method: Literal["bilinear", "nearest", "conservative"] = "bilinear",
+    x: str = "lon",
+    y: str = "lat",
+) -> xr.Dataset:
+    """Interpolate a dataset on a rectilinear grid onto the nodes of a model grid.
+
+    Parameters
+    ----------
+    dset: xr.Dataset
+        Dataset with 1D `x` and `y` coordinates, dask-backed variables are regridded
+        chunk by chunk over their other dimensions.
+    grid: BaseGrid
+        Model grid to interpolate onto.
+    method: str
+        Interpolation method, `bilinear`, `nearest` or `conservative` (only for
+        regular model grids).
+    x: str
+        Name of the x coordinate.
+    y: str
+        Name of the y coordinate.
+
+    Returns
+    -------
+    dsout: xr.Dataset
+        Dataset on the model grid. Unrotated regular grids are defined by 1D `x` and
+        `y` coordinates, other 2D grids have dimensions (j, i) and 2D `x` and `y`
+        coordinates and 1D grids have a `node` dimension.
+
+    """
+    weights = grid_weights(method, dset[x].values, dset[y].values, grid)
+    dsout = apply_weights(dset, weights, src_dims=[y, x], dim="node")
+    # Variables defined over only one of the source dims cannot be regridded
+    partial = [name for name, darr in dsout.data_vars.items() if {x, y} & set(darr.dims)]
+    if partial:
+        logger.warning(f"Dropping variables {partial} not defined over both {y}, {x}")
+        dsout = dsout.drop_vars(partial).drop_dims([x, y], errors="ignore")
+    shape = np.shape(grid.x)
+    if len(shape) == 1:
+        return dsout.assign_coords(
+            {x: ("node", np.asarray(grid.x)), y: ("node", np.asarray(grid.y))}
+        )
+    if getattr(grid, "rot", None) == 0:
+        dims = (y, x)
+        coords = {x: np.asarray(grid.x)[0, :], y: np.asarray(grid.y)[:, 0]}
+    else:
+        dims = ("j", "i")
+        coords = {x: (dims, np.asarray(grid.x)), y: (dims, np.asarray(grid.y))}
+    data_vars = {}
+    for name, darr in dsout.data_vars.items():
+        if "node" in darr.dims:
+            axis = darr.dims.index("node")
+            data = darr.data.reshape(darr.shape[:axis] + shape + darr.shape[axis + 1 :])
+            darr = xr.DataArray(
+                data,
+                dims=darr.dims[:axis] + dims + darr.dims[axis + 1 :],
+                attrs=darr.attrs,
+            )
+        data_vars[name] = darr
+    return xr.Dataset(data_vars, coords=dsout.coords, attrs=dsout.attrs).assign_coords(
+        coords
+    )
+
+
+def apply_weights(
+    dset: xr.Dataset, weights: Weights, src_dims: list[str], dim: str = "site"
+) -> xr.Dataset:
+    """Apply interpolation weights to all variables defined over the source dims.
+
+    Variables that are not defined over all the source dims are returned unchanged.
+
+    Parameters
+    ----------
+    dset: xr.Dataset
+        Dataset to interpolate, dask-backed variables are processed chunk by chunk.
+    weights: Weights
+        Interpolation weights from the flattened source dims.
+    src_dims: list[str]
+        Dimensions of the dataset defining the source points, in the order they are
+        flattened into the weights.
+    dim: str
+        Name of the dimension of the target points in the output dataset.
+
+    """
+    dsout = {}
+    for name, darr in dset.data_vars.items():
+        if not set(src_dims) <= set(darr.dims):
+            dsout[name] = darr
+            continue
+        if darr.chunks is not None:
+            darr = darr.chunk({d: -1 for d in src_dims})
+        out = xr.apply_ufunc(
+            weights,
+            darr,
+            kwargs={"ndims": len(src_dims)},
+            input_core_dims=[src_dims],
+            output_core_dims=[[dim]],
+            exclude_dims=set(src_dims) & {dim},
+            dask="parallelized",
+            output_dtypes=[np.result_type(darr.dtype, np.float32)],
+            dask_gufunc_kwargs={"output_sizes": {dim: weights.shape[0]}},
+            keep_attrs=True,
+        )
+        # Keep the position of the interpolated dims in the output dims
+        position = min(darr.dims.index(d) for d in src_dims)
+        dims = [d for d in darr.dims if d not in src_dims]
+        out = out.transpose(*dims[:position], dim, *dims[position:])
+        dsout[name] = out
+    coords = {k: v for k, v in dset.coords.items() if not set(src_dims) & set(v.dims)}
+    return xr.Dataset(dsout, coords=coords, attrs=dset.attrs)
@@ -0,0 +1,197 @@
+"""Manifest of the files staged by a model run for incremental regeneration.
+
+Each group of files written during generation (the forcing files of a data object or
+a rendered template file) is recorded in the manifest with the fingerprint of the
+inputs that define it. A later generation into the same staging directory skips the
+groups whose fingerprint did not change and whose files were not modified since.
+
+"""
+import contextlib
+import contextvars
+import copy
+import json
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Optional
+
+from rompy.core.cache import _decode, _encode
+
+logger = logging.getLogger(__name__)
+
+
+MANIFEST_NAME = ".rompy_manifest.json"
+
+
+def _stat(path: Path) -> list[int]:
+    stat = path.stat()
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+class Manifest:
+    """Fingerprints of the files staged in a staging directory.
+
+    Parameters
+    ----------
+    staging_dir: str | Path
+        Staging directory of the model run, the manifest is stored in it.
+    force: bool
+        Regenerate all files regardless of the fingerprints of the previous run.
+
+    """
+
+    def __init__(self, staging_dir: str | Path, force: bool = False):
+        self.staging_dir = Path(staging_dir)
+        self.force = force
+        self.entries = {}
+        self.written = []
+        self.skipped = []
+        self._previous = self._load()
+        self._lock = threading.Lock()
+
+    def __getstate__(self) -> dict:
+        # Picklable to record entries in the workers of a process pool
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state: dict):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def child(self) -> "Manifest":
+        """Empty manifest checking the same previous entries, e.g., in a worker."""
+        child = copy.copy(self)
+        child.entries, child.written, child.skipped = {}, [], []
+        child._lock = threading.Lock()
+        return child
+
+    def merge(self, other: "Manifest"):
+        """Add the entries written and skipped in another manifest of this run."""
+        with self._lock:
+            self.entries.update(other.entries)
+            self.written.extend(other.written)
+            self.skipped.extend(other.skipped)
+
+    @property
+    def path(self) -> Path:
+        return self.staging_dir / MANIFEST_NAME
+
+    def _load(self) -> dict:
+        try:
+            return json.loads(self.path.read_text())["entries"]
+        except (OSError, ValueError, KeyError):
+            return {}
+
+    def _relative(self, path: Path) -> str:
+        path = Path(path).absolute()
+        try:
+            return path.relative_to(self.staging_dir.absolute()).as_posix()
+        except ValueError:
+            return str(path)
+
+    def _is_current(self, entry: Optional[dict], fingerprint: str) -> bool:
+        if self.force or entry is None or entry["fingerprint"] != fingerprint:
+            return False
+        for name, stat in entry["files"].items():
+            path = self.staging_dir / name
+            if not path.is_file() or _stat(path) != stat:
+                return False
+        return True
+
+    def fetch(
+        self, name: str, fingerprint: str, destdir: Optional[str | Path] = None
+    ) -> tuple[bool, Any]:
+        """Check if the files of an entry are up to date.
+
+        Parameters
+        ----------
+        name: str
+            Name of the entry.
+        fingerprint: str
+            Fingerprint of the inputs defining the files of the entry.
+        destdir: str | Path, optional
+            Directory paths in the recorded value are rebased onto.
+
+        Returns
+        -------
+        current: bool
+            True if the files are up to date and can be skipped.
+        value: Any
+            The value recorded with the entry.
+
+        """
+        entry = self._previous.get(name)
+        if not self._is_current(entry, fingerprint):
+            return False, None
+        with self._lock:
+            self.entries[name] = entry
+            self.skipped.append(name)
+        return True, _decode(entry.get("value"), Path(destdir or self.staging_dir))
+
+    def record(
+        self,
+        name: str,
+        fingerprint: str,
+        files: list[Path],
+        value: Any = None,
+        destdir: Optional[str | Path] = None,
+    ):
+        """Record the files written for an entry.
+
+        Parameters
+        ----------
+        name: str
+            Name of the entry.
+        fingerprint: str
+            Fingerprint of the inputs defining the files of the entry.
+        files: list[Path]
+            Paths of the files written.
+        value: Any
+            Value to return when the entry is skipped, paths must be under destdir.
+        destdir: str | Path, optional
+            Directory paths in value are made relative to.
+
+        """
+        entry = dict(
+            fingerprint=fingerprint,
+            files={self._relative(path): _stat(Path(path)) for path in files},
+            value=_encode(value, Path(destdir or self.staging_dir)),
+        )
+        with self._lock:
+            self.entries[name] = entry
+            self.written.append(name)
+
+    def save(self):
+        """Write the manifest into the staging directory."""
+        record = dict(entries=self.entries, report=self.report())
+        self.path.write_text(json.dumps(record, indent=2))
+
+    def report(self) -> dict:
+        """Names of the entries written and skipped in this generation."""
+        return dict(written=sorted(self.written), skipped=sorted(self.skipped))
+
+    @contextlib.contextmanager
+    def activate(self):
+        """Context manager defining this manifest as the one files are recorded in."""
+        token = _ACTIVE_MANIFEST.set(self)
+        try:
+            yield self
+        finally:
+            _ACTIVE_MANIFEST.reset(token)
+
+
+_ACTIVE_MANIFEST: contextvars.ContextVar[Optional[Manifest]] = contextvars.ContextVar(
+    "manifest", default=None
+)
+
+
+def active_manifest() -> Optional[Manifest]:
+    """Return the active manifest, None if generation is not incremental."""
+    return _ACTIVE_MANIFEST.get()
+
+
+def load_report(staging_dir: str | Path) -> dict:
+    """Report of the last generation recorded in the manifest of staging_dir."""
+    path = Path(staging_dir) / MANIFEST_NAME
+    return json.loads(path.read_text())["report"]
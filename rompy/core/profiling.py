@@ -0,0 +1,242 @@
+"""Profiling of the stages of the generation of a model run.
+
+Stages are instrumented with the `profile_stage` context manager, which does nothing
+unless a `Profiler` is active. Each stage records its wall time, the bytes read and
+written by the process and the peak resident memory while it ran, attributed to the
+id of the data object being processed, inherited from the enclosing stage if not
+given.
+
+Note
+----
+Bytes read and written and memory are process-wide so they include the activity of
+other stages running concurrently in other threads.
+
+"""
+import contextlib
+import contextvars
+import json
+import logging
+import os
+import resource
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+# Units of the peak resident memory reported by getrusage, bytes on macOS
+MAXRSS_UNITS = 1 if sys.platform == "darwin" else 1024
+
+
+def _rss() -> int:
+    """Current resident memory of the process in bytes."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * PAGE_SIZE
+    except OSError:
+        # Peak rather than current memory where procfs is not available
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * MAXRSS_UNITS
+
+
+def _io() -> tuple[int, int]:
+    """Bytes read and written by the process, zero where procfs is not available."""
+    try:
+        with open("/proc/self/io") as f:
+            counters = dict(line.split(": ") for line in f.read().splitlines())
+        return int(counters["rchar"]), int(counters["wchar"])
+    except (OSError, KeyError, ValueError):
+        return 0, 0
+
+
+class _Stage:
+    def __init__(self, name: str, id: Optional[str], start: float):
+        self.name = name
+        self.id = id
+        self.start = start
+        self.io = _io()
+        self.peak_rss = _rss()
+
+    def sample(self, rss: int):
+        self.peak_rss = max(self.peak_rss, rss)
+
+
+class Profiler:
+    """Record the resources used by the stages run while it is active.
+
+    Parameters
+    ----------
+    interval: float
+        Interval in seconds at which memory is sampled to find the peak of each stage.
+    callback: Callable, optional
+        Function called with the record of each stage as it completes.
+
+    Examples
+    --------
+    >>> profiler = Profiler()
+    >>> with profiler.activate():
+    ...     model.generate()
+    >>> print(profiler.summary())
+
+    """
+
+    def __init__(self, interval: float = 0.05, callback: Optional[Callable] = None):
+        self.interval = interval
+        self.callback = callback
+        self.records = []
+        self._running = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._t0 = None
+
+    def __getstate__(self) -> dict:
+        # Picklable so the records of a process pool worker are returned to the caller
+        state = self.__dict__.copy()
+        for name in ("callback", "_running", "_lock", "_stop"):
+            del state[name]
+        return state
+
+    def __setstate__(self, state: dict):
+        self.__dict__.update(state)
+        self.callback = None
+        self._running = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def merge(self, other: "Profiler"):
+        """Add the records of a profiler active in another process of this host.
+
+        Start times are shifted to be relative to the activation of this profiler,
+        `time.perf_counter` is a system-wide clock.
+
+        """
+        offset = other._t0 - self._t0 if None not in (other._t0, self._t0) else 0.0
+        for record in other.records:
+            record = dict(record, start=record["start"] + offset)
+            with self._lock:
+                self.records.append(record)
+            if self.callback is not None:
+                self.callback(record)
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            rss = _rss()
+            with self._lock:
+                for stage in self._running:
+                    stage.sample(rss)
+
+    @contextlib.contextmanager
+    def activate(self):
+        """Context manager profiling the stages run within it."""
+        self._t0 = time.perf_counter()
+        self._stop.clear()
+        sampler = threading.Thread(target=self._sample, daemon=True)
+        sampler.start()
+        token = _ACTIVE_PROFILER.set(self)
+        try:
+            yield self
+        finally:
+            _ACTIVE_PROFILER.reset(token)
+            self._stop.set()
+            sampler.join()
+
+    @contextlib.contextmanager
+    def stage(self, name: str, id: Optional[str] = None):
+        """Context manager recording a stage."""
+        if id is None and _CURRENT_STAGE.get() is not None:
+            id = _CURRENT_STAGE.get().id
+        stage = _Stage(name, id, time.perf_counter())
+        with self._lock:
+            self._running.add(stage)
+        token = _CURRENT_STAGE.set(stage)
+        try:
+            yield stage
+        finally:
+            _CURRENT_STAGE.reset(token)
+            end = time.perf_counter()
+            read, written = _io()
+            stage.sample(_rss())
+            with self._lock:
+                self._running.discard(stage)
+            record = dict(
+                stage=name,
+                id=id,
+                start=stage.start - self._t0 if self._t0 is not None else 0.0,
+                wall_time=end - stage.start,
+                bytes_read=read - stage.io[0],
+                bytes_written=written - stage.io[1],
+                peak_rss=stage.peak_rss,
+            )
+            with self._lock:
+                self.records.append(record)
+            if self.callback is not None:
+                self.callback(record)
+
+    def to_json(self, filename: str | Path):
+        """Write the stage records to a JSON file."""
+        Path(filename).write_text(json.dumps(self.records, indent=2))
+        logger.info(f"Profile written to {filename}")
+
+    def summary(self) -> str:
+        """Table of the stage records sorted by start time."""
+        return summarize(self.records)
+
+
+_ACTIVE_PROFILER: contextvars.ContextVar[Optional[Profiler]] = contextvars.ContextVar(
+    "profiler", default=None
+)
+_CURRENT_STAGE: contextvars.ContextVar[Optional[_Stage]] = contextvars.ContextVar(
+    "profile_stage", default=None
+)
+
+
+def active_profiler() -> Optional[Profiler]:
+    """Return the active profiler, None if profiling is not enabled."""
+    return _ACTIVE_PROFILER.get()
+
+
+@contextlib.contextmanager
+def profile_stage(name: str, id: Optional[str] = None):
+    """Record a stage in the active profiler, do nothing if none is active.
+
+    Parameters
+    ----------
+    name: str
+        Name of the stage, e.g., `open` or `write`.
+    id: str, optional
+        Id of the data object processed in the stage, inherited from the enclosing
+        stage if not provided.
+
+    """
+    profiler = active_profiler()
+    if profiler is None:
+        yield None
+    else:
+        with profiler.stage(name, id) as stage:
+            yield stage
+
+
+def summarize(records: list[dict]) -> str:
+    """Table of profile records sorted by start time.
+
+    Parameters
+    ----------
+    records: list[dict]
+        Stage records of a `Profiler`, e.g., loaded from its JSON file.
+
+    """
+    lines = [
+        f"{'stage':<12} {'id':<20} {'time (s)':>9} {'read (MB)':>10} "
+        f"{'written (MB)':>13} {'peak RSS (MB)':>14}"
+    ]
+    for record in sorted(records, key=lambda r: r["start"]):
+        lines.append(
+            f"{record['stage']:<12} {str(record['id'] or ''):<20} "
+            f"{record['wall_time']:>9.3f} {record['bytes_read'] / 1e6:>10.2f} "
+            f"{record['bytes_written'] / 1e6:>13.2f} {record['peak_rss'] / 1e6:>14.1f}"
+        )
+    return "\n".join(lines)
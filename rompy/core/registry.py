@@ -0,0 +1,79 @@
+"""Registry of the model configuration classes.
+
+Configuration classes are registered by their `model_type` as import paths and are
+only imported when a configuration of that type is used, so that running a model does
+not pay the import cost of every other model backend. Third party packages can
+register their own configuration classes in the `rompy.config` entry point group::
+
+    [project.entry-points."rompy.config"]
+    mymodel = "mypackage.config:MyModelConfig"
+
+"""
+import importlib
+import logging
+from importlib.metadata import entry_points
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+ENTRY_POINT_GROUP = "rompy.config"
+
+BUILTIN_CONFIGS = {
+    "base": "rompy.core.config:BaseConfig",
+    "swan": "rompy.swan.config:SwanConfig",
+    "swanconfig": "rompy.swan.config:SwanConfigComponents",
+    "SWANCONFIG": "rompy.swan.config:SwanConfigComponents",
+    "schismcsiro": "rompy.schism.config:SchismCSIROConfig",
+}
+
+_REGISTRY: Optional[dict[str, str]] = None
+
+
+def _registry() -> dict[str, str]:
+    global _REGISTRY
+    if _REGISTRY is None:
+        _REGISTRY = dict(BUILTIN_CONFIGS)
+        for entry_point in entry_points(group=ENTRY_POINT_GROUP):
+            _REGISTRY[entry_point.name] = entry_point.value
+    return _REGISTRY
+
+
+def register_config(model_type: str, path: str):
+    """Register a configuration class.
+
+    Parameters
+    ----------
+    model_type: str
+        The `model_type` discriminator value of the configuration class.
+    path: str
+        Import path of the class in the form `module:ClassName`.
+
+    """
+    _registry()[model_type] = path
+
+
+def config_types() -> list[str]:
+    """Model types of all registered configuration classes."""
+    return list(_registry())
+
+
+def load_config_class(model_type: str) -> type:
+    """Import and return the configuration class registered for model_type.
+
+    Parameters
+    ----------
+    model_type: str
+        The `model_type` discriminator value of the configuration class.
+
+    """
+    try:
+        path = _registry()[model_type]
+    except KeyError as err:
+        raise ValueError(
+            f"Unknown config model_type '{model_type}', "
+            f"must be one of {config_types()}"
+        ) from err
+    module, name = path.split(":")
+    logger.debug(f"Loading config class {path}")
+    return getattr(importlib.import_module(module), name)
@@ -1,12 +1,27 @@
+import contextlib
+import functools
+import hashlib
+import json
 import logging
 import os
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
 from pathlib import Path
 
 import cookiecutter.config as cc_config
 import cookiecutter.generate as cc_generate
 import cookiecutter.repository as cc_repository
-from cookiecutter.exceptions import NonTemplatedInputDirException
+import cookiecutter.vcs as cc_vcs
+import numpy as np
+from cookiecutter.exceptions import NonTemplatedInputDirException, UnknownRepoType
 from cookiecutter.find import find_template
+from jinja2 import BytecodeCache, nodes
+
+from rompy.core.cache import LRUCache
+from rompy.core.manifest import active_manifest
 
 logger = logging.getLogger(__name__)
 
@@ -52,21 +67,340 @@ def find_template(repo_dir, env):
 cc_repository.repository_has_cookiecutter_json = repository_has_cookiecutter_json
 cc_generate.find_template = find_template
 
+# Generation metadata changing on every run, excluded from the template fingerprints
+# so unchanged files keep the metadata of the generation that wrote them
+VOLATILE_REFERENCES = {
+    ("runtime", "_generated_at"),
+    ("runtime", "_generated_on"),
+    ("runtime", "_generated_by"),
+}
+
+
+def _reference(node) -> tuple | None:
+    """Path of the context variable a jinja expression node refers to."""
+    if isinstance(node, nodes.Name) and node.ctx == "load":
+        return (node.name,)
+    elif isinstance(node, nodes.Getattr):
+        path = _reference(node.node)
+        return path + (node.attr,) if path else None
+    elif isinstance(node, nodes.Getitem) and isinstance(node.arg, nodes.Const):
+        path = _reference(node.node)
+        return path + (node.arg.value,) if path else None
+    return None
+
+
+def _references(node, refs: set) -> set:
+    """Longest paths of the context variables referenced under a jinja node."""
+    path = _reference(node)
+    if path is not None:
+        refs.add(path)
+    else:
+        for child in node.iter_child_nodes():
+            _references(child, refs)
+    return refs
+
+
+def _resolve(context: dict, path: tuple):
+    value = context
+    for key in path:
+        if isinstance(value, dict):
+            value = value.get(key)
+        else:
+            value = getattr(value, str(key), None)
+    return value
+
+
+def _token(value) -> bytes:
+    if callable(value) and getattr(value, "__self__", None) is not None:
+        # Bound methods are identified by their name and instance, not their address
+        return value.__name__.encode() + _token(value.__self__)
+    if isinstance(value, np.ndarray):
+        return np.ascontiguousarray(value).tobytes()
+    if hasattr(value, "model_dump_json"):
+        try:
+            return value.model_dump_json().encode()
+        except Exception:
+            pass
+    return repr(value).encode()
+
+
+def template_fingerprint(infile: str, context: dict, env) -> str:
+    """Fingerprint of a template file and the context values it references.
+
+    Parameters
+    ----------
+    infile: str
+        Path of the template file.
+    context: dict
+        The context the template is rendered with.
+    env: jinja2.Environment
+        The environment the template is rendered with.
+
+    """
+    sha = hashlib.sha256(infile.encode())
+    source = Path(infile).read_bytes()
+    sha.update(source)
+    refs = set()
+    if not _is_static(infile, env):
+        try:
+            refs = _references(env.parse(source.decode()), set())
+        except Exception:
+            # Binary files are copied without rendering
+            pass
+    for path in sorted(refs - VOLATILE_REFERENCES, key=str):
+        sha.update(repr(path).encode())
+        sha.update(_token(_resolve(context, path)))
+    return sha.hexdigest()
+
+
+# Template files larger than this are copied without rendering if they contain no
+# jinja delimiters
+STATIC_SIZE = 2**15
+
+
+def _is_static(infile: str, env) -> bool:
+    """Check if infile is a large template file with nothing to render."""
+    if os.path.getsize(infile) < STATIC_SIZE:
+        return False
+    markers = [
+        s.encode()
+        for s in (
+            env.variable_start_string,
+            env.block_start_string,
+            env.comment_start_string,
+        )
+    ]
+    overlap = max(len(marker) for marker in markers) - 1
+    tail = b""
+    with open(infile, "rb") as f:
+        while chunk := f.read(2**20):
+            chunk = tail + chunk
+            if any(marker in chunk for marker in markers):
+                return False
+            tail = chunk[-overlap:]
+    return True
+
+
+def _copy(infile: str, outfile: str):
+    shutil.copyfile(infile, outfile)
+    shutil.copymode(infile, outfile)
+
+
+def _generate_file(project_dir, infile, context, env, skip_if_file_exists=False):
+    """Render a template file streaming the output into the generated file.
+
+    Replaces the cookiecutter implementation which builds the whole rendered file
+    as a single string in memory, and copies binary and large static files.
+
+    Context values are streamed too if the template iterates over them, e.g., the
+    SWAN output block with `{% for chunk in config.output %}{{ chunk }}{% endfor %}`.
+
+    """
+    outfile = os.path.join(project_dir, env.from_string(infile).render(**context))
+    if os.path.isdir(outfile):
+        return
+    if skip_if_file_exists and os.path.exists(outfile):
+        return
+    if cc_generate.is_binary(infile) or _is_static(infile, env):
+        logger.debug(f"Copying {infile} to {outfile} without rendering")
+        _copy(infile, outfile)
+        return
+    tmpl = env.get_template(infile.replace(os.path.sep, "/"))
+    newline = context["cookiecutter"].get("_new_lines")
+    if not newline:
+        with open(infile, encoding="utf-8") as f:
+            f.readline()
+        newline = f.newlines[0] if isinstance(f.newlines, tuple) else f.newlines
+    try:
+        with open(outfile, "w", encoding="utf-8", newline=newline) as f:
+            for chunk in tmpl.generate(**context):
+                f.write(chunk)
+    except Exception:
+        # Do not leave a partially rendered file behind
+        with contextlib.suppress(OSError):
+            os.remove(outfile)
+        raise
+    shutil.copymode(infile, outfile)
+
+
+def generate_file(project_dir, infile, context, env, skip_if_file_exists=False):
+    """Render a template file unless it is unchanged in the active manifest."""
+    manifest = active_manifest()
+    if manifest is None:
+        return _generate_file(project_dir, infile, context, env, skip_if_file_exists)
+    outfile = Path(project_dir) / env.from_string(infile).render(**context)
+    if outfile.is_dir():
+        return
+    name = f"template:{manifest._relative(outfile)}"
+    fingerprint = template_fingerprint(infile, context, env)
+    current, _ = manifest.fetch(name, fingerprint)
+    if current:
+        logger.debug(f"Skipping unchanged template file {outfile}")
+        return
+    _generate_file(project_dir, infile, context, env, skip_if_file_exists)
+    manifest.record(name, fingerprint, [outfile])
+
+
+cc_generate.generate_file = generate_file
+
+# Cookiecutter changes the working directory while rendering so renders cannot run
+# concurrently in threads of the same process. Note relative paths used by other
+# threads while a render is in progress are still resolved from the template dir.
+_RENDER_LOCK = threading.Lock()
+
+
+class MemoryBytecodeCache(BytecodeCache):
+    """In-process cache of compiled jinja templates shared across renders.
+
+    Entries are keyed by the absolute path of the template file and jinja discards
+    them if the checksum of the template source changed.
+
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        self._cache = LRUCache(maxsize=maxsize)
+
+    def get_cache_key(self, name, filename=None) -> str:
+        return super().get_cache_key(name, os.path.abspath(filename or name))
+
+    def load_bytecode(self, bucket):
+        code = self._cache.get(bucket.key)
+        if code is not None:
+            bucket.bytecode_from_string(code)
+
+    def dump_bytecode(self, bucket):
+        self._cache.put(bucket.key, bucket.bytecode_to_string())
+
+    def clear(self):
+        self._cache.clear()
+
+
+BYTECODE_CACHE = MemoryBytecodeCache()
+
+# Repository directories of the templates already resolved in this process
+TEMPLATE_CACHE = LRUCache(maxsize=32)
+
+
+@functools.lru_cache(maxsize=8)
+def _user_config(config_file: str | None) -> dict:
+    return cc_config.get_user_config(config_file=config_file, default_config=False)
+
+
+def _resolve_checkout(repo_url: str, checkout: str | None) -> str | None:
+    """Commit SHA of the checkout of a remote git repository, None if unresolved."""
+    ref = checkout or "HEAD"
+    try:
+        out = subprocess.check_output(
+            ["git", "ls-remote", repo_url, ref], stderr=subprocess.DEVNULL, text=True
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    if out.split():
+        return out.split()[0]
+    if re.fullmatch(r"[0-9a-f]{7,40}", ref):
+        # The checkout is already a commit
+        return ref
+    return None
+
+
+def _clone_cached(template: str, checkout: str | None, clone_to_dir: str) -> str | None:
+    """Clone a git template once per commit into the cookiecutters directory.
+
+    Returns the repository directory or None if the template is not a git repository
+    or its checkout cannot be resolved, in which case cookiecutter handles it.
+
+    """
+    try:
+        repo_type, repo_url = cc_vcs.identify_repo(template)
+    except UnknownRepoType:
+        return None
+    if repo_type != "git":
+        return None
+    sha = _resolve_checkout(repo_url, checkout)
+    if sha is None:
+        return None
+    name = repo_url.rstrip("/").split("/")[-1].split(":")[-1].rsplit(".git")[0]
+    repo_dir = Path(clone_to_dir) / "rompy" / f"{name}-{sha}"
+    if not repo_dir.is_dir():
+        logger.info(f"Cloning template {template} at {sha[:12]}")
+        repo_dir.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.TemporaryDirectory(dir=repo_dir.parent) as tmpdir:
+            cloned = cc_vcs.clone(template, checkout=sha, clone_to_dir=tmpdir, no_input=True)
+            # Another process may have cloned the same commit concurrently
+            with contextlib.suppress(OSError):
+                os.replace(cloned, repo_dir)
+    return str(repo_dir)
+
+
+def template_dir(template: str, checkout: str | None = None) -> str:
+    """Local directory of a template, cloned and cached if it is a git repository.
+
+    Git templates are cloned once per resolved commit into the cookiecutters
+    directory and reused by all later renders. The directory resolved for each
+    template and checkout is also cached in this process, so a branch checkout is
+    only resolved to its latest commit once per process.
+
+    Parameters
+    ----------
+    template: str
+        Path or repository URL of the template.
+    checkout: str, optional
+        Branch, tag or commit of the template repository.
+
+    """
+    config_dict = _user_config(os.environ.get("COOKIECUTTER_CONFIG"))
+    expanded = cc_repository.expand_abbreviations(template, config_dict["abbreviations"])
+    is_repo = cc_repository.is_repo_url(expanded)
+    # Local paths are relative to the working directory
+    key = (expanded if is_repo else os.path.abspath(expanded), checkout)
+    repo_dir = TEMPLATE_CACHE.get(key)
+    if repo_dir is not None and os.path.isdir(repo_dir):
+        return repo_dir
+    repo_dir = None
+    if is_repo and not cc_repository.is_zip_file(expanded):
+        repo_dir = _clone_cached(expanded, checkout, config_dict["cookiecutters_dir"])
+    if repo_dir is None:
+        repo_dir, _ = cc_repository.determine_repo_dir(
+            template=template,
+            abbreviations=config_dict["abbreviations"],
+            clone_to_dir=config_dict["cookiecutters_dir"],
+            checkout=checkout,
+            no_input=True,
+        )
+        repo_dir = os.path.abspath(repo_dir)
+    TEMPLATE_CACHE.put(key, repo_dir)
+    return repo_dir
+
 
 def render(context, template, output_dir, checkout=None):
-    context["cookiecutter"] = {}
-    config_dict = cc_config.get_user_config(
-        config_file=None,
-        default_config=False,
-    )
+    with _RENDER_LOCK:
+        return _render(context, template, output_dir, checkout)
 
-    repo_dir, cleanup = cc_repository.determine_repo_dir(
-        template=template,
-        abbreviations=config_dict["abbreviations"],
-        clone_to_dir=config_dict["cookiecutters_dir"],
-        checkout=checkout,
-        no_input=True,
-    )
+
+# Cookiecutter settings templates can declare in their cookiecutter.json
+TEMPLATE_SETTINGS = ("_copy_without_render", "_new_lines")
+
+
+def _template_settings(repo_dir: str) -> dict:
+    """Cookiecutter settings declared in the cookiecutter.json of a template.
+
+    Only the settings in `TEMPLATE_SETTINGS` are used, e.g., `_copy_without_render`
+    with the glob patterns of the template files copied without rendering.
+
+    """
+    try:
+        with open(os.path.join(repo_dir, "cookiecutter.json")) as f:
+            settings = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return {key: settings[key] for key in TEMPLATE_SETTINGS if key in settings}
+
+
+def _render(context, template, output_dir, checkout=None):
+    repo_dir = template_dir(template, checkout)
+    context["cookiecutter"] = _template_settings(repo_dir)
+    # Compiled templates are reused across renders through the bytecode cache
+    context["cookiecutter"]["_jinja2_env_vars"] = {"bytecode_cache": BYTECODE_CACHE}
     context["_template"] = repo_dir
 
     staging_dir = cc_generate.generate_files(
@@ -0,0 +1,278 @@
+"""Scheduler to run independent data fetching tasks concurrently."""
+import contextlib
+import contextvars
+import logging
+import multiprocessing
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Literal, Optional
+
+from pydantic import Field, model_validator
+
+from rompy.core.manifest import Manifest, active_manifest
+from rompy.core.profiling import Profiler, active_profiler
+from rompy.core.types import RompyBaseModel
+
+logger = logging.getLogger(__name__)
+
+
+class SchedulerConfig(RompyBaseModel):
+    """Configuration of the scheduler running the data fetching tasks.
+
+    With the default `max_workers=1` all tasks run serially in the calling thread,
+    the same way they would run without the scheduler.
+
+    Note
+    ----
+    Tasks running in a process pool must be picklable and changes they make to the
+    data objects are not seen by the calling process, only their return values.
+
+    Tasks nested in tasks running in a process pool run serially in the worker, the
+    files and stages they record in the active manifest and profiler are merged
+    into the ones of the calling process when each task completes.
+
+    Timeouts are only supported with the process executor, the workers of the pool
+    are terminated when a task times out since threads cannot be interrupted.
+
+    """
+
+    executor: Literal["thread", "process"] = Field(
+        default="thread",
+        description="Type of pool used to run tasks concurrently",
+    )
+    max_workers: int = Field(
+        default=1,
+        description="Maximum number of tasks to run concurrently",
+        ge=1,
+    )
+    timeout: Optional[float] = Field(
+        default=None,
+        description=(
+            "Default timeout in seconds for each task, no timeout if None, only "
+            "supported with the process executor"
+        ),
+        gt=0,
+    )
+
+    @model_validator(mode="after")
+    def check_timeout(self) -> "SchedulerConfig":
+        if self.timeout is not None and self.executor != "process":
+            raise ValueError("Timeouts are only supported with the process executor")
+        return self
+
+    @contextlib.contextmanager
+    def activate(self):
+        """Context manager defining this config as the one used by `run_tasks`."""
+        token = _ACTIVE_CONFIG.set(self)
+        try:
+            yield self
+        finally:
+            _ACTIVE_CONFIG.reset(token)
+
+
+_ACTIVE_CONFIG: contextvars.ContextVar[Optional[SchedulerConfig]] = (
+    contextvars.ContextVar("scheduler_config", default=None)
+)
+
+
+def active_scheduler() -> SchedulerConfig:
+    """Return the active scheduler config, the serial default if none is active."""
+    return _ACTIVE_CONFIG.get() or SchedulerConfig()
+
+
+class Task(RompyBaseModel):
+    """A unit of work run by the scheduler.
+
+    Parameters
+    ----------
+    name: str
+        Unique name of the task, used to declare dependencies.
+    func: Callable
+        Function to call.
+    args: tuple
+        Positional arguments to call the function with.
+    kwargs: dict
+        Keyword arguments to call the function with.
+    depends_on: list[str]
+        Names of the tasks that must complete before this task starts.
+    timeout: float, optional
+        Timeout in seconds, overrides the default timeout of the scheduler. Only
+        supported with the process executor, whose workers are terminated when the
+        timeout is reached.
+
+    """
+
+    name: str
+    func: Callable
+    args: tuple = ()
+    kwargs: dict = {}
+    depends_on: list[str] = []
+    timeout: Optional[float] = None
+
+    def __call__(self) -> Any:
+        logger.debug(f"Running task {self.name}")
+        return self.func(*self.args, **self.kwargs)
+
+
+def _check_dependencies(tasks: list[Task]):
+    """Ensure task names are unique and dependencies exist and are not circular."""
+    names = [task.name for task in tasks]
+    if len(names) != len(set(names)):
+        raise ValueError(f"Task names must be unique: {names}")
+    depends = {task.name: set(task.depends_on) for task in tasks}
+    for name, deps in depends.items():
+        if deps - set(names):
+            raise ValueError(f"Task {name} depends on unknown tasks {deps - set(names)}")
+    done = set()
+    while len(done) < len(names):
+        ready = {name for name, deps in depends.items() if deps <= done} - done
+        if not ready:
+            raise ValueError(f"Circular dependencies between tasks {set(names) - done}")
+        done |= ready
+
+
+def _run_serial(tasks: list[Task]) -> dict:
+    results = {}
+    pending = list(tasks)
+    while pending:
+        task = next(t for t in pending if set(t.depends_on) <= results.keys())
+        results[task.name] = task()
+        pending.remove(task)
+    return results
+
+
+def _run_in_worker(
+    task: Task, manifest: Optional[Manifest], profiler: Optional[Profiler]
+) -> tuple:
+    """Run a task in a process pool worker.
+
+    The task runs in a fresh context where nested tasks run serially, since pool
+    workers cannot start processes, and files and stages are recorded in copies of
+    the manifest and profiler of the caller. These are returned with the result to
+    be merged into the originals.
+
+    """
+
+    def run():
+        with contextlib.ExitStack() as stack:
+            stack.enter_context(SchedulerConfig().activate())
+            if manifest is not None:
+                stack.enter_context(manifest.activate())
+            if profiler is not None:
+                stack.enter_context(profiler.activate())
+            return task()
+
+    return contextvars.Context().run(run), manifest, profiler
+
+
+def _submit_process(pool, task: Task) -> Future:
+    """Run task in the process pool, the future is set when the task completes."""
+    manifest = active_manifest()
+    profiler = active_profiler()
+    args = (
+        task,
+        manifest.child() if manifest is not None else None,
+        Profiler(interval=profiler.interval) if profiler is not None else None,
+    )
+    future = Future()
+    pool.apply_async(
+        _run_in_worker,
+        args,
+        callback=future.set_result,
+        error_callback=future.set_exception,
+    )
+    return future
+
+
+def _merge_worker(output: tuple) -> Any:
+    """Merge what a process pool worker recorded and return the task result."""
+    result, manifest, profiler = output
+    if manifest is not None:
+        active_manifest().merge(manifest)
+    if profiler is not None:
+        active_profiler().merge(profiler)
+    return result
+
+
+def _run_pool(tasks: list[Task], config: SchedulerConfig) -> dict:
+    if config.executor == "process":
+        # A multiprocessing pool rather than an executor so workers can be terminated
+        pool = multiprocessing.Pool(processes=config.max_workers)
+    else:
+        executor = ThreadPoolExecutor(max_workers=config.max_workers)
+    results = {}
+    running = {}
+    pending = list(tasks)
+    try:
+        while pending or running:
+            for task in [t for t in pending if set(t.depends_on) <= results.keys()]:
+                if config.executor == "process":
+                    future = _submit_process(pool, task)
+                else:
+                    # Propagate the active scheduler config to nested tasks
+                    future = executor.submit(contextvars.copy_context().run, task)
+                timeout = task.timeout or config.timeout
+                deadline = time.monotonic() + timeout if timeout else None
+                running[future] = (task, deadline)
+                pending.remove(task)
+            deadlines = [d for _, d in running.values() if d is not None]
+            wait_for = max(min(deadlines) - time.monotonic(), 0) if deadlines else None
+            done, _ = wait(running, timeout=wait_for, return_when=FIRST_COMPLETED)
+            for future in done:
+                task, _ = running.pop(future)
+                results[task.name] = future.result()
+                if config.executor == "process":
+                    results[task.name] = _merge_worker(results[task.name])
+            now = time.monotonic()
+            for task, deadline in running.values():
+                if deadline is not None and now >= deadline:
+                    raise TimeoutError(
+                        f"Task {task.name} timed out after "
+                        f"{task.timeout or config.timeout} seconds"
+                    )
+    finally:
+        if config.executor == "process":
+            # Tasks still running when a task fails or times out are killed
+            if running:
+                pool.terminate()
+            else:
+                pool.close()
+            pool.join()
+        else:
+            executor.shutdown(wait=not running, cancel_futures=True)
+    return results
+
+
+def run_tasks(tasks: list[Task], config: Optional[SchedulerConfig] = None) -> list:
+    """Run tasks respecting their dependencies.
+
+    Parameters
+    ----------
+    tasks: list[Task]
+        Tasks to run.
+    config: SchedulerConfig, optional
+        Scheduler configuration, the active one (see `SchedulerConfig.activate`) is
+        used if not provided.
+
+    Returns
+    -------
+    results: list
+        Return values of the tasks in the same order as the tasks were declared,
+        regardless of the order in which they completed.
+
+    """
+    config = config or active_scheduler()
+    _check_dependencies(tasks)
+    if config.executor != "process" and any(task.timeout for task in tasks):
+        raise ValueError("Task timeouts are only supported with the process executor")
+    if config.max_workers == 1 and config.timeout is None and not any(
+        task.timeout for task in tasks
+    ):
+        results = _run_serial(tasks)
+    else:
+        logger.debug(
+            f"Running {len(tasks)} tasks in a {config.executor} pool with "
+            f"{config.max_workers} workers"
+        )
+        results = _run_pool(tasks, config)
+    return [results[task.name] for task in tasks]
@@ -1,7 +1,16 @@
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from typing import Any, Optional, Union
 
-from pydantic import field_validator, model_validator, ConfigDict, BaseModel, Field
+import numpy as np
+from pydantic import (
+    field_validator,
+    model_validator,
+    ConfigDict,
+    BaseModel,
+    Field,
+)
+
+from rompy.core.cache import LRUCache
 
 
 time_units = {
@@ -20,6 +29,10 @@ time_units = {
 }
 
 
+# Date arrays keyed by the fields defining them, shared between equal time ranges
+DATES_CACHE = LRUCache(maxsize=64)
+
+
 class TimeRange(BaseModel):
     """
     A time range object
@@ -134,19 +147,65 @@ class TimeRange(BaseModel):
             self.start = self.end - self.duration
         return self
 
+    def _date_array(self) -> np.ndarray:
+        """Cached naive datetime64[us] array of the times in the range.
+
+        The cache is keyed by the fields defining the array so it is rebuilt whenever
+        any of them are modified.
+
+        """
+        key = (self.start, self.end, self.interval, self.include_end)
+        dates = DATES_CACHE.get(key)
+        if dates is None:
+            dates = self._build_date_array()
+            DATES_CACHE.put(key, dates)
+        return dates
+
+    def _build_date_array(self) -> np.ndarray:
+        if self.start >= self.end:
+            return np.array([], dtype="datetime64[us]")
+        start = self._naive(self.start)
+        end = self._naive(self.end)
+        interval = np.timedelta64(self.interval, "us")
+        # Regular steps stop one interval before the end, the end is then appended
+        size = max((self.end - self.start) // self.interval, 1)
+        dates = start + np.arange(size) * interval
+        if self.include_end:
+            dates = np.append(dates, end)
+        dates.flags.writeable = False
+        return dates
+
+    def _naive(self, date: datetime) -> np.datetime64:
+        """Naive datetime64 of date in the timezone of the times of this range.
+
+        Aware dates are converted to the timezone of start, or to UTC if start is
+        naive, before the timezone is dropped.
+
+        """
+        if date.tzinfo is not None:
+            date = date.astimezone(self.start.tzinfo or timezone.utc)
+        return np.datetime64(date.replace(tzinfo=None), "us")
+
+    def _to_datetimes(self, dates: np.ndarray) -> list[datetime]:
+        dates = dates.tolist()
+        if self.start.tzinfo is not None:
+            dates = [date.replace(tzinfo=self.start.tzinfo) for date in dates]
+        return dates
+
+    @property
+    def date_array(self) -> np.ndarray:
+        """Times in the range as a read-only naive datetime64 array."""
+        return self._date_array()
+
     @property
     def date_range(self) -> list[datetime]:
-        start = self.start
-        end = self.end
-        date_range = []
-        while start < end:
-            date_range.append(start)
-            start += self.interval
-            if start + self.interval > end:
-                if self.include_end:
-                    date_range.append(end)
-                break
-        return date_range
+        """Times in the range.
+
+        Times are defined from start every interval until one interval before the
+        end, the end is then appended if `include_end` is True.
+
+        """
+        return self._to_datetimes(self._date_array())
 
     def contains(self, date: datetime) -> bool:
         return self.start <= date <= self.end
@@ -155,11 +214,83 @@ class TimeRange(BaseModel):
         return self.contains(date_range.start) and self.contains(date_range.end)
 
     def common_times(self, date_range: "TimeRange") -> list[datetime]:
-        common_times = []
-        for date in self.date_range:
-            if date_range.contains(date):
-                common_times.append(date)
-        return common_times
+        dates = self.date_array
+        start = self._naive(date_range.start)
+        end = self._naive(date_range.end)
+        return self._to_datetimes(dates[(dates >= start) & (dates <= end)])
+
+    def split(
+        self,
+        by: Union[int, str, timedelta],
+        overlap: Optional[Union[str, timedelta]] = None,
+    ) -> list["TimeRange"]:
+        """Split the time range into consecutive windows.
+
+        Windows are aligned with the interval and, except the last one, exclude their
+        end so that without overlap the times of all windows are the times of this
+        range.
+
+        Parameters
+        ----------
+        by: int | str | timedelta
+            Number of windows or duration of each window, e.g., "30d". Durations must
+            be a multiple of the interval. A number of windows returns exactly that
+            many windows, the first ones one interval longer if the intervals in the
+            range cannot be split evenly.
+        overlap: str | timedelta, optional
+            Duration each window, except the first one, starts before the end of the
+            previous window. Must be a multiple of the interval.
+
+        Returns
+        -------
+        windows: list[TimeRange]
+            The time windows, in chronological order.
+
+        Examples
+        --------
+        >>> tr = TimeRange(start="2020-01-01", end="2020-03-01", interval="1h")
+        >>> windows = tr.split("30d", overlap="1d")
+
+        """
+        if isinstance(by, int):
+            if by < 1:
+                raise ValueError(f"Number of windows must be positive, got {by}")
+            nsteps = -(-(self.end - self.start) // self.interval)
+            if by > nsteps:
+                raise ValueError(f"Cannot split {nsteps} intervals into {by} windows")
+            # The remaining intervals are spread over the first windows
+            size, remainder = divmod(nsteps, by)
+            durations = [self.interval * (size + (ind < remainder)) for ind in range(by)]
+            window = durations[-1]
+        else:
+            window = self.valid_duration_interval(by)
+            durations = None
+        overlap = self.valid_duration_interval(overlap) or timedelta(0)
+        for name, value in [("Window", window), ("Overlap", overlap)]:
+            if value % self.interval:
+                raise ValueError(
+                    f"{name} {value} must be a multiple of the interval {self.interval}"
+                )
+        if window <= timedelta(0) or overlap < timedelta(0) or overlap >= window:
+            raise ValueError(
+                f"Window {window} must be positive and longer than overlap {overlap}"
+            )
+        windows = []
+        start = self.start
+        while start < self.end:
+            if durations:
+                window = durations[len(windows)]
+            end = min(start + window, self.end)
+            windows.append(
+                TimeRange(
+                    start=max(start - overlap, self.start),
+                    end=end,
+                    interval=self.interval,
+                    include_end=self.include_end if end == self.end else False,
+                )
+            )
+            start = end
+        return windows
 
     def __str__(self):
         ret = f"\n\tStart: {self.start}\n"
@@ -0,0 +1,39 @@
+"""Validation options."""
+import contextlib
+import contextvars
+import os
+
+_OFFLINE: contextvars.ContextVar[bool] = contextvars.ContextVar(
+    "offline_validation", default=False
+)
+
+
+def offline_validation_enabled() -> bool:
+    """True if validators should not access any data.
+
+    Offline validation is enabled within the `offline_validation` context manager or
+    globally by setting the `ROMPY_OFFLINE_VALIDATION` environment variable to 1.
+
+    """
+    env = os.environ.get("ROMPY_OFFLINE_VALIDATION", "").lower()
+    return _OFFLINE.get() or env in ("1", "true", "yes")
+
+
+@contextlib.contextmanager
+def offline_validation(enabled: bool = True):
+    """Context manager to build and validate models without accessing any data.
+
+    Checks that require opening data sources are deferred until the data are
+    actually used, which allows building and linting configurations offline.
+
+    Parameters
+    ----------
+    enabled: bool
+        Enable or disable offline validation within the context.
+
+    """
+    token = _OFFLINE.set(enabled)
+    try:
+        yield
+    finally:
+        _OFFLINE.reset(token)
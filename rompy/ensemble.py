@@ -0,0 +1,200 @@
+"""Ensembles of model runs generated from a parameter sweep."""
+import itertools
+import logging
+import shutil
+import time
+from pathlib import Path
+from typing import Any, Literal, Optional
+
+from pydantic import Field, model_validator
+
+from .core import RompyBaseModel
+from .core.cache import forcing_cache, set_forcing_cache
+from .core.scheduler import SchedulerConfig, Task, run_tasks
+from .model import ModelRun
+
+logger = logging.getLogger(__name__)
+
+
+def _set_path(data: dict, path: str, value: Any):
+    """Set value in the nested dict data at the dotted path, e.g., `config.grid.dx`."""
+    *parents, name = path.split(".")
+    for key in parents:
+        data = data[int(key)] if isinstance(data, list) else data[key]
+    if isinstance(data, list):
+        data[int(name)] = value
+    else:
+        data[name] = value
+
+
+def _generate_member(run: ModelRun, cache_root: Optional[str]) -> dict:
+    """Generate a single ensemble member, run in the scheduler workers."""
+    cache = forcing_cache()
+    if cache_root is not None and (cache is None or cache.root != Path(cache_root)):
+        cache = set_forcing_cache(cache_root)
+    hits, misses = (cache.hits, cache.misses) if cache else (0, 0)
+    start = time.perf_counter()
+    staging_dir = run.generate()
+    elapsed = time.perf_counter() - start
+    logger.info(f"Generated ensemble member {run.run_id} in {elapsed:.1f}s")
+    return dict(
+        run_id=run.run_id,
+        staging_dir=staging_dir,
+        elapsed=elapsed,
+        cache_hits=cache.hits - hits if cache else 0,
+        cache_misses=cache.misses - misses if cache else 0,
+    )
+
+
+class Ensemble(RompyBaseModel):
+    """An ensemble of model runs varying parameters of a base run.
+
+    Members are created by setting the swept parameters on a copy of the base run and
+    are generated concurrently by the scheduler. Forcing that does not depend on the
+    swept parameters is written once by the first member and linked from the forcing
+    cache into the staging directory of all other members.
+
+    Examples
+    --------
+    >>> ensemble = Ensemble(
+    ...     run=ModelRun(run_id="sweep", config=config),
+    ...     parameters={"config.physics.gen.cds2": [2.0e-5, 2.36e-5, 3.0e-5]},
+    ...     scheduler=SchedulerConfig(executor="process", max_workers=4),
+    ... )
+    >>> summary = ensemble.generate()
+
+    """
+
+    run: ModelRun = Field(description="The base model run")
+    parameters: dict[str, list] = Field(
+        description=(
+            "Values of each swept parameter, keyed by the dotted path of the parameter "
+            "in the base run, e.g., `config.grid.dx`"
+        ),
+    )
+    sweep: Literal["product", "zip"] = Field(
+        default="product",
+        description=(
+            "Combine the parameters as a cartesian product or pairwise, all parameters "
+            "must have the same number of values with `zip`"
+        ),
+    )
+    run_id_template: str = Field(
+        default="{run_id}_{member:03d}",
+        description="Template of the member run ids, formatted with run_id and member",
+    )
+    scheduler: SchedulerConfig = Field(
+        default_factory=lambda: SchedulerConfig(executor="process"),
+        description=(
+            "Scheduler generating the members, members can only be generated "
+            "concurrently in a process pool"
+        ),
+    )
+    share_forcing: bool = Field(
+        default=True,
+        description=(
+            "Link identical forcing across members from the forcing cache, a temporary "
+            "cache is used if no forcing cache is active"
+        ),
+    )
+
+    @model_validator(mode="after")
+    def check_parameters(self) -> "Ensemble":
+        sizes = {len(values) for values in self.parameters.values()}
+        if self.sweep == "zip" and len(sizes) > 1:
+            raise ValueError(
+                f"All parameters must have the same number of values to zip: {sizes}"
+            )
+        return self
+
+    @model_validator(mode="after")
+    def check_scheduler(self) -> "Ensemble":
+        # Cookiecutter changes the working directory of the process while rendering,
+        # breaking relative paths used by members generated in other threads
+        if self.scheduler.executor == "thread" and self.scheduler.max_workers > 1:
+            raise ValueError(
+                "Ensemble members cannot be generated concurrently in threads, "
+                "use the process executor"
+            )
+        return self
+
+    @property
+    def combinations(self) -> list[dict]:
+        """Parameter values of each member."""
+        names = list(self.parameters)
+        if self.sweep == "zip":
+            values = zip(*self.parameters.values())
+        else:
+            values = itertools.product(*self.parameters.values())
+        return [dict(zip(names, value)) for value in values]
+
+    def members(self) -> list[ModelRun]:
+        """The model runs of the ensemble members."""
+        # The period is rebuilt from start and end only so it validates again
+        period = self.run.period.model_dump(exclude={"duration"})
+        members = []
+        for member, combination in enumerate(self.combinations):
+            data = self.run.model_dump()
+            data["period"] = dict(period)
+            for path, value in combination.items():
+                _set_path(data, path, value)
+            data["run_id"] = self.run_id_template.format(
+                run_id=self.run.run_id, member=member
+            )
+            members.append(ModelRun(**data))
+        return members
+
+    def generate(self) -> list[dict]:
+        """Generate the input files of all members.
+
+        The first member is generated before all others so the forcing it shares with
+        them is only computed once.
+
+        Returns
+        -------
+        summary: list[dict]
+            The run id, parameters, staging directory, generation time in seconds and
+            forcing cache hits and misses of each member.
+
+        """
+        members = self.members()
+        logger.info(f"Generating {len(members)} ensemble members")
+        cache = forcing_cache()
+        tmp_cache = None
+        if self.share_forcing and cache is None:
+            tmp_cache = Path(self.run.output_dir) / f".{self.run.run_id}_forcing_cache"
+            set_forcing_cache(tmp_cache)
+        cache_root = str(forcing_cache().root) if self.share_forcing else None
+        tasks = [
+            Task(
+                name=run.run_id,
+                func=_generate_member,
+                args=(run, cache_root),
+                depends_on=[members[0].run_id] if ind else [],
+            )
+            for ind, run in enumerate(members)
+        ]
+        start = time.perf_counter()
+        try:
+            results = run_tasks(tasks, self.scheduler)
+        finally:
+            if tmp_cache is not None:
+                set_forcing_cache(None)
+                shutil.rmtree(tmp_cache, ignore_errors=True)
+        for result, combination in zip(results, self.combinations):
+            result["parameters"] = combination
+        self._log_summary(results, time.perf_counter() - start)
+        return results
+
+    def _log_summary(self, results: list[dict], elapsed: float):
+        logger.info("-----------------------------------------------------")
+        logger.info(f"Generated {len(results)} ensemble members in {elapsed:.1f}s")
+        for result in results:
+            logger.info(
+                f"  {result['run_id']}: {result['elapsed']:.1f}s, "
+                f"{result['cache_hits']} cached forcing, {result['parameters']}"
+            )
+        logger.info("-----------------------------------------------------")
+
+    def __call__(self):
+        return self.generate()
@@ -1,26 +1,31 @@
+import contextlib
 import glob
 import logging
 import os
 import platform
 import shutil
-import zipfile as zf
 from datetime import datetime
 from pathlib import Path
-from typing import Union
+from typing import Literal, Optional, Union
 
-from pydantic import Field
-
-from rompy.schism.config import SchismCSIROConfig
-from rompy.swan import SwanConfig
-from rompy.swan.config import SwanConfigComponents
+from pydantic import Field, SerializeAsAny, field_validator
 
 from .core import BaseConfig, RompyBaseModel, TimeRange
+from .core.archive import EXTENSIONS, archive
+from .core.manifest import Manifest
+from .core.profiling import Profiler, profile_stage
+from .core.registry import config_types, load_config_class
 from .core.render import render
+from .core.scheduler import SchedulerConfig
 
 logger = logging.getLogger(__name__)
 
 
-CONFIG_TYPES = Union[BaseConfig, SwanConfig, SwanConfigComponents, SchismCSIROConfig]
+def __getattr__(name):
+    # Union of all config classes only imported on request as it loads every backend
+    if name == "CONFIG_TYPES":
+        return Union[tuple(load_config_class(t) for t in config_types())]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 class ModelRun(RompyBaseModel):
@@ -44,13 +49,31 @@ class ModelRun(RompyBaseModel):
         description="The time period to run the model",
     )
     output_dir: Path = Field("./simulations", description="The output directory")
-    config: CONFIG_TYPES = Field(
+    config: SerializeAsAny[BaseConfig] = Field(
         default_factory=BaseConfig,
-        description="The configuration object",
-        discriminator="model_type",
+        description=(
+            "The configuration object, its class is loaded from the config registry "
+            "according to its model_type"
+        ),
+    )
+    scheduler: SchedulerConfig = Field(
+        default_factory=SchedulerConfig,
+        description="Scheduler running the independent data fetching tasks",
     )
     _datefmt: str = "%Y%m%d.%H%M%S"
 
+    @field_validator("config", mode="before")
+    @classmethod
+    def load_config(cls, v):
+        """Validate config dicts with the class registered for their model_type."""
+        if isinstance(v, dict):
+            if "model_type" not in v:
+                raise ValueError(
+                    f"config must define its model_type, one of {config_types()}"
+                )
+            return load_config_class(v["model_type"])(**v)
+        return v
+
     @property
     def staging_dir(self):
         """The directory where the model is staged for execution
@@ -64,6 +87,11 @@ class ModelRun(RompyBaseModel):
         odir.mkdir(parents=True, exist_ok=True)
         return odir
 
+    @property
+    def profile_file(self) -> Path:
+        """File the generation profile is written to, next to the staging directory."""
+        return Path(self.output_dir) / f"{self.run_id}.profile.json"
+
     @property
     def _generation_medatadata(self):
         return dict(
@@ -72,9 +100,23 @@ class ModelRun(RompyBaseModel):
             _generated_on=platform.node(),
         )
 
-    def generate(self) -> str:
+    def generate(self, force: bool = False, profile: bool = False) -> str:
         """Generate the model input files
 
+        Generation is incremental: the fingerprint of the inputs of each forcing and
+        template file is recorded in a manifest in the staging directory and files
+        whose fingerprint did not change since the previous generation into the same
+        staging directory are not written again (see `rompy.core.manifest`).
+
+        parameters
+        ----------
+        force : bool
+            Regenerate all files regardless of the manifest.
+        profile : bool
+            Record the wall time, bytes read and written and peak memory of each
+            generation stage and data object into `<run_id>.profile.json` next to the
+            staging directory (see `rompy.core.profiling`).
+
         returns
         -------
         staging_dir : str
@@ -92,47 +134,82 @@ class ModelRun(RompyBaseModel):
         cc_full["runtime"].update(self._generation_medatadata)
         cc_full["runtime"].update({"_datefmt": self._datefmt})
 
-        if callable(self.config):
-            # Run the __call__() method of the config object if it is callable passing
-            # the runtime instance, and fill in the context with what is returned
-            cc_full["config"] = self.config(self)
-        else:
-            # Otherwise just fill in the context with the config instance itself
-            cc_full["config"] = self.config
-
-        staging_dir = render(
-            cc_full, self.config.template, self.output_dir, self.config.checkout
-        )
-
+        manifest = Manifest(self.staging_dir, force=force)
+        profiler = Profiler() if profile else None
+        profiling = profiler.activate() if profiler else contextlib.nullcontext()
+        with profiling, manifest.activate():
+            with profile_stage("config"):
+                if callable(self.config):
+                    # Run the __call__() method of the config object if it is
+                    # callable passing the runtime instance, and fill in the context
+                    # with what is returned
+                    with self.scheduler.activate():
+                        cc_full["config"] = self.config(self)
+                else:
+                    # Otherwise just fill in the context with the config instance
+                    cc_full["config"] = self.config
+
+            with profile_stage("render"):
+                staging_dir = render(
+                    cc_full, self.config.template, self.output_dir, self.config.checkout
+                )
+        manifest.save()
+        if profiler is not None:
+            profiler.to_json(self.profile_file)
+
+        report = manifest.report()
         logger.info("")
+        logger.info(
+            f"Wrote {len(report['written'])} and skipped {len(report['skipped'])} "
+            "unchanged inputs"
+        )
+        for name in report["skipped"]:
+            logger.debug(f"\tSkipped {name}")
         logger.info(f"Successfully generated project in {self.output_dir}")
         logger.info("-----------------------------------------------------")
         return staging_dir
 
-    def zip(self) -> str:
+    def zip(
+        self,
+        dest: Optional[str] = None,
+        compression: Literal["deflate", "store", "zstd"] = "deflate",
+        level: Optional[int] = None,
+        workers: Optional[int] = None,
+    ) -> Union[Path, str]:
         """Zip the input files for the model run
 
         This function zips the input files for the model run and returns the
         name of the zip file. It also cleans up the staging directory leaving
         only the settings.json file that can be used to repoducte the run.
 
+        Files are streamed into the archive and compressed in parallel, see
+        `rompy.core.archive.archive`.
+
+        parameters
+        ----------
+        dest : str, optional
+            Local path or fsspec URL of the archive, defaults to the staging directory
+            with the extension of the compression.
+        compression : str
+            `deflate` or `store` for a zip archive, `zstd` for a zstandard compressed
+            tar archive.
+        level : int, optional
+            Compression level, the default of the compression if None.
+        workers : int, optional
+            Number of compression threads, the number of CPUs if None.
+
         returns
         -------
-        zip_fn : str
+        zip_fn : Path | str
         """
+        if dest is None:
+            zip_fn = Path(str(self.staging_dir) + EXTENSIONS.get(compression, ""))
+        else:
+            zip_fn = dest
 
-        # Always remove previous zips
-        zip_fn = Path(str(self.staging_dir) + ".zip")
-        if zip_fn.exists():
-            zip_fn.unlink()
-
-        with zf.ZipFile(zip_fn, mode="w", compression=zf.ZIP_DEFLATED) as z:
-            for dp, dn, fn in os.walk(self.staging_dir):
-                for filename in fn:
-                    z.write(
-                        os.path.join(dp, filename),
-                        os.path.relpath(os.path.join(dp, filename), self.staging_dir),
-                    )
+        archive(
+            self.staging_dir, zip_fn, compression=compression, level=level, workers=workers
+        )
         shutil.rmtree(self.staging_dir)
         logger.info(f"Successfully zipped project to {zip_fn}")
         return zip_fn
@@ -15,7 +15,9 @@ from pyschism.forcing.bctides import Bctides
 from rompy.core import DataGrid, RompyBaseModel
 from rompy.core.boundary import (BoundaryWaveStation, DataBoundary, SourceFile,
                                  SourceWavespectra)
+from rompy.core.cache import cached_forcing
 from rompy.core.data import DATA_SOURCE_TYPES, DataBlob
+from rompy.core.scheduler import Task, run_tasks
 from rompy.core.time import TimeRange
 from rompy.schism.grid import SCHISMGrid
 from rompy.utils import total_seconds
@@ -67,9 +69,7 @@ class SfluxSource(DataGrid):
     @property
     def ds(self):
         """Return the xarray dataset for this data source."""
-        ds = self.source.open(
-            variables=self.variables, filters=self.filter, coords=self.coords
-        )
+        ds = super().ds
         # rename latitude and longitide to lat and lon
         ds = ds.rename_dims({self.coords.y: "ny_grid", self.coords.x: "nx_grid"})
         lon, lat = np.meshgrid(ds[self.coords.x], ds[self.coords.y])
@@ -231,6 +231,7 @@ class SCHISMDataSflux(RompyBaseModel):
         destdir = Path(destdir) / "sflux"
         destdir.mkdir(parents=True, exist_ok=True)
         namelistargs = {}
+        tasks = []
         for variable in ["air_1", "air_2", "rad_1", "rad_2", "prc_1", "prc_2"]:
             data = getattr(self, variable)
             if data is None:
@@ -238,7 +239,8 @@ class SCHISMDataSflux(RompyBaseModel):
             data.id = variable
             logger.info(f"Fetching {variable}")
             namelistargs.update(data.namelist)
-            data.get(destdir, grid, time)
+            tasks.append(Task(name=variable, func=data.get, args=(destdir, grid, time)))
+        run_tasks(tasks)
         Sflux_Inputs(**namelistargs).write_nml(destdir)
 
     @model_validator(mode="after")
@@ -291,6 +293,7 @@ class SCHISMDataWave(BoundaryWaveStation):
         description="Number of source data timesteps to buffer the time range if `filter_time` is True",
     )
 
+    @cached_forcing
     def get(
         self,
         destdir: str | Path,
@@ -375,6 +378,7 @@ class SCHISMDataBoundary(DataBoundary):
     #             ) / 2
     #     return ds
 
+    @cached_forcing
     def get(
         self,
         destdir: str | Path,
@@ -535,11 +539,13 @@ class SCHISMDataOcean(RompyBaseModel):
             Path to the netcdf file.
 
         """
+        tasks = []
         for variable in ["elev2D", "uv3D", "TEM_3D", "SAL_3D"]:
             data = getattr(self, variable)
             if data is None:
                 continue
-            data.get(destdir, grid, time)
+            tasks.append(Task(name=variable, func=data.get, args=(destdir, grid, time)))
+        run_tasks(tasks)
 
     def __str__(self):
         return f"SCHISMDataOcean"
@@ -679,12 +685,14 @@ class SCHISMData(RompyBaseModel):
         #         interval=time.interval,
         #         include_end=time.include_end,
         #     )
+        tasks = []
         for datatype in ["atmos", "ocean", "wave", "tides"]:
             data = getattr(self, datatype)
             if data is None:
                 continue
-            output = data.get(destdir, grid, time)
-            ret.update({datatype: output})
+            tasks.append(Task(name=datatype, func=data.get, args=(destdir, grid, time)))
+        for task, output in zip(tasks, run_tasks(tasks)):
+            ret.update({task.name: output})
             # ret[
             #     "wave"
             # ] = "dummy"  # Just to make cookiecutter happy if excluding wave forcing
@@ -1,3 +1,4 @@
+import hashlib
 import logging
 from pathlib import Path
 from typing import Literal, Optional
@@ -5,6 +6,7 @@ from typing import Literal, Optional
 import numpy as np
 import pandas as pd
 from pydantic import Field, PrivateAttr, field_validator, model_validator
+from pydantic_numpy.typing import Np1DArray
 from pyschism.mesh import Hgrid
 from pyschism.mesh.prop import Tvdflag
 from pyschism.mesh.vgrid import Vgrid
@@ -12,6 +14,7 @@ from shapely.geometry import MultiPoint, Polygon
 
 from rompy.core import DataBlob, RompyBaseModel
 from rompy.core.grid import BaseGrid
+from rompy.core.scheduler import Task, run_tasks
 
 logger = logging.getLogger(__name__)
 
@@ -215,6 +218,13 @@ class SCHISMGrid(BaseGrid):
     """SCHISM grid in geographic space."""
 
     grid_type: Literal["schism"] = Field("schism", description="Model descriminator")
+    # Coordinates are loaded from hgrid so they are not serialised
+    x: Optional[Np1DArray] = Field(
+        default=None, exclude=True, description="The x coordinates"
+    )
+    y: Optional[Np1DArray] = Field(
+        default=None, exclude=True, description="The y coordinates"
+    )
     hgrid: DataBlob = Field(..., description="Path to hgrid.gr3 file")
     vgrid: Optional[DataBlob | VgridGenerator] = Field(
         default=None,
@@ -347,15 +357,40 @@ class SCHISMGrid(BaseGrid):
             return False
 
     def get(self, destdir: Path) -> dict:
-        ret = {}
-        for filetype in G3FILES + ["hgrid"]:
+        # The hgrid is copied first since the generators and links are created from it
+        tasks = [
+            Task(
+                name="hgrid",
+                func=self.hgrid.get,
+                args=(destdir,),
+                kwargs=dict(name="hgrid.gr3"),
+            )
+        ]
+        for filetype in G3FILES:
             source = getattr(self, filetype)
             if source is not None:
-                ret[filetype] = source.get(destdir, name=f"{filetype}.gr3")
+                tasks.append(
+                    Task(
+                        name=filetype,
+                        func=source.get,
+                        args=(destdir,),
+                        kwargs=dict(name=f"{filetype}.gr3"),
+                        depends_on=["hgrid"],
+                    )
+                )
         for filetype in GRIDLINKS + ["vgrid", "wwmbnd"]:
             source = getattr(self, filetype)
-            ret[filetype] = source.get(destdir)
-        self.generate_tvprop(destdir)
+            tasks.append(
+                Task(
+                    name=filetype,
+                    func=source.get,
+                    args=(destdir,),
+                    depends_on=["hgrid"],
+                )
+            )
+        tasks.append(Task(name="tvprop", func=self.generate_tvprop, args=(destdir,)))
+        ret = {task.name: out for task, out in zip(tasks, run_tasks(tasks))}
+        ret.pop("tvprop")
         return ret
 
     def generate_tvprop(self, destdir: Path) -> Path:
@@ -376,6 +411,16 @@ class SCHISMGrid(BaseGrid):
         tvdflag.write(dest)
         return dest
 
+    def _fingerprint(self) -> str:
+        # Hash of the mesh file rather than of the node coordinates loaded from it
+        sha = hashlib.sha256(self.__class__.__name__.encode())
+        sha.update(self.model_dump_json().encode())
+        source = Path(self.hgrid._copied) if self.hgrid._copied else self.hgrid.source
+        with source.open("rb") as f:
+            while chunk := f.read(2**20):
+                sha.update(chunk)
+        return sha.hexdigest()
+
     def boundary(self, tolerance=None) -> Polygon:
         bnd = self.pyschism_hgrid.boundaries.open.get_coordinates()
         polygon = Polygon(zip(bnd.x.values, bnd.y.values))
@@ -5,12 +5,14 @@ from typing import Literal, Optional, Union, Annotated
 import xarray as xr
 import pandas as pd
 import numpy as np
+import shapely
 from shapely.geometry import LineString
 from abc import ABC
 from pydantic import Field, field_validator
 
 from rompy.core.time import TimeRange
 from rompy.core.boundary import BoundaryWaveStation
+from rompy.core.cache import cached_forcing
 from rompy.swan.grid import SwanGrid
 from rompy.swan.components.boundary import BOUNDSPEC
 from rompy.swan.subcomponents.base import BaseSubComponent, XY, IJ
@@ -56,6 +58,7 @@ class Boundnest1(BoundaryWaveStation):
         ),
     )
 
+    @cached_forcing
     def get(
         self, destdir: str, grid: SwanGrid, time: Optional[TimeRange] = None
     ) -> str:
@@ -178,9 +181,8 @@ class BoundspecBase(BoundaryWaveStation, ABC):
         if line.length < spacing:
             raise ValueError(f"Spacing = {spacing} > side length = {line.length}")
         npts = int(np.ceil(line.length / spacing))
-        points = [line.interpolate(i * spacing) for i in range(npts + 1)]
-        xi = np.array([point.x for point in points])
-        yi = np.array([point.y for point in points])
+        points = shapely.line_interpolate_point(line, np.arange(npts + 1) * spacing)
+        xi, yi = shapely.get_coordinates(points).T.copy()
         # Ensure last point does not go beyond the line length
         xi[-1] = xbnd[-1]
         yi[-1] = ybnd[-1]
@@ -205,8 +207,7 @@ class BoundspecBase(BoundaryWaveStation, ABC):
             slc = np.s_[-1, 0]
         elif side.side == "ne":
             slc = np.s_[-1, -1]
-        xbnd = grid.x[slc]
-        ybnd = grid.y[slc]
+        xbnd, ybnd = grid.node_coords(slc)
 
         # Reverse if order is clockwise
         if side.direction == "clockwise":
@@ -244,6 +245,7 @@ class BoundspecSide(BoundspecBase):
         xbnd, ybnd = self._boundary_points_side(grid, self.location)
         return [xbnd.mean()], [ybnd.mean()]
 
+    @cached_forcing
     def get(
         self, destdir: str, grid: SwanGrid, time: Optional[TimeRange] = None
     ) -> str:
@@ -334,6 +336,7 @@ class BoundspecSegmentXY(BoundspecBase):
                 ybnd.extend(yb)
         return xbnd, ybnd
 
+    @cached_forcing
     def get(
         self, destdir: str, grid: SwanGrid, time: Optional[TimeRange] = None
     ) -> str:
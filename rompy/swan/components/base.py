@@ -8,7 +8,7 @@ How to subclass
 
 """
 import logging
-from typing import Literal, Optional
+from typing import Iterable, Iterator, Literal, Optional
 from abc import abstractmethod
 from pydantic import ConfigDict, Field
 
@@ -65,7 +65,7 @@ class BaseComponent(RompyBaseModel):
     model_type: Literal["component"] = Field(description="Model type discriminator")
     model_config = ConfigDict(extra="forbid")
 
-    def _render_split_cmd(self, cmd_line: str) -> str:
+    def _render_split_cmd(self, cmd_line: str | Iterable[str]) -> str:
         """Split cmd_line if longer than MAX_LENGTH.
 
         Longer strings are recursively split by inserting a SWAN line continuation
@@ -73,8 +73,8 @@ class BaseComponent(RompyBaseModel):
 
         Parameters
         ----------
-        cmd_line: str
-            Command line to split.
+        cmd_line: str | Iterable[str]
+            Command line to split, or iterable of the lines of the command.
 
         Returns
         -------
@@ -82,27 +82,67 @@ class BaseComponent(RompyBaseModel):
             Split command line.
 
         """
-        # Split cmd at existing newlines
-        cmd_lines = cmd_line.split("\n")
-        # Split each line before max_length
-        cmds = []
-        for cmd in cmd_lines:
-            cmds.extend(split_string(cmd, max_length=MAX_LENGTH, spaces=SPACES))
-        # Joining lines
-        return f" &\n{SPACES * ' '}".join(cmds)
+        return "".join(self._iter_split_cmd(cmd_line))
+
+    def _iter_split_cmd(self, cmd_line: str | Iterable[str]) -> Iterator[str]:
+        """Yield the lines of the split cmd_line with their line continuations."""
+        if isinstance(cmd_line, str):
+            cmd_line = [cmd_line]
+        separator = ""
+        # Split cmd at existing newlines and each line before max_length
+        for lines in cmd_line:
+            for line in lines.split("\n"):
+                for cmd in split_string(line, max_length=MAX_LENGTH, spaces=SPACES):
+                    yield separator + cmd
+                    separator = f" &\n{SPACES * ' '}"
 
     @abstractmethod
     def cmd(self) -> str | list:
         """Return the string or list of strings to render the component to the CMD."""
         pass
 
+    def iter_cmd(self) -> Iterator[str | Iterable[str]]:
+        """Yield the commands to render the component to the CMD.
+
+        By default the commands returned by `cmd()`, components with long commands can
+        override it to yield each command as an iterable of its lines so the command is
+        never built as a single string.
+
+        """
+        cmd = self.cmd()
+        yield from [cmd] if isinstance(cmd, str) else cmd
+
+    def iter_render(self, cmd: Optional[str | list] = None) -> Iterator[str]:
+        """Render the component yielding the rendered command file in chunks.
+
+        Parameters
+        ----------
+        cmd: Optional[str | list]
+            Command string or list of command strings to render, by default the
+            commands yielded by self.iter_cmd().
+
+        Yields
+        ------
+        chunk: str
+            The next chunk of the rendered command file component.
+
+        """
+        cmd_lines = cmd or self.iter_cmd()
+        if isinstance(cmd_lines, str):
+            cmd_lines = [cmd_lines]
+        for ind, cmd_line in enumerate(cmd_lines):
+            if ind:
+                yield "\n"
+            yield from self._iter_split_cmd(cmd_line)
+
     def render(self, cmd: Optional[str | list] = None) -> str:
         """Render the component to a string.
 
         Parameters
         ----------
         cmd: Optional[str | list]
-            Command string or list of command strings to render, by default self.cmd().
+            Command string or list of command strings to render, by default the
+            commands yielded by self.iter_cmd().
 
         Returns
         -------
@@ -110,8 +150,35 @@ class BaseComponent(RompyBaseModel):
             The rendered command file component.
 
         """
-        cmd_lines = cmd or self.cmd()
-        if isinstance(cmd_lines, str):
-            cmd_lines = [cmd_lines]
-        cmd_lines = [self._render_split_cmd(cmd_line) for cmd_line in cmd_lines]
-        return "\n".join(cmd_lines)
+        return "".join(self.iter_render(cmd))
+
+
+class CmdStream:
+    """Command file block of a component rendered lazily.
+
+    Iterating yields the rendered block in chunks so templates can stream it into the
+    generated file with `{% for chunk in block %}{{ chunk }}{% endfor %}` instead of
+    building it as a single string, `str()` renders the whole block.
+
+    Parameters
+    ----------
+    component: BaseComponent
+        The component to render.
+
+    """
+
+    def __init__(self, component: BaseComponent):
+        self.component = component
+
+    def __iter__(self) -> Iterator[str]:
+        return self.component.iter_render()
+
+    def __str__(self) -> str:
+        return self.component.render()
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self.component!r})"
+
+    def model_dump_json(self) -> str:
+        """Dump the component, identifying the block in template fingerprints."""
+        return self.component.model_dump_json()
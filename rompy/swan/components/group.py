@@ -1,6 +1,6 @@
 """SWAN group components."""
 import logging
-from typing import Annotated, Literal, Optional, Union, Any
+from typing import Annotated, Iterator, Literal, Optional, Union, Any
 from pydantic import Field, model_validator, field_validator
 
 from rompy.swan.types import PhysicsOff
@@ -92,12 +92,19 @@ class BaseGroupComponent(BaseComponent):
         default="group", description="Model type discriminator"
     )
 
-    def render(self, *args, **kwargs) -> str:
-        """Override base class to allow rendering list of components."""
-        cmds = []
-        for cmd in self.cmd():
-            cmds.append(super().render(cmd))
-        return "\n\n".join(cmds)
+    def iter_render(self, *args, **kwargs) -> Iterator[str]:
+        """Override base class to allow rendering list of components.
+
+        Commands can be yielded as components which are rendered lazily.
+
+        """
+        for ind, cmd in enumerate(self.iter_cmd()):
+            if ind:
+                yield "\n\n"
+            if isinstance(cmd, BaseComponent):
+                yield from cmd.iter_render()
+            else:
+                yield from super().iter_render(cmd)
 
 
 # =====================================================================================
@@ -666,38 +673,48 @@ class OUTPUT(BaseGroupComponent):
                     return obj
         raise ValueError(f"Location component with sname='{sname}' not found")
 
-    def cmd(self) -> list:
-        """Command file string for this component."""
-        repr = []
+    def iter_cmd(self) -> Iterator[str | list | BaseComponent]:
+        """Yield the commands, the output locations are rendered lazily.
+
+        The points component is yielded itself so its locations, which can be very
+        many, are streamed when rendering instead of being built as a single string.
+
+        """
         if self.frame is not None:
-            repr += [f"{self.frame.cmd()}"]
+            yield f"{self.frame.cmd()}"
         if self.group is not None:
-            repr += [f"{self.group.cmd()}"]
+            yield f"{self.group.cmd()}"
         if self.curve is not None:
-            repr += self.curve.cmd()  # Component renders a list
+            yield from self.curve.cmd()  # Component renders a list
         if self.ray is not None:
-            repr += [f"{self.ray.cmd()}"]
+            yield f"{self.ray.cmd()}"
         if self.isoline is not None:
-            repr += [f"{self.isoline.cmd()}"]
+            yield f"{self.isoline.cmd()}"
         if self.points is not None:
-            repr += [f"{self.points.cmd()}"]
+            yield self.points
         if self.ngrid is not None:
-            repr += [f"{self.ngrid.cmd()}"]
+            yield f"{self.ngrid.cmd()}"
         if self.quantity is not None:
-            repr += self.quantity.cmd()  # Component renders a list
+            yield from self.quantity.cmd()  # Component renders a list
         if self.output_options is not None:
-            repr += [f"{self.output_options.cmd()}"]
+            yield f"{self.output_options.cmd()}"
         if self.block is not None:
-            repr += [f"{self.block.cmd()}"]
+            yield f"{self.block.cmd()}"
         if self.table is not None:
-            repr += [f"{self.table.cmd()}"]
+            yield f"{self.table.cmd()}"
         if self.specout is not None:
-            repr += [f"{self.specout.cmd()}"]
+            yield f"{self.specout.cmd()}"
         if self.nestout is not None:
-            repr += [f"{self.nestout.cmd()}"]
+            yield f"{self.nestout.cmd()}"
         if self.test is not None:
-            repr += [f"{self.test.cmd()}"]
-        return repr
+            yield f"{self.test.cmd()}"
+
+    def cmd(self) -> list:
+        """Command file string for this component."""
+        return [
+            cmd.cmd() if isinstance(cmd, BaseComponent) else cmd
+            for cmd in self.iter_cmd()
+        ]
 
 
 # =====================================================================================
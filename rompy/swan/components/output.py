@@ -1,6 +1,6 @@
 """Model output components."""
 import logging
-from typing import Literal, Optional, Union, Annotated
+from typing import Iterator, Literal, Optional, Union, Annotated
 from abc import ABC
 from pydantic import field_validator, model_validator, Field
 
@@ -568,12 +568,18 @@ class POINTS(BaseLocation):
             raise ValueError(f"xp and yp must be the same size")
         return self
 
+    def _lines(self) -> Iterator[str]:
+        yield f"{super().cmd()}"
+        for xp, yp in zip(self.xp, self.yp):
+            yield f"xp={xp} yp={yp}"
+
     def cmd(self) -> str:
         """Command file string for this component."""
-        repr = f"{super().cmd()}"
-        for xp, yp in zip(self.xp, self.yp):
-            repr += f"\nxp={xp} yp={yp}"
-        return repr
+        return "\n".join(self._lines())
+
+    def iter_cmd(self) -> Iterator[Iterator[str]]:
+        """Yield the command as an iterator of its lines rendered lazily."""
+        yield self._lines()
 
 
 class POINTS_FILE(BaseLocation):
@@ -5,6 +5,7 @@ from typing import Annotated, Literal, Optional, Union
 from pydantic import Field, model_validator
 
 from rompy.core import BaseConfig
+from rompy.core.scheduler import Task, run_tasks
 
 from rompy.swan.interface import (
     DataInterface,
@@ -16,6 +17,7 @@ from rompy.swan.interface import (
 from rompy.swan.legacy import ForcingData, SwanSpectrum, SwanPhysics, Outputs
 
 from rompy.swan.components import boundary, cgrid, numerics
+from rompy.swan.components.base import CmdStream
 from rompy.swan.components.group import STARTUP, INPGRIDS, PHYSICS, OUTPUT, LOCKUP
 
 from rompy.swan.grid import SwanGrid
@@ -217,18 +219,21 @@ class SwanConfigComponents(BaseConfig):
         if self.numeric:
             ret["numeric"] = self.numeric.render()
         if self.output:
-            ret["output"] = self.output.render()
+            # Streamed into the template, the output locations can be very long
+            ret["output"] = CmdStream(self.output)
         if self.lockup:
             ret["lockup"] = self.lockup.render()
 
-        # inpgrid / boundary may use the Interface api so we need passing the args
-        if self.inpgrid and isinstance(self.inpgrid, DataInterface):
-            ret["inpgrid"] = self.inpgrid.render(staging_dir, self.grid, period)
-        elif self.inpgrid:
-            ret["inpgrid"] = self.inpgrid.render()
-        if self.boundary and isinstance(self.boundary, BoundaryInterface):
-            ret["boundary"] = self.boundary.render(staging_dir, self.grid, period)
-        elif self.boundary:
-            ret["boundary"] = self.boundary.render()
+        # inpgrid / boundary may use the Interface api so we need passing the args,
+        # they are independent so they are fetched as concurrent tasks
+        tasks = []
+        for name in ["inpgrid", "boundary"]:
+            component = getattr(self, name)
+            if isinstance(component, (DataInterface, BoundaryInterface)):
+                args = (staging_dir, self.grid, period)
+                tasks.append(Task(name=name, func=component.render, args=args))
+            elif component:
+                tasks.append(Task(name=name, func=component.render))
+        ret.update({task.name: out for task, out in zip(tasks, run_tasks(tasks))})
 
         return ret
@@ -1,7 +1,9 @@
 import logging
 import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional, Union
+from typing import Literal, Optional, Union
 
 import numpy as np
 import pandas as pd
@@ -9,9 +11,12 @@ import xarray as xr
 from pydantic import field_validator, Field, model_validator
 
 from rompy.core import DataGrid
+from rompy.core.cache import cached_forcing
+from rompy.core.interpolate import regrid
 from rompy.core.time import TimeRange
 
 from rompy.swan.grid import SwanGrid
+from rompy.swan.subcomponents.readgrid import READINP
 from rompy.swan.types import GridOptions
 
 
@@ -19,6 +24,9 @@ logger = logging.getLogger(__name__)
 
 FILL_VALUE = -99.0
 
+# Approximate number of values formatted at once by the ascii writer
+BLOCK_VALUES = 2**20
+
 
 class SwanDataGrid(DataGrid):
     """This class is used to write SWAN data from a dataset."""
@@ -46,6 +54,13 @@ class SwanDataGrid(DataGrid):
         ),
         default=1.0,
     )
+    format: Literal["free", "unformatted"] = Field(
+        default="free",
+        description=(
+            "Write `free` ascii files or `unformatted` (Fortran sequential binary) "
+            "files which are faster to write and read and smaller on disk"
+        ),
+    )
 
     @model_validator(mode="after")
     def ensure_z1_in_data_vars(self) -> "SwanDataGrid":
@@ -57,6 +72,7 @@ class SwanDataGrid(DataGrid):
         self.variables = data_vars
         return self
 
+    @cached_forcing
     def get(
         self,
         destdir: str | Path,
@@ -87,35 +103,64 @@ class SwanDataGrid(DataGrid):
         same as the rotation of the data.
 
         """
+        if self.regrid is not None and grid is not None and grid.grid_type != "REG":
+            raise ValueError(
+                f"Regridding {self.var.value} requires a regular SWAN grid, "
+                f"got {grid.grid_type}"
+            )
         if self.crop_data:
             if grid is not None:
                 self._filter_grid(grid)
             if time is not None:
                 self._filter_time(time)
 
-        output_file = os.path.join(destdir, f"{self.var.value}.grd")
+        ext = "bin" if self.format == "unformatted" else "grd"
+        output_file = os.path.join(destdir, f"{self.var.value}.{ext}")
         logger.info(f"\tWriting {self.var.value} to {output_file}")
+        ds = self.ds
+        x, y = self.coords.x, self.coords.y
+        inpgrid_grid = None
+        if self.regrid is not None and grid is not None:
+            ds = regrid(ds, grid, self.regrid, x=x, y=y)
+            if ds[x].ndim == 2:
+                y, x = ds[x].dims
+            # The regridded data are defined on the (possibly rotated) model grid
+            inpgrid_grid = SwanGrid(
+                grid_type="REG",
+                x0=grid.x0,
+                y0=grid.y0,
+                dx=grid.dx,
+                dy=grid.dy,
+                nx=grid.nx,
+                ny=grid.ny,
+                rot=grid.rot,
+                exc=FILL_VALUE,
+            )
         if self.var.value == "bottom":
-            inpgrid, readgrid = self.ds.swan.to_bottom_grid(
+            inpgrid, readgrid = ds.swan.to_bottom_grid(
                 output_file,
                 fmt="%4.2f",
-                x=self.coords.x,
-                y=self.coords.y,
+                x=x,
+                y=y,
                 z=self.z1,
                 fac=self.fac,
                 rot=0.0,
                 vmin=float("-inf"),
+                format=self.format,
+                grid=inpgrid_grid,
             )
         else:
-            inpgrid, readgrid = self.ds.swan.to_inpgrid(
+            inpgrid, readgrid = ds.swan.to_inpgrid(
                 output_file=output_file,
-                x=self.coords.x,
-                y=self.coords.y,
+                x=x,
+                y=y,
                 z1=self.z1,
                 z2=self.z2,
                 fac=self.fac,
                 rot=0.0,
                 var=self.var.name,
+                format=self.format,
+                grid=inpgrid_grid,
             )
         return f"{inpgrid}\n{readgrid}\n"
 
@@ -123,6 +168,214 @@ class SwanDataGrid(DataGrid):
         return f"SWANDataGrid {self.var.name}"
 
 
+def _readinp_unformatted(var: str, fac: float, output_file: str) -> str:
+    """READINP command to read files written with `write_swan_unformatted`."""
+    return READINP(
+        grid_type=var.lower(),
+        fac=fac,
+        fname1=Path(output_file).name,
+        idla=3,
+        nhedf=0,
+        nhedt=0,
+        format="unformatted",
+    ).render()
+
+
+def _row_template(shape: tuple, fmt: str, delimiter: str) -> str:
+    """Template formatting one array of shape in the same way as np.savetxt."""
+    if len(shape) > 2:
+        raise ValueError(f"Expected 1D or 2D array, got {len(shape)}D array instead")
+    if len(shape) == 2:
+        nrow, ncol = shape
+    else:
+        # 1D arrays are written as a single column like np.savetxt does
+        nrow, ncol = (shape[0] if shape else 1), 1
+    row = fmt if fmt.count("%") > 1 else delimiter.join([fmt] * ncol)
+    return (row + "\n") * nrow
+
+
+def _time_blocks(data: xr.DataArray, time_dim: str, block_size: Optional[int]):
+    """Time slices to write at once, aligned with dask chunks if available."""
+    size = data.sizes[time_dim]
+    if block_size is None and data.chunks is not None:
+        bounds = np.cumsum((0,) + data.chunksizes[time_dim])
+        return [slice(i0, i1) for i0, i1 in zip(bounds[:-1], bounds[1:])]
+    if block_size is None:
+        nvalues = max(data.size // max(size, 1), 1)
+        block_size = max(BLOCK_VALUES // nvalues, 1)
+    return [slice(i0, min(i0 + block_size, size)) for i0 in range(0, size, block_size)]
+
+
+def write_swan_ascii(
+    stream,
+    data: list[xr.DataArray],
+    fmt: str = "%4.2f",
+    delimiter: str = "\t",
+    time_dim: str = "time",
+    headers: Optional[list[str]] = None,
+    squeeze: bool = False,
+    block_size: Optional[int] = None,
+    workers: int = 1,
+) -> int:
+    """Write time blocks of SWAN ASCII grids formatted with a preformatted template.
+
+    The output is identical to calling `np.savetxt` for each variable at each time
+    but whole blocks of times are loaded and formatted at once so the cost does not
+    scale with the number of rows written.
+
+    Parameters
+    ----------
+    stream: TextIO
+        Open text stream to write to.
+    data: list[xr.DataArray]
+        Arrays to write at each time, all having `time_dim` as a dimension.
+    fmt: str
+        String float formatter.
+    delimiter: str
+        String separating columns.
+    time_dim: str
+        Name of the time dimension.
+    headers: list[str], optional
+        Header line to write at the start of each time.
+    squeeze: bool
+        Squeeze length-one dimensions of the arrays at each time.
+    block_size: int, optional
+        Number of times to format at once, by default defined from the dask chunks
+        of the first array or to keep blocks to around `BLOCK_VALUES` values.
+    workers: int
+        Number of threads to load and format blocks concurrently.
+
+    Returns
+    -------
+    ntimes: int
+        Number of times written.
+
+    """
+    data = [da.transpose(time_dim, ...) for da in data]
+    shapes = [da.shape[1:] for da in data]
+    if squeeze:
+        shapes = [tuple(n for n in shape if n != 1) for shape in shapes]
+    template = "".join(_row_template(shape, fmt, delimiter) for shape in shapes)
+
+    def format_block(block: slice) -> str:
+        values = [da[block].values for da in data]
+        values = np.concatenate([v.reshape(v.shape[0], -1) for v in values], axis=1)
+        lines = []
+        for ind, row in enumerate(values.tolist(), start=block.start):
+            if headers is not None:
+                lines.append(f"{headers[ind]}\n")
+            lines.append(template % tuple(row))
+        return "".join(lines)
+
+    blocks = _time_blocks(data[0], time_dim, block_size)
+    _write_blocks(stream, format_block, blocks, workers)
+    return data[0].sizes[time_dim]
+
+
+def write_swan_unformatted(
+    stream,
+    data: list[xr.DataArray],
+    time_dim: str = "time",
+    squeeze: bool = False,
+    block_size: Optional[int] = None,
+    workers: int = 1,
+) -> int:
+    """Write time blocks of SWAN grids as Fortran unformatted sequential records.
+
+    Each row of each array at each time is written as one record of little-endian
+    float32 values enclosed by int32 record length markers, this is the layout read
+    by SWAN with `READINP ... idla=3 ... UNFORMATTED`.
+
+    Parameters
+    ----------
+    stream: BinaryIO
+        Open binary stream to write to.
+    data: list[xr.DataArray]
+        Arrays to write at each time, all having `time_dim` as a dimension.
+    time_dim: str
+        Name of the time dimension.
+    squeeze: bool
+        Squeeze length-one dimensions of the arrays at each time.
+    block_size: int, optional
+        Number of times to write at once, see `write_swan_ascii`.
+    workers: int
+        Number of threads to load and convert blocks concurrently.
+
+    Returns
+    -------
+    ntimes: int
+        Number of times written.
+
+    """
+    data = [da.transpose(time_dim, ...) for da in data]
+    shapes = [da.shape[1:] for da in data]
+    if squeeze:
+        shapes = [tuple(n for n in shape if n != 1) for shape in shapes]
+    # 1D arrays are written as a single column like in the ascii files
+    ncols = [shape[1] if len(shape) == 2 else 1 for shape in shapes]
+
+    def format_block(block: slice) -> bytes:
+        steps = []
+        for da, ncol in zip(data, ncols):
+            values = da[block].values.astype("<f4").reshape(-1, ncol)
+            records = np.empty((values.shape[0], ncol + 2), dtype="<f4")
+            records[:, 1:-1] = values
+            records.view("<i4")[:, [0, -1]] = ncol * 4
+            steps.append(records.reshape(block.stop - block.start, -1))
+        return np.concatenate(steps, axis=1).tobytes()
+
+    blocks = _time_blocks(data[0], time_dim, block_size)
+    _write_blocks(stream, format_block, blocks, workers)
+    return data[0].sizes[time_dim]
+
+
+def read_swan_unformatted(filename: str | Path) -> np.ndarray:
+    """Read the records of a Fortran unformatted sequential SWAN grid file.
+
+    Parameters
+    ----------
+    filename: str | Path
+        File written with `write_swan_unformatted`.
+
+    Returns
+    -------
+    records: np.ndarray
+        2D float32 array with one row for each record in the file.
+
+    """
+    buffer = Path(filename).read_bytes()
+    records = []
+    offset = 0
+    while offset < len(buffer):
+        (nbytes,) = np.frombuffer(buffer, dtype="<i4", count=1, offset=offset)
+        end = offset + 4 + nbytes
+        (nbytes_end,) = np.frombuffer(buffer, dtype="<i4", count=1, offset=end)
+        if nbytes_end != nbytes:
+            raise ValueError(f"Inconsistent record markers at byte {offset}")
+        records.append(
+            np.frombuffer(buffer, dtype="<f4", count=nbytes // 4, offset=offset + 4)
+        )
+        offset = end + 4
+    return np.stack(records) if records else np.empty((0, 0), dtype="<f4")
+
+
+def _write_blocks(stream, format_block, blocks: list[slice], workers: int = 1):
+    """Write formatted blocks in order, formatting them in a thread pool if workers > 1."""
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # Only keep a few blocks in memory at once, writing them in order
+            pending = deque()
+            for block in blocks:
+                pending.append(executor.submit(format_block, block))
+                if len(pending) >= 2 * workers:
+                    stream.write(pending.popleft().result())
+            while pending:
+                stream.write(pending.popleft().result())
+    else:
+        for block in blocks:
+            stream.write(format_block(block))
+
+
 def dset_to_swan(
     dset: xr.Dataset,
     output_file: str,
@@ -130,8 +383,11 @@ def dset_to_swan(
     fmt: str = "%4.2f",
     fill_value: float = FILL_VALUE,
     time_dim="time",
+    block_size: Optional[int] = None,
+    workers: int = 1,
+    format: Literal["free", "unformatted"] = "free",
 ):
-    """Convert xarray Dataset into SWAN ASCII file.
+    """Convert xarray Dataset into SWAN ASCII or unformatted file.
 
     Parameters
     ----------
@@ -147,6 +403,12 @@ def dset_to_swan(
         Fill value.
     time_dim: str
         Name of the time dimension if available in the dataset.
+    block_size: int, optional
+        Number of times to format at once, see `write_swan_ascii`.
+    workers: int
+        Number of threads to load and format blocks concurrently.
+    format: str
+        Write `free` ascii or `unformatted` binary files.
 
     """
     # Input checking
@@ -164,16 +426,28 @@ def dset_to_swan(
         dset = dset.expand_dims(time_dim, 0)
 
     # Write to ascii
-    logger.debug(f"Writing SWAN ASCII file: {output_file}")
-    with open(output_file, "w") as stream:
-        for time in dset[time_dim]:
-            logger.debug(
-                f"Appending Time {pd.to_datetime(time.values)} to {output_file}"
+    logger.debug(f"Writing SWAN {format} file: {output_file}")
+    data = [dset[v].fillna(fill_value) for v in variables]
+    if format == "unformatted":
+        with open(output_file, "wb") as stream:
+            write_swan_unformatted(
+                stream,
+                data=data,
+                time_dim=time_dim,
+                block_size=block_size,
+                workers=workers,
+            )
+    else:
+        with open(output_file, "w") as stream:
+            write_swan_ascii(
+                stream,
+                data=data,
+                fmt=fmt,
+                delimiter="\t",
+                time_dim=time_dim,
+                block_size=block_size,
+                workers=workers,
             )
-            for data_var in variables:
-                logger.debug(f"Appending Variable {data_var} to {output_file}")
-                data = dset[data_var].sel(time=time).fillna(fill_value).values
-                np.savetxt(fname=stream, X=data, fmt=fmt, delimiter="\t")
 
     return output_file
 
@@ -232,6 +506,8 @@ class Swan_accessor(object):
         rot=0.0,
         vmin=float("-inf"),
         fill_value=FILL_VALUE,
+        format: Literal["free", "unformatted"] = "free",
+        grid: Optional[SwanGrid] = None,
     ):
         """Write SWAN inpgrid BOTTOM file.
 
@@ -255,6 +531,10 @@ class Swan_accessor(object):
             Fill value.
         fac: float
             Multiplying factor in case data are not in m or should be reversed.
+        format: str
+            Write `free` ascii or `unformatted` binary files.
+        grid: SwanGrid, optional
+            Grid the data are defined on, defined from the x and y coordinates if None.
 
         Returns
         -------
@@ -272,10 +552,14 @@ class Swan_accessor(object):
             fmt=fmt,
             variables=[z],
             fill_value=fill_value,
+            format=format,
         )
-        grid = self.grid(x=x, y=y, rot=rot)
+        grid = grid or self.grid(x=x, y=y, rot=rot)
         inpgrid = f"INPGRID BOTTOM {grid.inpgrid}"
-        readinp = f"READINP BOTTOM {fac} '{Path(output_file).name}' 3 FREE"
+        if format == "unformatted":
+            readinp = _readinp_unformatted("bottom", fac, output_file)
+        else:
+            readinp = f"READINP BOTTOM {fac} '{Path(output_file).name}' 3 FREE"
         return inpgrid, readinp
 
     def to_inpgrid(
@@ -290,6 +574,10 @@ class Swan_accessor(object):
         fac: float = 1.0,
         rot: float = 0.0,
         time: str = "time",
+        block_size: Optional[int] = None,
+        workers: int = 1,
+        format: Literal["free", "unformatted"] = "free",
+        grid: Optional[SwanGrid] = None,
     ):
         """This function writes to a SWAN inpgrid format file (i.e. WIND)
 
@@ -315,6 +603,15 @@ class Swan_accessor(object):
             Rotation angle, required if the grid has been previously rotated.
         time: str
             Name of the time variable in the dataset
+        block_size: int, optional
+            Number of times to format at once, see `write_swan_ascii`.
+        workers: int
+            Number of threads to load and format blocks concurrently.
+        format: str
+            Write `free` ascii files with time headers or `unformatted` binary files
+            without headers.
+        grid: SwanGrid, optional
+            Grid the data are defined on, defined from the x and y coordinates if None.
 
         Returns
         -------
@@ -329,25 +626,31 @@ class Swan_accessor(object):
         # ds = ds.transpose((time,) + ds[x].dims)
         dt = np.diff(ds[time].values).mean() / pd.to_timedelta(1, "H")
 
-        inptimes = []
-        with open(output_file, "wt") as f:
-            # iterate through time
-            for ti, windtime in enumerate(ds[time].values):
-                time_str = pd.to_datetime(windtime).strftime("%Y%m%d.%H%M%S")
-                logger.debug(time_str)
-
-                # write SWAN time header to file:
-                f.write(f"{time_str}\n")
-
-                # Write first component to file
-                z1t = np.squeeze(ds[z1].isel(dict(time=ti)).values)
-                np.savetxt(f, z1t, fmt=fmt)
-
-                if z2 is not None:
-                    z2t = np.squeeze(ds[z2].isel(dict(time=ti)).values)
-                    np.savetxt(f, z2t, fmt=fmt)
-
-                inptimes.append(time_str)
+        inptimes = list(pd.DatetimeIndex(ds[time].values).strftime("%Y%m%d.%H%M%S"))
+        data = [ds[z] for z in (z1, z2) if z is not None]
+        if format == "unformatted":
+            with open(output_file, "wb") as f:
+                write_swan_unformatted(
+                    f,
+                    data=data,
+                    time_dim=time,
+                    squeeze=True,
+                    block_size=block_size,
+                    workers=workers,
+                )
+        else:
+            with open(output_file, "wt") as f:
+                write_swan_ascii(
+                    f,
+                    data=data,
+                    fmt=fmt,
+                    delimiter=" ",
+                    time_dim=time,
+                    headers=inptimes,
+                    squeeze=True,
+                    block_size=block_size,
+                    workers=workers,
+                )
 
         if len(inptimes) < 1:
             os.remove(output_file)
@@ -356,10 +659,13 @@ class Swan_accessor(object):
             )
 
         # Create grid object from this dataset
-        grid = self.grid(x=x, y=y, rot=rot)
+        grid = grid or self.grid(x=x, y=y, rot=rot)
 
         inpgrid = f"INPGRID {var} {grid.inpgrid} NONSTATION {inptimes[0]} {dt} HR"
-        readinp = f"READINP {var} {fac} '{Path(output_file).name}' 3 0 1 0 FREE"
+        if format == "unformatted":
+            readinp = _readinp_unformatted(var, fac, output_file)
+        else:
+            readinp = f"READINP {var} {fac} '{Path(output_file).name}' 3 0 1 0 FREE"
 
         return inpgrid, readinp
 
@@ -35,13 +35,21 @@ class SwanGrid(RegularGrid):
             raise ValueError("gridfile must be provided for CURV grid")
         return self
 
-    def _regen_grid(self):
-        if self.grid_type == "REG":
-            _x, _y = self._gen_reg_cgrid()
-        elif self.grid_type == "CURV":
-            _x, _y = self._gen_curv_cgrid()
-        self.x = _x
-        self.y = _y
+    @property
+    def _parametric(self) -> bool:
+        # Curvilinear coordinates are loaded from the grid file
+        return self.grid_type == "REG"
+
+    def _regen_grid(self) -> tuple[np.ndarray, np.ndarray]:
+        if self.grid_type == "CURV":
+            return self._gen_curv_cgrid()
+        return self._gen_reg_cgrid()
+
+    def node_coords(self, index=np.s_[:, :]) -> tuple[np.ndarray, np.ndarray]:
+        """Coordinates of grid nodes, calculated for regular grids."""
+        if self.grid_type == "CURV":
+            return self.x[index], self.y[index]
+        return super().node_coords(index)
 
     def _gen_curv_cgrid(self):
         """loads a SWAN curvilinear grid and returns cgrid lat/lons and
@@ -131,13 +139,9 @@ class SwanGrid(RegularGrid):
         boundary instead of the convex hull which is not always the boundary.
 
         """
-        x = np.concatenate(
-            [self.x[0, :], self.x[1:, -1], self.x[-1, -2::-1], self.x[-2::-1, 0]]
-        )
-        y = np.concatenate(
-            [self.y[0, :], self.y[1:, -1], self.y[-1, -2::-1], self.y[-2::-1, 0]]
-        )
-        return Polygon(zip(x, y))
+        i, j = self._perimeter_indices()
+        x, y = self.node_coords((j, i))
+        return Polygon(np.column_stack([x, y]))
 
     def nearby_spectra(self, ds_spec, dist_thres=0.05, plot=True):
         """Find points nearby and project to the boundary
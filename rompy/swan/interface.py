@@ -5,6 +5,7 @@ from pathlib import Path
 from pydantic import Field, model_validator, field_validator, ValidationInfo
 
 from rompy.core import RompyBaseModel, TimeRange
+from rompy.core.scheduler import Task, run_tasks
 from rompy.swan.grid import SwanGrid
 from rompy.swan.data import SwanDataGrid
 from rompy.swan.boundary import Boundnest1, BoundspecSide, BoundspecSegmentXY
@@ -53,10 +54,15 @@ class DataInterface(RompyBaseModel):
         if self.bottom is not None:
             inputs.append(self.bottom)
         inputs.extend(self.input)
-        cmds = []
-        for input in inputs:
-            cmds.append(input.get(destdir=staging_dir, grid=grid, time=period))
-        return "\n".join(cmds)
+        tasks = [
+            Task(
+                name=f"{ind}_{input.var.value}",
+                func=input.get,
+                kwargs=dict(destdir=staging_dir, grid=grid, time=period),
+            )
+            for ind, input in enumerate(inputs)
+        ]
+        return "\n".join(run_tasks(tasks))
 
     def render(self, *args, **kwargs):
         """Make this class consistent with the components API."""
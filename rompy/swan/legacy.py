@@ -5,6 +5,7 @@ from pathlib import Path
 from pydantic import Field, field_validator
 
 from rompy.core import RompyBaseModel, TimeRange, Coordinate, Spectrum
+from rompy.core.scheduler import Task, run_tasks
 from rompy.swan.grid import SwanGrid
 from rompy.swan.data import SwanDataGrid
 from rompy.swan.boundary import Boundnest1
@@ -36,17 +37,22 @@ class ForcingData(RompyBaseModel):
     )
 
     def get(self, grid: SwanGrid, period: TimeRange, staging_dir: Path):
-        forcing = []
-        boundary = []
+        tasks = []
         for source in self:
             if source[1]:
                 logger.info(f"\t Processing {source[0]} forcing")
                 source[1]._filter_grid(grid)
                 source[1]._filter_time(period)
-                if source[0] == "boundary":
-                    boundary.append(source[1].get(staging_dir, grid))
-                else:
-                    forcing.append(source[1].get(staging_dir, grid))
+                tasks.append(
+                    Task(name=source[0], func=source[1].get, args=(staging_dir, grid))
+                )
+        forcing = []
+        boundary = []
+        for task, output in zip(tasks, run_tasks(tasks)):
+            if task.name == "boundary":
+                boundary.append(output)
+            else:
+                forcing.append(output)
         return dict(forcing="\n".join(forcing), boundary="\n".join(boundary))
 
     def __str__(self):
@@ -66,16 +72,10 @@ class OutputLocs(RompyBaseModel):
     # coords: list[Coordinate] = [["115.61", "-32.618"], ["115.686067", "-32.532381"]]
 
     def __repr__(self):
-        ret = __class__.__name__ + "\n"
-        for coord in self.coords:
-            ret += f"  {coord.lat} {coord.lon}\n"
-        return ret
+        return __class__.__name__ + "\n" + str(self)
 
     def __str__(self):
-        ret = ""
-        for coord in self.coords:
-            ret += f"  {coord.lat} {coord.lon}\n"
-        return ret
+        return "".join(f"  {coord.lat} {coord.lon}\n" for coord in self.coords)
 
 
 class SwanSpectrum(Spectrum):
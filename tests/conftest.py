@@ -1,3 +1,15 @@
+from typing import Literal
+
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+
+from rompy.core import BaseConfig, DataGrid, registry
+from rompy.core.data import SourceFile
+from rompy.model import ModelRun
+
+
 def pytest_addoption(parser):
     parser.addoption(
         "--run-slow",
@@ -5,3 +17,39 @@ def pytest_addoption(parser):
         default=False,
         help="Run slow tests",
     )
+
+
+class ForcingConfig(BaseConfig):
+    """Config writing the forcing of a netCDF source into the staging directory."""
+
+    model_type: Literal["forcing_test"] = "forcing_test"
+    data: DataGrid
+    scale: float = 1.0
+
+    def __call__(self, runtime):
+        self.data.get(runtime.staging_dir)
+        return self
+
+
+@pytest.fixture
+def forcing_run(tmp_path, monkeypatch):
+    """Factory of model runs with a ForcingConfig reading a netCDF source file."""
+    monkeypatch.setitem(registry._registry(), "forcing_test", f"{__name__}:ForcingConfig")
+    source = tmp_path / "source.nc"
+    xr.Dataset(
+        {"data": (("time", "y", "x"), np.random.rand(3, 4, 5))},
+        coords={"time": pd.date_range("2000-01-01", periods=3)},
+    ).to_netcdf(source)
+
+    def _forcing_run(run_id: str) -> ModelRun:
+        return ModelRun(
+            run_id=run_id,
+            output_dir=tmp_path / "runs",
+            config=ForcingConfig(
+                arg1="foo",
+                arg2="bar",
+                data=DataGrid(id="forcing", source=SourceFile(uri=source)),
+            ),
+        )
+
+    return _forcing_run
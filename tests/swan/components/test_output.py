@@ -5,6 +5,7 @@ import numpy as np
 from pydantic import ValidationError
 
 from rompy.swan.subcomponents.time import TimeRangeOpen
+from rompy.swan.components.base import CmdStream
 from rompy.swan.components.group import OUTPUT
 from rompy.swan.components.output import (
     SPECIAL_NAMES,
@@ -354,6 +355,24 @@ def test_output_group_all_set(
     print(output.render())
 
 
+def test_output_points_streamed(quantities, monkeypatch):
+    points = POINTS(sname="outpts", xp=np.arange(1000.0), yp=np.zeros(1000))
+    output = OUTPUT(points=points, quantity=quantities)
+    rendered = output.render()
+    assert rendered.startswith(points.render() + "\n\nQUANTITY")
+
+    def fail(*args, **kwargs):
+        raise AssertionError("points command built as a single string")
+
+    monkeypatch.setattr(POINTS, "cmd", fail)
+    block = CmdStream(output)
+    chunks = list(block)
+    assert len(chunks) > 1000
+    assert max(len(chunk) for chunk in chunks) < 200
+    assert "".join(chunks) == str(block) == rendered
+    assert block.model_dump_json() == output.model_dump_json()
+
+
 def test_output_sname_unique(frame, group):
     group1 = copy.deepcopy(group)
     group1.sname = frame.sname
@@ -0,0 +1,87 @@
+import tarfile
+import zipfile
+
+import fsspec
+import numpy as np
+import pytest
+
+from rompy.core import archive as archive_module
+from rompy.core.archive import archive
+from rompy.core.config import BaseConfig
+from rompy.model import ModelRun
+
+
+@pytest.fixture
+def srcdir(tmp_path, monkeypatch):
+    # Small chunks so files are split across several parallel deflate chunks
+    monkeypatch.setattr(archive_module, "CHUNK_SIZE", 2**14)
+    src = tmp_path / "staging"
+    (src / "sub").mkdir(parents=True)
+    values = np.random.default_rng(0).random(20000)
+    (src / "data.txt").write_text("\n".join(f"{v:.4f}" for v in values))
+    (src / "sub" / "small.txt").write_text("hello")
+    (src / "empty").write_bytes(b"")
+    return src
+
+
+def _contents(srcdir):
+    return {
+        path.relative_to(srcdir).as_posix(): path.read_bytes()
+        for path in srcdir.rglob("*")
+        if path.is_file()
+    }
+
+
+@pytest.mark.parametrize("compression", ["deflate", "store"])
+@pytest.mark.parametrize("workers", [1, 3])
+def test_archive_zip(tmp_path, srcdir, compression, workers):
+    dest = tmp_path / "out.zip"
+    stats = archive(srcdir, dest, compression=compression, workers=workers)
+    with zipfile.ZipFile(dest) as z:
+        assert z.testzip() is None
+        assert {name: z.read(name) for name in z.namelist()} == _contents(srcdir)
+    assert stats["files"] == 3
+    assert stats["compressed_size"] == dest.stat().st_size
+    if compression == "deflate":
+        assert stats["ratio"] > 2
+
+
+def test_archive_zip64(tmp_path, srcdir, monkeypatch):
+    # Zip64 records are written for all members and the central directory
+    monkeypatch.setattr(archive_module, "ZIP64_LIMIT", 100)
+    dest = tmp_path / "out.zip"
+    archive(srcdir, dest, workers=2)
+    with zipfile.ZipFile(dest) as z:
+        assert z.testzip() is None
+        assert {name: z.read(name) for name in z.namelist()} == _contents(srcdir)
+
+
+def test_archive_fsspec_url(srcdir):
+    archive(srcdir, "memory://archives/out.zip", level=1)
+    with fsspec.open("memory://archives/out.zip", "rb") as f:
+        with zipfile.ZipFile(f) as z:
+            assert {name: z.read(name) for name in z.namelist()} == _contents(srcdir)
+
+
+def test_archive_zstd(tmp_path, srcdir):
+    zstandard = pytest.importorskip("zstandard")
+    dest = tmp_path / "out.tar.zst"
+    archive(srcdir, dest, compression="zstd")
+    with open(dest, "rb") as f, zstandard.ZstdDecompressor().stream_reader(f) as r:
+        with tarfile.open(fileobj=r, mode="r|") as tar:
+            names = [member.name for member in tar]
+    assert sorted(names) == sorted(_contents(srcdir))
+
+
+def test_model_zip(tmp_path):
+    model = ModelRun(
+        run_id="test_zip",
+        output_dir=tmp_path,
+        config=BaseConfig(arg1="foo", arg2="bar"),
+    )
+    model()
+    zip_fn = model.zip(compression="store")
+    assert zip_fn == tmp_path / "test_zip.zip"
+    assert not (tmp_path / "test_zip").exists()
+    with zipfile.ZipFile(zip_fn) as z:
+        assert "INPUT" in z.namelist()
@@ -65,3 +65,91 @@ def test_grid_minmax(grid):
 def test_equivalence(regulargrid, grid):
     assert np.array_equal(regulargrid.x, grid.x)
     assert np.array_equal(regulargrid.y, grid.y)
+
+
+def test_regulargrid_serialisation_is_parametric(regulargrid):
+    data = regulargrid.model_dump()
+    assert "x" not in data and "y" not in data
+    assert len(regulargrid.model_dump_json()) < 200
+    grid = RegularGrid(**data)
+    assert grid == regulargrid
+    assert np.array_equal(grid.x, regulargrid.x)
+    assert np.array_equal(grid.y, regulargrid.y)
+
+
+def test_regulargrid_lazy_coordinates():
+    grid = RegularGrid(x0=1, y0=-2, dx=0.1, dy=0.2, nx=3, ny=4, rot=25)
+    assert ("coords",) not in grid._grid_cache
+    x0, y0, x1, y1 = grid.bbox()
+    assert ("coords",) not in grid._grid_cache
+    assert grid.x is grid.x
+    assert grid.x.shape == grid.y.shape == (4, 3)
+    assert [x0, y0, x1, y1] == pytest.approx(
+        [grid.x.min(), grid.y.min(), grid.x.max(), grid.y.max()]
+    )
+    xc, yc = grid.corners
+    assert xc == pytest.approx(grid.x[[0, 0, -1, -1], [0, -1, -1, 0]])
+    assert yc == pytest.approx(grid.y[[0, 0, -1, -1], [0, -1, -1, 0]])
+
+
+def test_regulargrid_node_coords():
+    grid = RegularGrid(x0=1, y0=-2, dx=0.1, dy=0.2, nx=5, ny=4, rot=-40)
+    for index in [np.s_[0, :], np.s_[:, -1], np.s_[-1, ::-1], np.s_[0, 0]]:
+        x, y = grid.node_coords(index)
+        assert x == pytest.approx(grid.x[index])
+        assert y == pytest.approx(grid.y[index])
+
+
+def test_boundary_points_spacing(grid):
+    polygon = grid.boundary()
+    xbnd, ybnd = grid.boundary_points(spacing=0.7)
+    npts = int(np.ceil(polygon.length / 0.7))
+    expected = [polygon.boundary.interpolate(i * 0.7) for i in range(npts)]
+    assert xbnd == pytest.approx([point.x for point in expected])
+    assert ybnd == pytest.approx([point.y for point in expected])
+
+
+def test_boundary_cached(grid):
+    assert grid.boundary() is grid.boundary()
+    xbnd, _ = grid.boundary_points(spacing=1)
+    assert grid.boundary_points(spacing=1)[0] is xbnd
+    assert grid.boundary_points(spacing=2)[0] is not xbnd
+    assert not xbnd.flags.writeable
+    # Changing the grid invalidates the cache
+    grid.x = grid.x * 2
+    assert grid.boundary_points(spacing=1)[0].max() == pytest.approx(18)
+
+
+def test_fingerprint(grid, regulargrid):
+    assert RegularGrid(**regulargrid.model_dump()).fingerprint == regulargrid.fingerprint
+    assert ("coords",) not in regulargrid._grid_cache
+    other = RegularGrid(x0=0, y0=0, dx=1, dy=1, nx=10, ny=11)
+    assert other.fingerprint != regulargrid.fingerprint
+    assert other != regulargrid
+    assert BaseGrid(x=grid.x.copy(), y=grid.y.copy()) == grid
+    assert grid != regulargrid
+    # The fingerprint is updated when the grid changes
+    fingerprint = other.fingerprint
+    other.ny = 10
+    assert other.fingerprint != fingerprint
+    assert other == regulargrid
+
+
+@pytest.mark.parametrize("deep", [False, True])
+def test_model_copy_update(regulargrid, deep):
+    fingerprint = regulargrid.fingerprint
+    x = regulargrid.x
+    copied = regulargrid.model_copy(update={"x0": regulargrid.x0 + 10}, deep=deep)
+    assert copied._grid_cache is not regulargrid._grid_cache
+    assert copied.x == pytest.approx(x + 10)
+    assert copied.fingerprint != fingerprint
+    assert copied != regulargrid
+    assert regulargrid.x == pytest.approx(x)
+    assert regulargrid.fingerprint == fingerprint
+
+
+def test_grid_fingerprint_cache_key(regulargrid):
+    from rompy.core.cache import grid_fingerprint
+
+    assert grid_fingerprint(regulargrid) == regulargrid.fingerprint
+    assert grid_fingerprint(None) is None
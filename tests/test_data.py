@@ -7,6 +7,7 @@ import pandas as pd
 import pytest
 import xarray as xr
 
+from rompy.core.cache import cached_forcing, set_forcing_cache
 from rompy.core.filters import Filter
 from rompy.core.types import DatasetCoords
 from rompy.core.data import SourceDataset, SourceFile, SourceIntake, SourceDatamesh
@@ -182,3 +183,106 @@ def test_source_datamesh():
     dset = dataset.open(variables=["u10"], filters=filters, coords=DatasetCoords(x="longitude", y="latitude"))
     assert(isinstance(dset, xr.Dataset))
 
+
+
+def test_ds_cached(nc_data_source, monkeypatch):
+    calls = []
+    _open = SourceFile._open
+
+    def counted_open(self):
+        calls.append(self.uri)
+        return _open(self)
+
+    monkeypatch.setattr(SourceFile, "_open", counted_open)
+    data = nc_data_source
+    data.ds
+    data.ds
+    assert len(calls) == 1
+
+
+def test_ds_cache_invalidated_by_crop(nc_data_source, monkeypatch):
+    calls = []
+    _open = SourceFile._open
+
+    def counted_open(self):
+        calls.append(self.uri)
+        return _open(self)
+
+    monkeypatch.setattr(SourceFile, "_open", counted_open)
+    data = nc_data_source
+    assert data.ds.latitude.max() == 9
+    data._filter_grid(BaseGrid(x=np.arange(2, 7), y=np.arange(3, 7)))
+    assert data.ds.latitude.max() == 6
+    assert len(calls) == 2
+
+
+def test_ds_cache_not_modified_by_caller(nc_data_source):
+    data = nc_data_source
+    ds = data.ds
+    ds["other"] = ds["data"] * 2
+    assert "other" not in data.ds
+
+
+def test_ds_in_memory_sources_not_cached():
+    # Ids of freed datasets are reused by new ones, which must not get stale data
+    crop = {"crop": {"x": slice(1, 3)}}
+    for value in range(50):
+        obj = xr.Dataset({"data": ("x", np.full(5, value))}, coords={"x": range(5)})
+        data = DataGrid(id="grid", source=SourceDataset(obj=obj), filter=crop)
+        assert (data.ds.data == value).all()
+        del data, obj
+
+
+@pytest.fixture
+def forcing_cache(tmp_path):
+    cache = set_forcing_cache(tmp_path / "cache")
+    yield cache
+    set_forcing_cache(None)
+
+
+def test_forcing_cache_hit(tmp_path, nc_data_source, forcing_cache, monkeypatch):
+    grid = BaseGrid(x=np.arange(2, 7), y=np.arange(3, 7))
+    outfile1 = nc_data_source.get(tmp_path / "run1", grid=grid)
+    monkeypatch.setattr(DataGrid, "ds", property(lambda self: pytest.fail()))
+    data = DataGrid(id="grid", source=nc_data_source.source)
+    outfile2 = data.get(tmp_path / "run2", grid=grid)
+    assert outfile2 == tmp_path / "run2" / "grid.nc"
+    assert outfile1.read_bytes() == outfile2.read_bytes()
+    assert forcing_cache.stats()["hits"] == 1
+    assert forcing_cache.stats()["entries"] == 1
+
+
+def test_forcing_cache_miss_on_grid_change(tmp_path, nc_data_source, forcing_cache):
+    nc_data_source.get(tmp_path, grid=BaseGrid(x=np.arange(2, 7), y=np.arange(3, 7)))
+    data = DataGrid(id="grid", source=nc_data_source.source)
+    data.get(tmp_path, grid=BaseGrid(x=np.arange(2, 5), y=np.arange(3, 7)))
+    assert forcing_cache.hits == 0
+    assert forcing_cache.stats()["entries"] == 2
+    assert xr.open_dataset(tmp_path / "grid.nc").longitude.max() == 4
+
+
+def test_forcing_cache_eviction(tmp_path, nc_data_source, forcing_cache):
+    nc_data_source.get(tmp_path, grid=BaseGrid(x=np.arange(2, 7), y=np.arange(3, 7)))
+    forcing_cache.max_size = forcing_cache.size
+    data = DataGrid(id="grid", source=nc_data_source.source)
+    data.get(tmp_path, grid=BaseGrid(x=np.arange(2, 5), y=np.arange(3, 7)))
+    assert forcing_cache.stats()["entries"] == 1
+
+
+class ScaledDataGrid(DataGrid):
+    @cached_forcing
+    def get(self, destdir, grid=None, time=None, scale=1.0):
+        outfile = Path(destdir) / f"{self.id}.nc"
+        (self.ds * scale).to_netcdf(outfile)
+        return outfile
+
+
+def test_forcing_cache_extra_arguments(tmp_path, nc_data_source, forcing_cache):
+    data = ScaledDataGrid(id="grid", source=nc_data_source.source)
+    grid = BaseGrid(x=np.arange(2, 7), y=np.arange(3, 7))
+    data.get(tmp_path / "run1", grid, scale=2.0)
+    data.get(tmp_path / "run2", grid=grid, scale=2.0)
+    assert forcing_cache.hits == 1
+    outfile = data.get(tmp_path / "run3", grid, None, 3.0)
+    assert forcing_cache.hits == 1
+    np.testing.assert_allclose(xr.open_dataset(outfile).data, data.ds.data * 3.0)
@@ -0,0 +1,51 @@
+from pathlib import Path
+
+import pytest
+
+from rompy.core.scheduler import SchedulerConfig
+from rompy.ensemble import Ensemble
+
+
+@pytest.fixture
+def run(forcing_run):
+    return forcing_run("sweep")
+
+
+def test_ensemble_members(run):
+    ensemble = Ensemble(
+        run=run, parameters={"config.scale": [1.0, 2.0], "config.template": ["a", "b"]}
+    )
+    members = ensemble.members()
+    assert [m.run_id for m in members] == [f"sweep_{i:03d}" for i in range(4)]
+    assert [m.config.scale for m in members] == [1.0, 1.0, 2.0, 2.0]
+    assert all(type(m.config) is type(run.config) for m in members)
+    ensemble.sweep = "zip"
+    assert [m.config.template for m in ensemble.members()] == ["a", "b"]
+
+
+def test_ensemble_concurrent_threads_rejected(run):
+    scheduler = SchedulerConfig(executor="thread", max_workers=2)
+    with pytest.raises(ValueError, match="process executor"):
+        Ensemble(run=run, parameters={"config.scale": [1.0]}, scheduler=scheduler)
+    Ensemble(run=run, parameters={"config.scale": [1.0]}, scheduler=SchedulerConfig())
+
+
+def test_ensemble_zip_sizes(run):
+    with pytest.raises(ValueError):
+        Ensemble(
+            run=run, parameters={"config.scale": [1.0, 2.0], "run_id": ["a"]}, sweep="zip"
+        )
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_ensemble_generate_shares_forcing(run, max_workers):
+    ensemble = Ensemble(
+        run=run,
+        parameters={"config.scale": [1.0, 2.0, 3.0]},
+        scheduler=SchedulerConfig(executor="process", max_workers=max_workers),
+    )
+    summary = ensemble.generate()
+    assert [s["cache_misses"] for s in summary] == [1, 0, 0]
+    files = [Path(run.output_dir) / s["run_id"] / "forcing.nc" for s in summary]
+    assert len({f.stat().st_ino for f in files}) == 1
+    assert not list(Path(run.output_dir).glob(".*forcing_cache"))
@@ -0,0 +1,291 @@
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+
+from rompy.core.data import SourceFile
+from rompy.core.filters import (Filter, crop_filter, get_filter_fns, sort_filter,
+                                subset_filter)
+
+
+@pytest.fixture
+def dset():
+    lon = np.arange(100.0, 110.1, 1.0)
+    lat = np.arange(-20.0, -30.1, -1.0)
+    time = pd.date_range("2000-01-01", periods=3, freq="h")
+    rng = np.random.default_rng(0)
+    shape = (len(time), len(lat), len(lon))
+    return xr.Dataset(
+        {name: (("time", "lat", "lon"), rng.random(shape)) for name in "uvw"},
+        coords={"time": time, "lat": lat, "lon": lon},
+    )
+
+
+@pytest.fixture
+def filters():
+    return Filter(
+        sort={"coords": ["lat"]},
+        subset={"data_vars": ["u", "v"]},
+        crop={"lon": slice(102, 105), "lat": slice(-28, -22)},
+        rename={"u": "uwnd"},
+    )
+
+
+def test_plan_matches_sequential_filters(dset, filters):
+    # Filters applied one after the other in the definition order
+    expected = sort_filter(dset, coords=["lat"])
+    expected = subset_filter(expected, data_vars=["u", "v"])
+    expected = crop_filter(expected, **filters.crop)
+    expected = expected.rename(u="uwnd")
+    xr.testing.assert_identical(filters(dset), expected)
+
+
+def test_plan_stages(filters):
+    plan = filters.compile()
+    assert [stage[0] for stage in plan.stages] == ["select", "sort", "rename"]
+    assert plan.required_variables == {"u", "v", "lon", "lat"}
+    explain = filters.explain()
+    assert explain.splitlines()[0] == "FilterPlan"
+    assert "1. select" in explain and "2. sort" in explain
+    assert "pushdown: read ['lat', 'lon', 'u', 'v']" in explain
+
+
+def test_plan_cached(filters):
+    assert filters.compile() is filters.compile()
+    filters.crop.update({"lon": slice(101, 105)})
+    plan = filters.compile()
+    assert plan.crop["lon"].start == 101
+    assert filters.compile(["u", "v", "w"]) is not plan
+
+
+def test_plan_not_modified_by_filter(dset, filters):
+    plan = filters.compile()
+    filters.rename["v"] = "vwnd"
+    filters.subset["data_vars"].append("w")
+    assert sorted(plan(dset).data_vars) == ["uwnd", "v"]
+
+
+def test_plan_subset_not_in_variables(filters):
+    with pytest.raises(KeyError):
+        filters.compile(["u"])
+
+
+def test_filter_fns_not_rebuilt(dset, filters, monkeypatch):
+    filters.compile()
+    calls = []
+    monkeypatch.setattr(
+        "rompy.core.filters.get_filter_fns",
+        lambda: calls.append(1) or get_filter_fns(),
+    )
+    filters(dset)
+    filters(dset)
+    assert not calls
+
+
+def test_source_file_pushdown(tmp_path, dset, filters, monkeypatch):
+    dset.to_netcdf(tmp_path / "data.nc")
+    source = SourceFile(uri=tmp_path / "data.nc")
+    opened = []
+    open_dataset = xr.open_dataset
+
+    def _open_dataset(*args, **kwargs):
+        ds = open_dataset(*args, **kwargs)
+        opened.append(ds)
+        return ds
+
+    monkeypatch.setattr(xr, "open_dataset", _open_dataset)
+    ds = source.open(filters=filters)
+    assert "w" not in opened[-1].data_vars
+    assert sorted(ds.data_vars) == ["uwnd", "v"]
+    assert ds.lat.values.tolist() == list(range(-28, -21))
+    assert ds.lon.values.tolist() == list(range(102, 106))
+
+
+@pytest.fixture
+def curvilinear():
+    j, i = np.mgrid[0:30, 0:40]
+    lon = 150 + 0.1 * i + 0.02 * j
+    lat = -40 + 0.1 * j - 0.02 * i
+    rng = np.random.default_rng(0)
+    return xr.Dataset(
+        {"ssh": (("time", "y", "x"), rng.random((2, 30, 40)))},
+        coords={"lon": (("y", "x"), lon), "lat": (("y", "x"), lat)},
+    )
+
+
+def test_crop_curvilinear_matches_where(curvilinear):
+    crop = {"lon": slice(151, 153), "lat": slice(-39, -38)}
+    lon, lat = curvilinear.lon, curvilinear.lat
+    inside = (lon > 151) & (lon < 153) & (lat > -39) & (lat < -38)
+    expected = curvilinear.where(inside, drop=True)
+    dsout = crop_filter(curvilinear, **Filter(crop=crop).crop)
+    assert dsout.ssh.shape == expected.ssh.shape
+    np.testing.assert_array_equal(dsout.ssh.values, expected.ssh.values)
+
+
+def test_crop_curvilinear_lazy(curvilinear):
+    import dask
+
+    def fail(*args, **kwargs):
+        raise AssertionError("data computed while filtering")
+
+    crop = {"lon": slice(151, 153), "lat": slice(-39, -38)}
+    dset = curvilinear.assign(ssh=curvilinear.ssh.chunk(time=1))
+    with dask.config.set(scheduler=fail):
+        dsout = Filter(crop=crop)(dset)
+        # Variables not backed by dask are masked lazily too
+        dsout2 = Filter(crop=crop)(curvilinear)
+    assert dsout.ssh.chunks is not None and dsout2.ssh.chunks is not None
+    assert np.isnan(dsout.ssh.values).any()
+    assert np.isfinite(dsout.ssh.values).any()
+
+
+def test_crop_curvilinear_outside(curvilinear):
+    dsout = crop_filter(curvilinear, **Filter(crop={"lon": slice(0, 10)}).crop)
+    assert dsout.ssh.shape == (2, 0, 0)
+
+
+def test_crop_stations():
+    import dask
+
+    def fail(*args, **kwargs):
+        raise AssertionError("data computed while filtering")
+
+    dset = xr.Dataset(
+        {"hs": (("time", "site"), np.random.default_rng(0).random((2, 5)))},
+        coords={
+            "lon": ("site", [150.0, 160.0, 151.0, 160.0, 152.0]),
+            "lat": ("site", [-40.0, -40.0, -39.0, -30.0, -38.0]),
+        },
+    )
+    dset = dset.assign(hs=dset.hs.chunk(time=1))
+    crop = {"lon": slice(149, 153), "lat": slice(-41, -37)}
+    with dask.config.set(scheduler=fail):
+        dsout = Filter(crop=crop)(dset)
+    assert dsout.hs.chunks is not None
+    assert dsout.lon.values.tolist() == [150.0, 151.0, 152.0]
+    np.testing.assert_array_equal(dsout.hs.values, dset.hs.values[:, [0, 2, 4]])
+
+
+def test_derived_lazy_and_ordered(dset, monkeypatch):
+    derived = {
+        "derived_variables": {
+            "dir": "np.degrees(np.arctan2(ds.u, ds['v']))",
+            "spd2": "spd ** 2",
+            "spd": "np.hypot(u, v)",
+        }
+    }
+    filters = Filter(derived=derived)
+    filters(dset)
+    # Expressions are compiled once per filter
+    calls = []
+    monkeypatch.setattr(
+        "rompy.core.filters._parse_expression",
+        lambda expr: calls.append(expr),
+    )
+    dsout = filters(dset)
+    assert not calls
+    assert dsout.spd.chunks is not None and dsout.spd2.chunks is not None
+    np.testing.assert_allclose(dsout.spd2, dset.u**2 + dset.v**2)
+    np.testing.assert_allclose(dsout.dir, np.degrees(np.arctan2(dset.u, dset.v)))
+    assert "1. derived" in filters.explain()
+
+
+@pytest.mark.parametrize(
+    "expr",
+    [
+        "__import__('os').system('ls')",
+        "ds.u.values",
+        "ds.__class__",
+        "np.save('file', ds.u)",
+        "open('file')",
+        "[x for x in ds]",
+        "lambda: 1",
+    ],
+)
+def test_derived_rejects_unsafe_expressions(expr):
+    with pytest.raises(ValueError):
+        Filter(derived={"derived_variables": {"a": expr}})
+
+
+def test_derived_circular_reference():
+    with pytest.raises(ValueError, match="Circular"):
+        Filter(derived={"derived_variables": {"a": "b + 1", "b": "a * 2"}})
+
+
+@pytest.fixture
+def globe():
+    lon = np.arange(0.0, 360.0, 2.0)
+    lat = np.arange(60.0, -60.1, -2.0)
+    rng = np.random.default_rng(0)
+    return xr.Dataset(
+        {"u10": (("time", "lat", "lon"), rng.random((2, len(lat), len(lon))))},
+        coords={"time": [0, 1], "lat": lat, "lon": lon},
+    )
+
+
+def test_normalize_crop_across_antimeridian(globe):
+    import dask
+
+    def fail(*args, **kwargs):
+        raise AssertionError("data computed while filtering")
+
+    # Source with -180 to 180 longitudes, the crop straddles its edges
+    globe = globe.assign_coords(lon=(globe.lon + 180) % 360 - 180).sortby("lon")
+    filters = Filter(
+        normalize={"lon": "lon", "ascending": ["lat"]},
+        crop={"lon": slice(170, -170), "lat": slice(-10, 10)},
+    )
+    with dask.config.set(scheduler=fail):
+        dsout = filters(globe)
+    assert dsout.lon.values.tolist() == list(range(170, 192, 2))
+    assert dsout.lat.values.tolist() == list(range(-10, 12, 2))
+    expected = globe.sel(lat=slice(10, -10)).isel(lat=slice(None, None, -1))
+    expected = xr.concat(
+        [expected.sel(lon=slice(170, 180)), expected.sel(lon=slice(-180, -170))],
+        dim="lon",
+    )
+    np.testing.assert_array_equal(dsout.u10.values, expected.u10.values)
+
+
+def test_normalize_wraps_to_crop_range(globe):
+    dsout = Filter(normalize={"lon": "lon"}, crop={"lon": slice(-20, 20)})(globe)
+    assert dsout.lon.values.tolist() == list(range(-20, 22, 2))
+    np.testing.assert_array_equal(
+        dsout.u10.sel(lon=-10).values, globe.u10.sel(lon=350).values
+    )
+    # Without crop longitudes are wrapped into -180 to 180
+    dsout = Filter(normalize={"lon": "lon"})(globe)
+    assert dsout.lon.values[0] == -180 and dsout.lon.values[-1] == 178
+    # The crop defines the range whatever the origin of the wrapped longitudes
+    dsout = Filter(
+        normalize={"lon": "lon", "lon_min": 0}, crop={"lon": slice(-20, 20)}
+    )(globe)
+    assert dsout.lon.values.tolist() == list(range(-20, 22, 2))
+    dsout = Filter(normalize={"lon": "lon", "lon_min": 0})(globe)
+    assert dsout.lon.values[0] == 0 and dsout.lon.values[-1] == 358
+    # Crops within the source range are a single window
+    dsout = Filter(normalize={"lon": "lon"}, crop={"lon": slice(10, 20)})(globe)
+    assert dsout.u10.chunks is None
+
+
+def test_sort_descending_reversed(globe):
+    import dask
+
+    def fail(*args, **kwargs):
+        raise AssertionError("data computed while filtering")
+
+    with dask.config.set(scheduler=fail):
+        dsout = sort_filter(globe.chunk(time=1), coords=["lat"])
+    xr.testing.assert_identical(dsout.compute(), globe.sortby("lat"))
+
+
+def test_normalize_source_file(tmp_path, globe):
+    globe.to_netcdf(tmp_path / "globe.nc")
+    filters = Filter(
+        normalize={"lon": "lon", "ascending": ["lat"]},
+        crop={"lon": slice(-10, 10), "lat": slice(-4, 4)},
+    )
+    dsout = SourceFile(uri=tmp_path / "globe.nc").open(filters=filters)
+    assert dsout.u10.shape == (2, 5, 11)
+    assert dsout.lon.values.tolist() == list(range(-10, 12, 2))
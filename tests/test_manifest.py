@@ -0,0 +1,53 @@
+import pytest
+import xarray as xr
+
+from rompy.core import DataGrid
+from rompy.core.manifest import load_report
+
+
+@pytest.fixture
+def model(forcing_run):
+    return forcing_run("incremental")
+
+
+def test_generate_skips_unchanged(model, monkeypatch):
+    staging_dir = model.staging_dir
+    model.generate()
+    report = load_report(staging_dir)
+    assert report["skipped"] == []
+    assert "forcing:DataGrid:forcing" in report["written"]
+    assert "template:INPUT" in report["written"]
+    mtime = (staging_dir / "INPUT").stat().st_mtime_ns
+
+    monkeypatch.setattr(DataGrid, "ds", property(lambda self: pytest.fail()))
+    model.generate()
+    report = load_report(staging_dir)
+    assert report["written"] == []
+    assert "forcing:DataGrid:forcing" in report["skipped"]
+    assert (staging_dir / "INPUT").stat().st_mtime_ns == mtime
+    assert (staging_dir / "forcing.nc").is_file()
+
+
+def test_generate_rewrites_changed(model):
+    model.generate()
+    model.config.arg1 = "baz"
+    model.generate()
+    report = load_report(model.staging_dir)
+    assert report["written"] == ["template:INPUT"]
+    assert "arg1: baz" in (model.staging_dir / "INPUT").read_text()
+
+
+def test_generate_rewrites_modified_files(model):
+    model.generate()
+    (model.staging_dir / "forcing.nc").write_bytes(b"")
+    model.generate()
+    assert load_report(model.staging_dir)["written"] == ["forcing:DataGrid:forcing"]
+    xr.open_dataset(model.staging_dir / "forcing.nc")
+
+
+def test_generate_force(model):
+    model.generate()
+    model.generate(force=True)
+    report = load_report(model.staging_dir)
+    assert report["skipped"] == []
+    assert "forcing:DataGrid:forcing" in report["written"]
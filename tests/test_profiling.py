@@ -0,0 +1,43 @@
+import json
+
+import numpy as np
+
+from rompy.core.profiling import Profiler, profile_stage, summarize
+
+
+def test_profile_stage_inactive():
+    with profile_stage("open") as stage:
+        assert stage is None
+
+
+def test_profiler_records_nested_stages(tmp_path):
+    records = []
+    profiler = Profiler(callback=records.append)
+    with profiler.activate():
+        with profile_stage("get", "wind"):
+            with profile_stage("write"):
+                (tmp_path / "out.bin").write_bytes(b"0" * 2**20)
+                data = np.ones(2**23)
+    assert [r["stage"] for r in profiler.records] == ["write", "get"]
+    assert records == profiler.records
+    write, get = profiler.records
+    assert write["id"] == get["id"] == "wind"
+    assert write["bytes_written"] >= 2**20
+    assert write["peak_rss"] > data.nbytes
+    assert get["wall_time"] >= write["wall_time"]
+    assert "wind" in profiler.summary()
+
+
+def test_generate_profile(forcing_run):
+    model = forcing_run("profiled")
+    model.generate(profile=True)
+    records = json.loads(model.profile_file.read_text())
+    stages = {(r["stage"], r["id"]) for r in records}
+    assert {
+        ("config", None),
+        ("get", "forcing"),
+        ("open", "forcing"),
+        ("write", "forcing"),
+        ("render", None),
+    } <= stages
+    assert summarize(records).count("\n") == len(records)
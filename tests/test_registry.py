@@ -0,0 +1,58 @@
+import json
+import subprocess
+import sys
+from typing import Literal
+
+import pytest
+
+from rompy.core import BaseConfig
+from rompy.core import registry
+from rompy.model import ModelRun
+
+
+class CustomConfig(BaseConfig):
+    model_type: Literal["custom"] = "custom"
+    value: int = 1
+
+
+def test_cli_import_is_lazy():
+    """Importing the CLI must not import any model backend or plotting library."""
+    code = (
+        "import json, sys, rompy.cli; "
+        "print(json.dumps(sorted(m for m in sys.modules if '.' not in m)))"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True
+    )
+    modules = set(json.loads(out.stdout.splitlines()[-1]))
+    heavy = {"cartopy", "matplotlib", "oceanum", "intake", "xarray", "pyschism"}
+    assert not modules & heavy
+
+
+def test_model_import_does_not_load_backends():
+    code = (
+        "import json, sys, rompy.model; "
+        "print(json.dumps(sorted(m for m in sys.modules if m.startswith('rompy') "
+        "or m.split('.')[0] in ('cartopy', 'matplotlib', 'oceanum'))))"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True
+    )
+    modules = json.loads(out.stdout.splitlines()[-1])
+    assert not [m for m in modules if m.split(".")[0] != "rompy"]
+    assert "rompy.swan" not in modules
+    assert "rompy.schism" not in modules
+
+
+def test_load_config_class():
+    assert registry.load_config_class("base") is BaseConfig
+    with pytest.raises(ValueError):
+        registry.load_config_class("unknown")
+
+
+def test_register_config(monkeypatch):
+    monkeypatch.setitem(registry._registry(), "custom", f"{__name__}:CustomConfig")
+    assert "custom" in registry.config_types()
+    model = ModelRun(config={"model_type": "custom", "value": 2})
+    assert isinstance(model.config, CustomConfig)
+    assert model.model_dump()["config"]["value"] == 2
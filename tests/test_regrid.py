@@ -0,0 +1,188 @@
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+
+from rompy.core import DataGrid
+from rompy.core.data import SourceDataset
+from rompy.core.grid import RegularGrid
+from rompy.core.interpolate import WEIGHTS_CACHE, apply_weights, grid_weights, regrid
+from rompy.core.types import DatasetCoords
+from rompy.swan.data import SwanDataGrid
+from rompy.swan.grid import SwanGrid
+
+
+@pytest.fixture(autouse=True)
+def weights_dir(tmp_path, monkeypatch):
+    path = tmp_path / "weights"
+    monkeypatch.setenv("ROMPY_WEIGHTS_DIR", str(path))
+    WEIGHTS_CACHE.clear()
+    yield path
+    WEIGHTS_CACHE.clear()
+
+
+@pytest.fixture
+def dset():
+    lon = np.arange(100.0, 120.1, 0.5)
+    lat = np.arange(-40.0, -24.9, 0.5)
+    time = pd.date_range("2000-01-01", periods=4, freq="h")
+    rng = np.random.default_rng(0)
+    data = rng.random((len(time), len(lat), len(lon)))
+    return xr.Dataset(
+        {"tp": (("time", "lat", "lon"), data)},
+        coords={"time": time, "lat": lat, "lon": lon},
+    )
+
+
+def test_regrid_bilinear_matches_xarray(dset):
+    grid = RegularGrid(x0=105.1, y0=-35.3, dx=0.3, dy=0.2, nx=20, ny=30)
+    dsout = regrid(dset.chunk(time=1), grid, "bilinear")
+    assert dsout.tp.dims == ("time", "lat", "lon")
+    expected = dset.interp(lon=grid.x[0, :], lat=grid.y[:, 0])
+    np.testing.assert_allclose(dsout.tp.values, expected.tp.values)
+
+
+def test_regrid_nearest(dset):
+    grid = RegularGrid(x0=105.1, y0=-35.3, dx=0.3, dy=0.2, nx=20, ny=30)
+    dsout = regrid(dset, grid, "nearest")
+    expected = dset.sel(lon=grid.x[0, :], lat=grid.y[:, 0], method="nearest")
+    np.testing.assert_array_equal(dsout.tp.values, expected.tp.values)
+
+
+def test_regrid_conservative_preserves_totals(dset):
+    # Model cells aligned with blocks of 2 x 2 source cells average the block
+    grid = RegularGrid(x0=100.25, y0=-39.75, dx=1.0, dy=1.0, nx=19, ny=14)
+    dsout = regrid(dset, grid, "conservative")
+    block = dset.tp.isel(lon=slice(0, 38), lat=slice(0, 28)).coarsen(lon=2, lat=2)
+    np.testing.assert_allclose(dsout.tp.values, block.mean().values)
+    # Rotated grids are estimated from samples of each model cell
+    grid = RegularGrid(x0=105, y0=-35, dx=1.0, dy=1.0, nx=8, ny=6, rot=30)
+    dsout = regrid(dset, grid, "conservative")
+    assert dsout.tp.dims == ("time", "j", "i")
+    assert dsout.lon.dims == ("j", "i")
+    const = regrid(dset.assign(tp=dset.tp * 0 + 2.0), grid, "conservative")
+    np.testing.assert_allclose(const.tp.values, 2.0)
+
+
+def test_regrid_outside_source_masked(dset):
+    grid = RegularGrid(x0=118.0, y0=-30.0, dx=1.0, dy=1.0, nx=5, ny=3)
+    for method in ("bilinear", "nearest", "conservative"):
+        dsout = regrid(dset, grid, method)
+        assert np.isnan(dsout.tp.isel(lon=-1)).all()
+        assert np.isfinite(dsout.tp.isel(lon=0)).all()
+
+
+def test_grid_weights_cached_on_disk(dset, weights_dir, monkeypatch):
+    grid = RegularGrid(x0=105.1, y0=-35.3, dx=0.3, dy=0.2, nx=20, ny=30)
+    weights = grid_weights("conservative", dset.lon.values, dset.lat.values, grid)
+    assert len(list(weights_dir.glob("*.npz"))) == 1
+    WEIGHTS_CACHE.clear()
+
+    def fail(*args, **kwargs):
+        raise AssertionError("weights recomputed")
+
+    monkeypatch.setattr("rompy.core.interpolate.conservative_weights", fail)
+    cached = grid_weights("conservative", dset.lon.values, dset.lat.values, grid)
+    assert (cached.matrix != weights.matrix).nnz == 0
+    np.testing.assert_array_equal(cached.mask, weights.mask)
+    # Weights of another grid are not reused
+    grid2 = RegularGrid(x0=105.1, y0=-35.3, dx=0.3, dy=0.2, nx=20, ny=31)
+    with pytest.raises(AssertionError):
+        grid_weights("conservative", dset.lon.values, dset.lat.values, grid2)
+
+
+def test_grid_weights_disk_cache_disabled(dset, weights_dir, monkeypatch):
+    monkeypatch.setenv("ROMPY_WEIGHTS_DIR", "")
+    grid = RegularGrid(x0=105.1, y0=-35.3, dx=0.3, dy=0.2, nx=20, ny=30)
+    grid_weights("bilinear", dset.lon.values, dset.lat.values, grid)
+    assert not weights_dir.exists()
+
+
+def test_datagrid_regrid(tmp_path, dset):
+    grid = RegularGrid(x0=105.1, y0=-35.3, dx=0.3, dy=0.2, nx=20, ny=30)
+    data = DataGrid(
+        id="rain",
+        source=SourceDataset(obj=dset),
+        coords=DatasetCoords(x="lon", y="lat"),
+        regrid="bilinear",
+    )
+    outfile = data.get(destdir=tmp_path, grid=grid)
+    dsout = xr.open_dataset(outfile)
+    assert dsout.tp.shape == (4, 30, 20)
+    np.testing.assert_allclose(dsout.lon, grid.x[0, :])
+    assert np.isfinite(dsout.tp).all()
+
+
+def test_datagrid_regrid_grid_within_source_cell(tmp_path, dset):
+    # The model grid crop does not contain any source points
+    grid = RegularGrid(x0=105.1, y0=-35.4, dx=0.1, dy=0.1, nx=3, ny=3)
+    data = DataGrid(
+        id="rain",
+        source=SourceDataset(obj=dset),
+        coords=DatasetCoords(x="lon", y="lat"),
+        regrid="bilinear",
+    )
+    outfile = data.get(destdir=tmp_path, grid=grid)
+    assert data.filter.crop["lon"].start == pytest.approx(104.1)
+    assert data.filter.crop["lat"].stop == pytest.approx(-34.2)
+    dsout = xr.open_dataset(outfile)
+    expected = regrid(dset, grid, "bilinear")
+    np.testing.assert_allclose(dsout.tp, expected.tp)
+
+
+def test_datagrid_regrid_single_source_point(tmp_path, dset):
+    grid = RegularGrid(x0=105.1, y0=-35.4, dx=0.1, dy=0.1, nx=3, ny=3)
+    data = DataGrid(
+        id="rain",
+        source=SourceDataset(obj=dset.isel(lon=[10], lat=[10])),
+        coords=DatasetCoords(x="lon", y="lat"),
+        regrid="nearest",
+    )
+    with pytest.raises(ValueError, match="single source point"):
+        data.get(destdir=tmp_path, grid=grid)
+
+
+def test_swandatagrid_regrid_rotated(tmp_path, dset):
+    grid = SwanGrid(x0=105.0, y0=-35.0, dx=0.5, dy=0.5, nx=10, ny=8, rot=20)
+    data = SwanDataGrid(
+        id="wind",
+        var="wind",
+        source=SourceDataset(obj=dset.rename(tp="u10")),
+        z1="u10",
+        coords=DatasetCoords(x="lon", y="lat"),
+        regrid="bilinear",
+    )
+    cmd = data.get(destdir=tmp_path, grid=grid)
+    assert "INPGRID WIND REG 105.0 -35.0 20.0 9 7 0.5 0.5 EXC" in cmd
+    values = np.loadtxt(tmp_path / "wind.grd", comments="2000")
+    assert values.shape == (4 * 8, 10)
+
+
+def test_swandatagrid_regrid_curvilinear(tmp_path, dset):
+    grid = RegularGrid(x0=105.0, y0=-35.0, dx=0.5, dy=0.5, nx=10, ny=8)
+    grid = SwanGrid(grid_type="CURV", gridfile="grid.grd", x=grid.x, y=grid.y)
+    data = SwanDataGrid(
+        id="wind",
+        var="wind",
+        source=SourceDataset(obj=dset.rename(tp="u10")),
+        z1="u10",
+        coords=DatasetCoords(x="lon", y="lat"),
+        regrid="bilinear",
+    )
+    with pytest.raises(ValueError, match="regular SWAN grid"):
+        data.get(destdir=tmp_path, grid=grid)
+
+
+def test_regrid_partial_source_dims(dset):
+    dset = dset.assign(lat_weight=np.cos(np.radians(dset.lat)), step=dset.time.dt.hour)
+    grid = RegularGrid(x0=105.1, y0=-35.3, dx=0.3, dy=0.2, nx=20, ny=30)
+    weights = grid_weights("nearest", dset.lon.values, dset.lat.values, grid)
+    dsout = apply_weights(dset, weights, src_dims=["lat", "lon"], dim="node")
+    assert dsout.tp.dims == ("time", "node")
+    xr.testing.assert_identical(dsout.lat_weight, dset.lat_weight)
+    xr.testing.assert_identical(dsout.step, dset.step)
+    # Variables that cannot be regridded are dropped from the model grid
+    for method in ("bilinear", "nearest"):
+        dsout = regrid(dset, grid, method)
+        assert sorted(dsout.data_vars) == ["step", "tp"]
+        assert dsout.tp.shape == (4, 30, 20)
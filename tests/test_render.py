@@ -0,0 +1,122 @@
+import shutil
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from rompy.core import BaseConfig
+from rompy.core import render as rrender
+from rompy.model import ModelRun
+
+here = Path(__file__).parent
+
+
+@pytest.fixture
+def cookiecutter_config(tmp_path, monkeypatch):
+    config = tmp_path / "cookiecutter.yaml"
+    config.write_text(
+        f"cookiecutters_dir: {tmp_path / 'cookiecutters'}\n"
+        f"replay_dir: {tmp_path / 'replay'}\n"
+    )
+    monkeypatch.setenv("COOKIECUTTER_CONFIG", str(config))
+    rrender.TEMPLATE_CACHE.clear()
+    yield tmp_path / "cookiecutters"
+    rrender.TEMPLATE_CACHE.clear()
+
+
+@pytest.fixture
+def git_template(tmp_path):
+    repo = tmp_path / "template.git"
+    shutil.copytree(here.parent / "rompy" / "templates" / "base", repo)
+    git = ["git", "-C", str(repo), "-c", "user.name=test", "-c", "user.email=t@t"]
+    subprocess.run(["git", "init", "-q", "-b", "main", str(repo)], check=True)
+    subprocess.run(git + ["add", "."], check=True)
+    subprocess.run(git + ["commit", "-q", "-m", "template"], check=True)
+    return repo
+
+
+def _generate(tmp_path, run_id, **kwargs):
+    run = ModelRun(
+        run_id=run_id,
+        output_dir=str(tmp_path / "output"),
+        config=BaseConfig(arg1="foo", arg2="bar", **kwargs),
+    )
+    return Path(run.generate())
+
+
+def test_bytecode_cache_reused(tmp_path):
+    rrender.BYTECODE_CACHE.clear()
+    staging1 = _generate(tmp_path, "run1")
+    compiled = len(rrender.BYTECODE_CACHE._cache)
+    assert compiled > 0
+    staging2 = _generate(tmp_path, "run2")
+    assert len(rrender.BYTECODE_CACHE._cache) == compiled
+    assert "run_id: 'run1'" in (staging1 / "INPUT").read_text()
+    assert "run_id: 'run2'" in (staging2 / "INPUT").read_text()
+
+
+def test_template_dir_local_path_cached(cookiecutter_config, tmp_path, monkeypatch):
+    template = here.parent / "rompy" / "templates" / "base"
+    monkeypatch.chdir(template.parent)
+    assert rrender.template_dir("base") == str(template)
+    # Relative paths are resolved against the working directory
+    monkeypatch.chdir(tmp_path)
+    with pytest.raises(Exception):
+        rrender.template_dir("base")
+
+
+def test_git_template_cloned_once(cookiecutter_config, git_template, tmp_path):
+    url = f"file://{git_template}"
+    sha = subprocess.check_output(
+        ["git", "-C", str(git_template), "rev-parse", "HEAD"], text=True
+    ).strip()
+    repo_dir = rrender.template_dir(url, "main")
+    assert repo_dir == str(cookiecutter_config / "rompy" / f"template-{sha}")
+    assert rrender.template_dir(url, "main") == repo_dir
+    # A new process reuses the clone of the same commit
+    rrender.TEMPLATE_CACHE.clear()
+    marker = Path(repo_dir) / "marker"
+    marker.touch()
+    assert rrender.template_dir(url, "main") == repo_dir
+    assert marker.exists()
+    staging_dir = _generate(tmp_path, "git", template=url)
+    assert (staging_dir / "INPUT").is_file()
+
+
+@pytest.fixture
+def custom_template(tmp_path):
+    template = tmp_path / "template"
+    project = template / "{{runtime.run_id}}"
+    project.mkdir(parents=True)
+    (project / "static.dat").write_text("0.0 1.0 2.0\n" * 5000)
+    (project / "raw.txt").write_text("{{ left as is }}\n")
+    (project / "locs.txt").write_text(
+        "{% for x, y in config.locs %}{{x}} {{y}}\n{% endfor %}"
+    )
+    (template / "cookiecutter.json").write_text(
+        '{"_copy_without_render": ["raw.txt"], "_unused": "ignored"}'
+    )
+    return template
+
+
+def test_render_copy_without_render(custom_template, tmp_path, monkeypatch):
+    copied = []
+    copy = rrender._copy
+    monkeypatch.setattr(
+        rrender, "_copy", lambda infile, outfile: copied.append(infile) or copy(infile, outfile)
+    )
+    context = {"runtime": {"run_id": "run"}, "config": {"locs": [(1, 2), (3, 4)]}}
+    staging_dir = Path(rrender.render(context, str(custom_template), str(tmp_path / "out")))
+    assert copied == ["static.dat"]
+    assert (staging_dir / "static.dat").read_text() == "0.0 1.0 2.0\n" * 5000
+    assert (staging_dir / "raw.txt").read_text() == "{{ left as is }}\n"
+    assert (staging_dir / "locs.txt").read_text() == "1 2\n3 4\n"
+
+
+def test_render_failure_removes_partial_file(custom_template, tmp_path):
+    project = custom_template / "{{runtime.run_id}}"
+    (project / "locs.txt").write_text("{{ runtime.run_id }}\n{{ config.missing.value }}\n")
+    context = {"runtime": {"run_id": "run"}, "config": {}}
+    with pytest.raises(Exception):
+        rrender.render(context, str(custom_template), str(tmp_path / "out"))
+    assert not (tmp_path / "out" / "run" / "locs.txt").exists()
@@ -0,0 +1,126 @@
+import time
+
+import pytest
+
+from rompy.core.manifest import Manifest, active_manifest
+from rompy.core.profiling import Profiler, profile_stage
+from rompy.core.scheduler import SchedulerConfig, Task, active_scheduler, run_tasks
+
+
+def delayed(value, delay=0.0):
+    time.sleep(delay)
+    return value
+
+
+@pytest.mark.parametrize("executor", ["thread", "process"])
+def test_run_tasks_declared_order(executor):
+    config = SchedulerConfig(executor=executor, max_workers=3)
+    tasks = [
+        Task(name="slow", func=delayed, args=("a", 0.3)),
+        Task(name="fast", func=delayed, args=("b",)),
+        Task(name="medium", func=delayed, args=("c", 0.1)),
+    ]
+    assert run_tasks(tasks, config) == ["a", "b", "c"]
+
+
+def test_run_tasks_concurrent():
+    config = SchedulerConfig(max_workers=4)
+    tasks = [Task(name=str(i), func=delayed, args=(i, 0.3)) for i in range(4)]
+    then = time.time()
+    assert run_tasks(tasks, config) == [0, 1, 2, 3]
+    assert time.time() - then < 1.0
+
+
+@pytest.mark.parametrize("max_workers", [1, 3])
+def test_run_tasks_dependencies(max_workers):
+    finished = []
+
+    def record(name, delay=0.0):
+        time.sleep(delay)
+        finished.append(name)
+        return name
+
+    tasks = [
+        Task(name="child", func=record, args=("child",), depends_on=["parent"]),
+        Task(name="parent", func=record, args=("parent", 0.2)),
+        Task(name="other", func=record, args=("other",)),
+    ]
+    config = SchedulerConfig(max_workers=max_workers)
+    assert run_tasks(tasks, config) == ["child", "parent", "other"]
+    assert finished.index("parent") < finished.index("child")
+
+
+def test_run_tasks_invalid_dependencies():
+    with pytest.raises(ValueError):
+        run_tasks([Task(name="a", func=delayed, args=(1,), depends_on=["b"])])
+    with pytest.raises(ValueError):
+        run_tasks(
+            [
+                Task(name="a", func=delayed, args=(1,), depends_on=["b"]),
+                Task(name="b", func=delayed, args=(1,), depends_on=["a"]),
+            ]
+        )
+
+
+def touch_after(path, delay):
+    time.sleep(delay)
+    path.touch()
+
+
+def test_run_tasks_timeout(tmp_path):
+    tasks = [
+        Task(name="fast", func=delayed, args=(1,)),
+        Task(name="slow", func=touch_after, args=(tmp_path / "done", 1.0), timeout=0.2),
+    ]
+    with pytest.raises(TimeoutError, match="slow"):
+        run_tasks(tasks, SchedulerConfig(executor="process"))
+    # The worker running the task is terminated
+    time.sleep(1.5)
+    assert not (tmp_path / "done").exists()
+
+
+def test_timeout_requires_process_executor():
+    with pytest.raises(ValueError):
+        SchedulerConfig(timeout=1)
+    with pytest.raises(ValueError):
+        run_tasks([Task(name="a", func=delayed, args=(1,), timeout=1)])
+
+
+def test_activate_propagates_to_nested_tasks():
+    config = SchedulerConfig(max_workers=2)
+
+    def nested():
+        return active_scheduler().max_workers
+
+    with config.activate():
+        assert run_tasks([Task(name="nested", func=nested)]) == [2]
+    assert active_scheduler().max_workers == 1
+
+
+def nested(value):
+    tasks = [Task(name=str(i), func=delayed, args=(value + i,)) for i in range(2)]
+    return run_tasks(tasks)
+
+
+def recorded(name):
+    with profile_stage("work", name):
+        active_manifest().record(name, "fingerprint", [])
+    return name
+
+
+def test_nested_tasks_in_process_pool():
+    tasks = [Task(name=str(i), func=nested, args=(10 * i,)) for i in range(3)]
+    with SchedulerConfig(executor="process", max_workers=2).activate():
+        assert run_tasks(tasks) == [[0, 1], [10, 11], [20, 21]]
+
+
+def test_process_pool_records_merged(tmp_path):
+    manifest = Manifest(tmp_path)
+    profiler = Profiler()
+    tasks = [Task(name=name, func=recorded, args=(name,)) for name in "ab"]
+    config = SchedulerConfig(executor="process", max_workers=2)
+    with manifest.activate(), profiler.activate():
+        assert run_tasks(tasks, config) == ["a", "b"]
+    assert manifest.report()["written"] == ["a", "b"]
+    assert sorted(record["id"] for record in profiler.records) == ["a", "b"]
+    assert all(record["start"] >= 0 for record in profiler.records)
@@ -1,11 +1,15 @@
+import numpy as np
 import pytest
 from pathlib import Path
 import xarray as xr
 from wavespectra import read_swan
 
 from rompy.core.time import TimeRange
+from rompy.core.validation import offline_validation
 from rompy.swan.grid import SwanGrid
-from rompy.core.boundary import SourceFile, SourceIntake, SourceWavespectra
+from rompy.core.boundary import (DataBoundary, SourceDataset, SourceFile,
+                                 SourceIntake, SourceWavespectra,
+                                 find_minimum_distance, nearest_distances)
 from rompy.swan.boundary import Boundnest1, BoundspecSide, BoundspecSegmentXY
 
 
@@ -68,6 +72,21 @@ def test_data_boundary_spacing_from_dataset(tmp_path, time, grid):
     assert ybnd == pytest.approx(ds.lat.values)
 
 
+def test_data_boundary_spacing_no_sites_in_bbox():
+    bnd = Boundnest1(
+        id="westaus",
+        source=SourceFile(
+            uri=HERE / "data/aus-20230101.nc",
+            kwargs=dict(engine="netcdf4"),
+        ),
+        spacing="parent",
+    )
+    grid = SwanGrid(x0=0, y0=0, dx=0.5, dy=0.5, nx=10, ny=10)
+    assert bnd._source_grid_spacing(grid) == float("inf")
+    with pytest.raises(ValueError, match="Spacing = inf"):
+        bnd._boundary_points(grid)
+
+
 def test_data_boundary_custom_spacing(tmp_path, time, grid):
     bnd = Boundnest1(
         id="westaus",
@@ -164,3 +183,95 @@ def test_source_wavespectra_ploting(tmp_path):
         rectangle="closed",
         coords={'x':'lon', 'y': 'lat'}
     ).plot()
+
+
+def _brute_force_nearest(x, y):
+    dist = np.hypot(x[:, None] - x[None, :], y[:, None] - y[None, :])
+    np.fill_diagonal(dist, np.inf)
+    return dist.min(axis=1)
+
+
+def test_nearest_distances():
+    rng = np.random.default_rng(42)
+    x, y = rng.uniform(0, 10, 500), rng.uniform(0, 10, 500)
+    distances = nearest_distances(x, y)
+    assert np.allclose(distances, _brute_force_nearest(x, y))
+    assert find_minimum_distance(list(zip(x, y))) == pytest.approx(distances.min())
+    assert find_minimum_distance([(0, 0)]) == float("inf")
+
+
+def test_nearest_distances_haversine():
+    # One degree apart along the equator and across the antimeridian at 60S
+    distances = nearest_distances([0, 1, 179.5, -179.5], [0, 0, -60, -60], "haversine")
+    assert distances[:2] == pytest.approx([1, 1])
+    assert distances[2:] == pytest.approx([0.5, 0.5], abs=1e-3)
+
+
+@pytest.mark.parametrize("kwargs", [{"tolerance": 2.0}, {"tolerance": 1.0, "max_sites": 2}])
+def test_sparse_idw_matches_wavespectra(grid, kwargs):
+    bnd = Boundnest1(
+        id="westaus",
+        source=SourceFile(uri=HERE / "data/aus-20230101.nc"),
+        sel_method="idw",
+        sel_method_kwargs=kwargs,
+    )
+    xbnd, ybnd = bnd._boundary_points(grid)
+    ds = bnd._sel_boundary(grid)
+    ref = bnd.ds.spec.sel(lons=xbnd, lats=ybnd, method="idw", **kwargs)
+    xr.testing.assert_allclose(ds, ref)
+    assert list(ds.data_vars) == list(ref.data_vars)
+
+
+def test_sparse_bilinear_matches_xarray():
+    dset = xr.Dataset(
+        {"hs": (("time", "lat", "lon"), np.random.rand(3, 6, 8))},
+        coords={"time": [0, 1, 2], "lat": np.arange(5, -1, -1.0), "lon": np.arange(8.0)},
+    )
+    dset = dset.chunk(time=1)
+    bnd = DataBoundary(
+        id="hs",
+        source=SourceDataset(obj=dset),
+        coords={"x": "lon", "y": "lat"},
+        sel_method="interp",
+    )
+    assert bnd._sparse_interp_supported()
+    xbnd, ybnd = np.array([0.5, 3.2, 7.0, 9.0]), np.array([4.5, 0.0, 2.7, 1.0])
+    ds = bnd._sel_boundary_sparse(xbnd, ybnd)
+    coords = {
+        "lon": xr.DataArray(xbnd, dims=("site",)),
+        "lat": xr.DataArray(ybnd, dims=("site",)),
+    }
+    xr.testing.assert_allclose(ds.compute(), dset.interp(coords).compute())
+
+
+def test_validation_does_not_load_data(monkeypatch):
+    def fail(self):
+        raise AssertionError("Data should not be read during validation")
+
+    monkeypatch.setattr(SourceWavespectra, "_open", fail)
+    Boundnest1(
+        id="westaus",
+        source=SourceWavespectra(uri=HERE / "data/aus-20230101.nc", reader="read_ncswan"),
+    )
+
+
+def test_validation_probes_variables(tmp_path):
+    xr.Dataset({"hs": ("site", [1.0, 2.0])}).to_netcdf(tmp_path / "hs.nc")
+    with pytest.raises(ValueError, match="efth"):
+        Boundnest1(id="hs", source=SourceFile(uri=tmp_path / "hs.nc"))
+    bnd = Boundnest1(
+        id="hs",
+        source=SourceFile(uri=tmp_path / "hs.nc"),
+        filter={"rename": {"hs": "efth"}},
+    )
+    assert bnd.filter.rename == {"hs": "efth"}
+
+
+def test_offline_validation(tmp_path):
+    source = SourceFile(uri=tmp_path / "does_not_exist.nc")
+    with pytest.raises(FileNotFoundError):
+        Boundnest1(id="offline", source=source)
+    with offline_validation():
+        bnd = Boundnest1(id="offline", source=source)
+    with pytest.raises(FileNotFoundError):
+        bnd.ds
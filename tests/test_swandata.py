@@ -3,10 +3,13 @@ import pandas as pd
 import pytest
 import xarray as xr
 
+from rompy.core.scheduler import SchedulerConfig
 from rompy.core.types import DatasetCoords
 from rompy.core.data import SourceFile
-from rompy.swan.data import SwanDataGrid
+from rompy.swan.data import (FILL_VALUE, SwanDataGrid, dset_to_swan,
+                             read_swan_unformatted)
 from rompy.swan.grid import SwanGrid
+from rompy.swan.interface import DataInterface
 
 
 @pytest.fixture
@@ -84,3 +87,73 @@ def test_swandata_write(tmp_path, nc_data_source):
 
 def test_bathy_write(tmp_path, nc_bathy):
     config = nc_bathy.get(tmp_path)
+
+
+def _savetxt_reference(filename, ds, variables, fmt, delimiter, headers=False):
+    """Reference ascii file written with np.savetxt at each time."""
+    with open(filename, "w") as stream:
+        for time in ds.time.values:
+            if headers:
+                stream.write(f"{pd.to_datetime(time).strftime('%Y%m%d.%H%M%S')}\n")
+            for var in variables:
+                data = np.squeeze(ds[var].sel(time=time).values)
+                np.savetxt(stream, data, fmt=fmt, delimiter=delimiter)
+    return filename
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_inpgrid_matches_savetxt(tmp_path, nc_data_source, workers):
+    ds = nc_data_source.ds.chunk(time=3)
+    ds.swan.to_inpgrid(
+        tmp_path / "wind.grd",
+        x="longitude",
+        y="latitude",
+        z1="u10",
+        z2="v10",
+        workers=workers,
+    )
+    ref = _savetxt_reference(
+        tmp_path / "ref.grd", ds, ["u10", "v10"], "%.2f", " ", headers=True
+    )
+    assert (tmp_path / "wind.grd").read_bytes() == ref.read_bytes()
+
+
+def test_dset_to_swan_matches_savetxt(tmp_path, nc_data_source):
+    ds = nc_data_source.ds
+    ds["u10"][0, 0, 0] = np.nan
+    dset_to_swan(ds, tmp_path / "wind.grd", ["u10", "v10"], block_size=4)
+    ref = _savetxt_reference(
+        tmp_path / "ref.grd", ds.fillna(FILL_VALUE), ["u10", "v10"], "%4.2f", "\t"
+    )
+    assert (tmp_path / "wind.grd").read_bytes() == ref.read_bytes()
+
+
+def test_swandata_write_unformatted(tmp_path, nc_data_source):
+    swangrid = SwanGrid(x0=0, y0=0, dx=1, dy=1, nx=10, ny=10)
+    nc_data_source.format = "unformatted"
+    config = nc_data_source.get(tmp_path, swangrid)
+    assert "READINP WIND fac=1.0 fname1='wind.bin' idla=3" in config
+    assert config.rstrip().endswith("UNFORMATTED")
+    ds = nc_data_source.ds
+    data = read_swan_unformatted(tmp_path / "wind.bin").reshape(10, 2, 10, 10)
+    assert np.array_equal(data[:, 0], ds.u10.values.astype("float32"))
+    assert np.array_equal(data[:, 1], ds.v10.values.astype("float32"))
+
+
+def test_bathy_write_unformatted(tmp_path, nc_bathy):
+    nc_bathy.format = "unformatted"
+    config = nc_bathy.get(tmp_path)
+    assert "READINP BOTTOM fac=1.0 fname1='bottom.bin'" in config
+    data = read_swan_unformatted(tmp_path / "bottom.bin")
+    assert np.array_equal(data, nc_bathy.ds.depth.values.astype("float32"))
+
+
+def test_data_interface_concurrent(tmp_path, nc_data_source, nc_bathy):
+    swangrid = SwanGrid(x0=0, y0=0, dx=1, dy=1, nx=10, ny=10)
+    interface = DataInterface(bottom=nc_bathy, input=[nc_data_source])
+    with SchedulerConfig(max_workers=2).activate():
+        cmds = interface.get(tmp_path, swangrid, None)
+    assert cmds.startswith("INPGRID BOTTOM")
+    assert "INPGRID WIND" in cmds
+    assert (tmp_path / "bottom.grd").is_file()
+    assert (tmp_path / "wind.grd").is_file()
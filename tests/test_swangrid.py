@@ -80,4 +80,18 @@ def test_grid_from_component(grid):
         my=grid.ny - 1,
     )
     grid2 = SwanGrid.from_component(regular_grid_component)
-    assert grid == grid2
\ No newline at end of file
+    assert grid == grid2
+
+
+def test_curvilinear_bounds_from_coordinates():
+    # Skewed curvilinear coordinates, not described by the regular grid parameters
+    j, i = np.mgrid[0:5, 0:6]
+    x = 10 + i + 0.5 * j**2
+    y = -5 + j + 0.2 * i
+    grid = SwanGrid(grid_type="CURV", gridfile="grid.grd", x=x, y=y)
+    assert grid.bbox() == [10.0, -5.0, 23.0, 0.0]
+    # The boundary follows the grid perimeter, not the parametric corners
+    perimeter = np.concatenate([x[0, :-1], x[:-1, -1], x[-1, :0:-1], x[:0:-1, 0]])
+    xbnd, _ = grid.boundary().exterior.xy
+    assert sorted(xbnd[:-1]) == sorted(perimeter)
+    assert grid.fingerprint != SwanGrid(grid_type="CURV", gridfile="grid.grd", x=x, y=y + 1).fingerprint
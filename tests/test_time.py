@@ -1,4 +1,4 @@
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 
 import pytest
 
@@ -50,3 +50,99 @@ def test_date_range_daily(dtr_daily):
     assert dtr_daily.date_range[0] == datetime(2019, 1, 1)
     assert dtr_daily.date_range[-1] == datetime(2019, 1, 3)
     assert len(dtr_daily.date_range) == 3
+
+
+def _loop_date_range(start, end, interval, include_end):
+    date_range = []
+    while start < end:
+        date_range.append(start)
+        start += interval
+        if start + interval > end:
+            if include_end:
+                date_range.append(end)
+            break
+    return date_range
+
+
+@pytest.mark.parametrize("include_end", [True, False])
+@pytest.mark.parametrize(
+    "end,interval",
+    [
+        ("2019-01-02", "1h"),
+        ("2019-01-02T0030", "1h"),
+        ("2019-01-01T0030", "1h"),
+        ("2019-01-11", "3d"),
+        ("2019-01-01", "1h"),
+    ],
+)
+def test_date_range_matches_loop(end, interval, include_end):
+    dtr = TimeRange(
+        start="2019-01-01", end=end, interval=interval, include_end=include_end
+    )
+    expected = _loop_date_range(dtr.start, dtr.end, dtr.interval, include_end)
+    assert dtr.date_range == expected
+    assert all(isinstance(date, datetime) for date in dtr.date_range)
+
+
+def test_date_array_cache_invalidated(dtr_hourly):
+    assert len(dtr_hourly.date_array) == 25
+    assert dtr_hourly.date_array is dtr_hourly.date_array
+    dtr_hourly.include_end = False
+    assert len(dtr_hourly.date_array) == 24
+    dtr_hourly.end = datetime(2019, 1, 3)
+    assert len(dtr_hourly.date_range) == 48
+
+
+def test_common_times(dtr_hourly):
+    other = TimeRange(start="2019-01-01T12", end="2019-01-03")
+    times = dtr_hourly.common_times(other)
+    assert times[0] == datetime(2019, 1, 1, 12)
+    assert times[-1] == datetime(2019, 1, 2)
+    assert len(times) == 13
+
+
+def test_common_times_timezones():
+    dtr = TimeRange(start="2019-01-01T00:00+00:00", end="2019-01-02T00:00+00:00")
+    other = TimeRange(start="2019-01-01T22:00+10:00", end="2019-01-03T00:00+10:00")
+    times = dtr.common_times(other)
+    assert times[0] == datetime(2019, 1, 1, 12, tzinfo=timezone.utc)
+    assert times[-1] == datetime(2019, 1, 2, tzinfo=timezone.utc)
+    assert len(times) == 13
+
+
+def test_split_by_number_uneven():
+    dtr = TimeRange(start="2019-01-01", end="2019-01-01T09", interval="1h")
+    windows = dtr.split(4)
+    assert [len(w.date_range) for w in windows] == [3, 2, 2, 3]
+    assert [w.end - w.start for w in windows] == [timedelta(hours=h) for h in [3, 2, 2, 2]]
+    times = [time for window in windows for time in window.date_range]
+    assert times == dtr.date_range
+    with pytest.raises(ValueError):
+        dtr.split(10)
+
+
+def test_split_by_number(dtr_hourly):
+    windows = dtr_hourly.split(4)
+    assert len(windows) == 4
+    assert windows[0].start == dtr_hourly.start
+    assert windows[-1].end == dtr_hourly.end
+    assert [w.include_end for w in windows] == [False, False, False, True]
+    times = [time for window in windows for time in window.date_range]
+    assert times == dtr_hourly.date_range
+
+
+def test_split_by_duration_with_overlap(dtr_daily):
+    windows = dtr_daily.split("2d", overlap="1d")
+    assert [(w.start, w.end) for w in windows] == [
+        (datetime(2019, 1, 1), datetime(2019, 1, 3)),
+        (datetime(2019, 1, 2), datetime(2019, 1, 4)),
+    ]
+
+
+def test_split_bad_args(dtr_daily):
+    with pytest.raises(ValueError):
+        dtr_daily.split("36h")
+    with pytest.raises(ValueError):
+        dtr_daily.split("1d", overlap="1d")
+    with pytest.raises(ValueError):
+        dtr_daily.split(0)